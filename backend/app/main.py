@@ -1,10 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 import os
+import threading
+
+from sqlalchemy import text
 
 from .routes import detection
 from .services.blockchain import get_blockchain_service
+from .services.anchoring import get_anchor_worker
+from .services.ai_detector import load_detector_in_background
+from .services.worker_pool import get_inference_pool
+from .services.readiness import get_readiness, PENDING, LOADING, READY, FAILED, DISABLED
+from .models import engine
+from .models.migrations import migrate, current_version, DB_AUTO_MIGRATE, LATEST_VERSION
 
 load_dotenv()
 
@@ -20,15 +30,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ✅ Force blockchain connection on startup
-@app.on_event("startup")
-def startup_event():
+def _connect_blockchain():
+    readiness = get_readiness()
+    readiness.set("chain", LOADING)
+
     print("\n🔗 Initializing blockchain service...")
-    blockchain = get_blockchain_service()
+    try:
+        blockchain = get_blockchain_service()
+    except Exception as e:
+        print(f"❌ Blockchain init failed: {e}\n")
+        readiness.set("chain", FAILED, error=str(e))
+        return
+
     if blockchain.enabled:
         print("✅ Blockchain ready\n")
+        readiness.set("chain", READY)
     else:
         print("⚠️ Blockchain disabled\n")
+        readiness.set("chain", DISABLED)
+
+
+def _probe_db() -> dict:
+    """Live database check for /ready: reachable and at the latest schema"""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        version = current_version(conn)
+
+    if version < LATEST_VERSION:
+        return {"state": PENDING, "schema_version": version, "expected_version": LATEST_VERSION}
+    return {"state": READY, "schema_version": version}
+
+
+get_readiness().register_probe("db", _probe_db)
+
+
+# Model and chain come up in the background so /health answers immediately;
+# /ready reports when they are usable
+@app.on_event("startup")
+def startup_event():
+    # Schema first: the anchor worker and every request assume current tables
+    if DB_AUTO_MIGRATE:
+        migrate()
+
+    threading.Thread(target=_connect_blockchain, name="chain-connect", daemon=True).start()
+    load_detector_in_background()
+
+    # Anchoring runs in the background so /analyze never waits on the chain
+    get_anchor_worker().start()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    get_anchor_worker().stop()
+    get_inference_pool().stop()
 
 app.include_router(detection.router)
 
@@ -38,4 +92,9 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"healthy": True}
\ No newline at end of file
+    return {"healthy": True}
+
+@app.get("/ready")
+def ready():
+    status = get_readiness().check()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
\ No newline at end of file
@@ -1,6 +1,7 @@
-from sqlalchemy import create_engine, Column, String, Float, Boolean, DateTime
+from sqlalchemy import create_engine, event, Index, Column, String, Float, Boolean, Date, DateTime, Integer, BigInteger, ForeignKey, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from datetime import datetime
 import os
 from dotenv import load_dotenv
@@ -17,22 +18,202 @@ class Case(Base):
     filename = Column(String)
     media_hash = Column(String, unique=True)
     detection_score = Column(Float)
-    is_ai_generated = Column(Boolean)
-    report_path = Column(String)
-    blockchain_tx = Column(String, nullable=True)
+    is_ai_generated = Column(Boolean, index=True)
+    report_path = Column(String)  # current PDF in the media store
+    report_sha256 = Column(String, nullable=True)  # store key of that PDF (holds a reference)
+    report_variant = Column(String, nullable=True)  # template version and anchor it was rendered for
+    blockchain_tx = Column(String, nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    model_name = Column(String, nullable=True)  # verdict cache key the case was scored under
+    config_hash = Column(String, nullable=True)
+
+    # Keyset pagination walks (created_at, id) newest first
+    __table_args__ = (Index("ix_cases_created_at_id", "created_at", "id"),)
+
+class AnchorTxMixin:
+    """Transaction lifecycle shared by anything the anchor worker sends on-chain"""
+    status = Column(String, default="pending", index=True)  # pending → submitted → anchored, or failed
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, index=True)
+    tx_hash = Column(String, nullable=True)
+    tx_nonce = Column(Integer, nullable=True)
+    max_fee_per_gas = Column(BigInteger, nullable=True)
+    max_priority_fee_per_gas = Column(BigInteger, nullable=True)
+    fee_bumps = Column(Integer, default=0)
+    prior_tx_hashes = Column(Text, nullable=True)  # JSON list of replaced transactions
+    block_number = Column(Integer, nullable=True)
+    submitted_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class AnchorJob(AnchorTxMixin, Base):
+    """Durable queue entry for putting a case's hashes on-chain"""
+    __tablename__ = "anchor_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    case_id = Column(String, ForeignKey("cases.id"), unique=True, index=True)
+    media_hash = Column(String)
+    report_hash = Column(String)
+    batch_id = Column(String, ForeignKey("anchor_batches.id"), nullable=True, index=True)
+    leaf_index = Column(Integer, nullable=True)
+    merkle_proof = Column(Text, nullable=True)  # JSON list of sibling steps
+
+class AnchorBatch(AnchorTxMixin, Base):
+    """A Merkle root committing to many cases, anchored in one transaction"""
+    __tablename__ = "anchor_batches"
+
+    id = Column(String, primary_key=True)  # also the on-chain caseId of the root record
+    merkle_root = Column(String)
+    leaf_count = Column(Integer)
+
+class CachedVerdict(Base):
+    """Persistent tier of the verdict cache, keyed by media and detector configuration"""
+    __tablename__ = "verdict_cache"
+
+    media_hash = Column(String, primary_key=True)
+    model_name = Column(String, primary_key=True)
+    config_hash = Column(String, primary_key=True)
+    result = Column(Text)  # JSON detection result
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class MediaFingerprint(Base):
+    """Perceptual hashes of an image, or of one sampled video frame"""
+    __tablename__ = "media_fingerprints"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    case_id = Column(String, ForeignKey("cases.id"), index=True)
+    frame_index = Column(Integer, nullable=True)  # None for images
+    ahash = Column(String(16))  # 64-bit hashes as hex
+    dhash = Column(String(16))
+    phash = Column(String(16), index=True)
+
+class CaseDailyRollup(Base):
+    """Case counts per day and media type, kept current as cases are saved and anchored"""
+    __tablename__ = "case_daily_rollup"
+
+    day = Column(Date, primary_key=True)  # UTC day of created_at
+    media_type = Column(String, primary_key=True)
+    total = Column(Integer, default=0)
+    ai_generated = Column(Integer, default=0)
+    anchored = Column(Integer, default=0)
+    confidence_sum = Column(Float, default=0.0)
+
+class CaseConfidenceRollup(Base):
+    """Histogram of detection confidence per day and media type"""
+    __tablename__ = "case_confidence_rollup"
+
+    day = Column(Date, primary_key=True)
+    media_type = Column(String, primary_key=True)
+    bucket = Column(Integer, primary_key=True)  # floor(confidence * buckets), top bucket includes 1.0
+    count = Column(Integer, default=0)
+
+class AnalysisJob(Base):
+    """Durable queue entry for an upload analysed by the job workers"""
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String, primary_key=True)
+    status = Column(String, default="queued", index=True)  # queued → running → done, or failed
+    priority = Column(Integer, default=0)  # higher runs first
+    filename = Column(String)
+    media_type = Column(String)
+    media_hash = Column(String)
+    upload_path = Column(String)  # media store path; the job holds a reference until it finishes
+    attempts = Column(Integer, default=0)
+    available_at = Column(DateTime, default=datetime.utcnow)  # queued: not before; running: lease expiry
+    lease_owner = Column(String, nullable=True)
+    case_id = Column(String, nullable=True)
+    result = Column(Text, nullable=True)  # JSON analysis response
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    # Claim order: runnable first, highest priority, oldest
+    __table_args__ = (Index("ix_analysis_jobs_claim", "status", "priority", "created_at"),)
+
+class StoredObject(Base):
+    """A file in the content-addressed media store and how many records point at it"""
+    __tablename__ = "stored_objects"
+
+    sha256 = Column(String, primary_key=True)
+    kind = Column(String)  # media or report
+    size = Column(BigInteger)
+    refcount = Column(Integer, default=0)  # -1 while garbage collection removes it
+    created_at = Column(DateTime, default=datetime.utcnow)
+    touched_at = Column(DateTime, default=datetime.utcnow)  # last put, acquire or release
+
+    # Garbage collection looks for unreferenced objects untouched for a while
+    __table_args__ = (Index("ix_stored_objects_gc", "refcount", "touched_at"),)
+
+class SchemaMigration(Base):
+    """One applied schema migration (see app/models/migrations.py)"""
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
 # Create database engine
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./cybershield.db")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+# Connection pool (per process); size it to the db stage workers plus background threads
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# How long a SQLite writer waits for the lock before "database is locked"
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+
+def _create_engine(url: str):
+    # Hosted Postgres often hands out the legacy scheme
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True
+        )
+
+    connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT}
+
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # Every pooled connection would get its own empty in-memory database
+        sqlite_engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        sqlite_engine = create_engine(
+            url,
+            connect_args=connect_args,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT
+        )
+
+    @event.listens_for(sqlite_engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _):
+        # WAL lets readers run alongside the single writer
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    return sqlite_engine
+
+engine = _create_engine(DATABASE_URL)
 
 # Create session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+# Tables are created and upgraded by app.models.migrations, not at import
 
 def get_db():
+    """FastAPI dependency: one session per request, closed when it ends"""
     db = SessionLocal()
     try:
         yield db
@@ -0,0 +1,207 @@
+"""
+Versioned schema migrations.
+
+Each migration runs once per database, in order, and is recorded in the
+schema_migrations table. Migrations must be idempotent: a database that
+predates this runner already has most tables (they used to be created at
+import time), and two processes may start migrating at once on SQLite.
+
+Run at API startup (DB_AUTO_MIGRATE) or by hand:
+
+    python -m app.models.migrations
+"""
+import os
+import shutil
+from datetime import datetime
+
+from sqlalchemy import inspect, text, func
+from sqlalchemy.orm import Session
+
+from . import (
+    Base,
+    engine,
+    Case,
+    CaseDailyRollup,
+    CaseConfidenceRollup,
+    AnalysisJob,
+    StoredObject,
+    SchemaMigration
+)
+
+# Apply pending migrations when the API starts
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+
+# Arbitrary key for the Postgres advisory lock serialising migrators
+_PG_LOCK_KEY = 0x43534D47
+
+
+def _baseline(conn):
+    """Every table as currently modelled; existing tables are left alone"""
+    Base.metadata.create_all(bind=conn, checkfirst=True)
+
+
+def _case_lookup_indexes(conn):
+    """Listing, filtering and tx lookups on cases"""
+    for index in Case.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+
+def _analytics_rollups(conn):
+    """Rollup tables for the dashboard, backfilled from existing cases"""
+    from ..services.analytics import rebuild
+
+    CaseDailyRollup.__table__.create(bind=conn, checkfirst=True)
+    CaseConfidenceRollup.__table__.create(bind=conn, checkfirst=True)
+    rebuild(conn)
+
+
+def _analysis_jobs(conn):
+    """Queue table for asynchronous analysis jobs"""
+    AnalysisJob.__table__.create(bind=conn, checkfirst=True)
+    for index in AnalysisJob.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+
+def _adopt(store, db, legacy_path: str, sha256: str):
+    staged = store.temp_path()
+    os.remove(staged)
+    try:
+        os.link(legacy_path, staged)
+    except OSError:
+        shutil.copyfile(legacy_path, staged)
+
+    store.put_file(staged, sha256, db=db)
+    store.acquire(db, sha256)
+
+
+def _media_store(conn):
+    """
+    Content-addressed store, adopting existing flat uploads
+
+    Cases reference their media, queued jobs their upload. Old files are
+    hard-linked in rather than moved, so a failed run leaves them intact;
+    once migrated, uploads/CASE-*, uploads/jobs and uploads/previews can be
+    deleted. Reports and previews are re-rendered into the store on their
+    next download.
+    """
+    from ..services.media_store import get_media_store
+
+    StoredObject.__table__.create(bind=conn, checkfirst=True)
+    for index in StoredObject.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+    columns = {c["name"] for c in inspect(conn).get_columns(Case.__tablename__)}
+    for column in (Case.report_sha256, Case.report_variant):
+        if column.name not in columns:
+            conn.execute(text(f"ALTER TABLE {Case.__tablename__} ADD COLUMN {column.name} VARCHAR"))
+
+    store = get_media_store()
+    legacy_folder = "uploads"
+    moved = 0
+
+    with Session(bind=conn) as db:
+        cases = db.execute(Case.__table__.select().with_only_columns(Case.id, Case.filename, Case.media_hash)).all()
+        for case_id, filename, media_hash in cases:
+            legacy = os.path.join(legacy_folder, f"{case_id}_{filename}")
+            if not media_hash or not os.path.isfile(legacy):
+                continue
+            _adopt(store, db, legacy, media_hash)
+            moved += 1
+
+        jobs = db.execute(
+            AnalysisJob.__table__.select()
+            .with_only_columns(AnalysisJob.id, AnalysisJob.media_hash, AnalysisJob.upload_path)
+            .where(AnalysisJob.status.in_(("queued", "running")))
+        ).all()
+        for job_id, media_hash, upload_path in jobs:
+            if not upload_path or not os.path.isfile(upload_path):
+                continue
+            _adopt(store, db, upload_path, media_hash)
+            db.execute(
+                AnalysisJob.__table__.update()
+                .where(AnalysisJob.id == job_id)
+                .values(upload_path=store.path(media_hash))
+            )
+            moved += 1
+        db.commit()
+
+    if moved:
+        print(f"🗄️ Linked {moved} legacy uploads into {store.root}")
+
+
+def _case_verdict_key(conn):
+    """The detector key each case was scored under, so its report reads its own verdict"""
+    columns = {c["name"] for c in inspect(conn).get_columns(Case.__tablename__)}
+    for column in (Case.model_name, Case.config_hash):
+        if column.name not in columns:
+            conn.execute(text(f"ALTER TABLE {Case.__tablename__} ADD COLUMN {column.name} VARCHAR"))
+
+
+MIGRATIONS = [
+    (1, "baseline", _baseline),
+    (2, "case_lookup_indexes", _case_lookup_indexes),
+    (3, "case_keyset_index", _case_lookup_indexes),
+    (4, "analytics_rollups", _analytics_rollups),
+    (5, "analysis_jobs", _analysis_jobs),
+    (6, "media_store", _media_store),
+    (7, "case_verdict_key", _case_verdict_key),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ------------------------------------------------
+
+def current_version(conn) -> int:
+    """Highest applied migration, or 0 on a database never migrated"""
+    if not inspect(conn).has_table(SchemaMigration.__tablename__):
+        return 0
+
+    return conn.execute(
+        SchemaMigration.__table__.select().with_only_columns(func.max(SchemaMigration.version))
+    ).scalar() or 0
+
+
+def migrate(bind=None) -> list:
+    """
+    Apply pending migrations, each in its own transaction
+
+    Returns:
+        Names of the migrations applied by this call
+    """
+    bind = bind or engine
+    applied = []
+
+    with bind.begin() as conn:
+        SchemaMigration.__table__.create(bind=conn, checkfirst=True)
+        version = current_version(conn)
+
+    for number, name, step in MIGRATIONS:
+        if number <= version:
+            continue
+
+        with bind.begin() as conn:
+            record = SchemaMigration.__table__.insert().values(
+                version=number, name=name, applied_at=datetime.utcnow()
+            )
+
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_LOCK_KEY})
+                # Another process may have applied it while we waited
+                if current_version(conn) >= number:
+                    continue
+            elif conn.dialect.name == "sqlite":
+                record = record.prefix_with("OR IGNORE")
+
+            step(conn)
+            conn.execute(record)
+
+        applied.append(name)
+        print(f"🗄️ Applied migration {number:03d} {name}")
+
+    return applied
+
+
+if __name__ == "__main__":
+    done = migrate()
+    print(f"Schema at version {LATEST_VERSION}" + ("" if done else " (nothing to apply)"))
@@ -1,207 +1,555 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse
-from pathlib import Path
-from datetime import datetime
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
+from datetime import datetime, date
+import asyncio
+import json
 import os
-import hashlib
 
-from ..services.ai_detector import get_detector
-from ..services.pdf_generator import get_pdf_generator
-from ..services.blockchain import get_blockchain_service
+from ..services.ai_detector import get_detector_stats
+from ..services.analysis import (
+    analyze_spooled,
+    fingerprints_or_empty,
+    AnalysisError,
+    UPLOAD_FOLDER,
+    MAX_FILE_SIZE
+)
+from ..services.report_builder import get_report_builder
+from ..services.media_store import get_media_store
+from ..services.job_queue import enqueue as enqueue_job, get_job, job_queue_stats
+from ..services.anchoring import anchor_queue_stats, verify_case_inclusion
+from ..services.pipeline import get_pipeline, StageBusyError
+from ..services.worker_pool import get_inference_pool
+from ..services.ingest import (
+    ingest_upload,
+    spool_stream,
+    is_archive,
+    iter_archive,
+    UploadTooLargeError
+)
+from ..services.verdict_cache import get_verdict_cache
+from ..services.analytics import summary as analytics_summary
+from ..services.case_listing import (
+    fetch_page,
+    iter_ndjson,
+    InvalidCursorError,
+    ANCHOR_STATUSES,
+    CASES_DEFAULT_LIMIT,
+    CASES_MAX_LIMIT
+)
+from ..services.similarity_index import (
+    get_similarity_index,
+    load_fingerprints,
+    SIMILARITY_MAX_DISTANCE
+)
 
 from ..utils import (
-    generate_case_id,
-    calculate_file_hash,
+    generate_batch_id,
     is_image,
     is_video
 )
 
-from ..models import SessionLocal, Case
+from sqlalchemy.orm import Session
 
-router = APIRouter(prefix="/api/detect", tags=["detection"])
+from ..models import Case, get_db
 
-UPLOAD_FOLDER = "uploads"
-REPORT_FOLDER = "reports"
-MAX_FILE_SIZE = 50 * 1024 * 1024
+router = APIRouter(prefix="/api/detect", tags=["detection"])
 
-Path(UPLOAD_FOLDER).mkdir(exist_ok=True)
-Path(REPORT_FOLDER).mkdir(exist_ok=True)
+# Batch uploads: items analysed at once (enough to fill a detector micro-batch)
+# and the most items one batch may contain
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", os.getenv("DETECTOR_MAX_BATCH_SIZE", "8")))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+
+def _similar_cases(db: Session, fingerprints: list, max_distance: int, exclude_case: str = None) -> list:
+    matches = get_similarity_index().search(fingerprints, max_distance, exclude_case=exclude_case)
+    if not matches:
+        return []
+
+    cases = {
+        c.id: c for c in db.query(Case).filter(Case.id.in_([m["case_id"] for m in matches])).all()
+    }
+
+    return [
+        {
+            **m,
+            "media_type": cases[m["case_id"]].media_type,
+            "filename": cases[m["case_id"]].filename,
+            "is_ai_generated": cases[m["case_id"]].is_ai_generated,
+            "confidence": cases[m["case_id"]].detection_score,
+            "created_at": cases[m["case_id"]].created_at.isoformat()
+        }
+        for m in matches
+        if m["case_id"] in cases
+    ]
 
 
 @router.post("/analyze")
 async def analyze_media(file: UploadFile = File(...)):
 
-    file.file.seek(0, 2)
-    size = file.file.tell()
-    file.file.seek(0)
+    filename = file.filename
 
-    if size > MAX_FILE_SIZE:
-        raise HTTPException(400, "File too large")
+    if is_image(filename):
+        media_type = "image"
+    elif is_video(filename):
+        media_type = "video"
+    else:
+        raise HTTPException(400, "Unsupported file type")
 
-    content = await file.read()
-    media_hash = calculate_file_hash(content)
+    try:
+        upload = await ingest_upload(file, UPLOAD_FOLDER, MAX_FILE_SIZE)
+    except UploadTooLargeError:
+        raise HTTPException(400, "File too large")
 
-    db = SessionLocal()
+    try:
+        return await analyze_spooled(upload, filename, media_type)
+    except AnalysisError as e:
+        raise HTTPException(500, str(e))
+    except StageBusyError as e:
+        raise HTTPException(503, str(e))
+    finally:
+        upload.discard()
+
+
+# ------------------------------------------------
+# Batch analysis
+
+def _media_type(filename: str):
+    if is_image(filename):
+        return "image"
+    if is_video(filename):
+        return "video"
+    return None
+
+
+def _next_archive_member(members) -> tuple:
+    """
+    Spool the next media member of an archive (blocking, io stage)
+
+    Returns (filename, media_type, upload, error), or None once the archive
+    is exhausted.
+    """
+    for name, stream in members:
+        filename = os.path.basename(name)
+
+        # Dotfiles and resource forks that archivers add next to real files
+        if not filename or filename.startswith(".") or "__MACOSX/" in name:
+            continue
+
+        media_type = _media_type(filename)
+        if media_type is None:
+            return filename, None, None, "Unsupported file type"
+
+        try:
+            return filename, media_type, spool_stream(stream, UPLOAD_FOLDER, MAX_FILE_SIZE), None
+        except UploadTooLargeError:
+            return filename, media_type, None, "File too large"
+
+    return None
+
+
+def _discard_spooled_member(job):
+    """Done-callback for a member spool nobody is waiting on any more"""
+    if job.cancelled() or job.exception() is not None:
+        return
+    entry = job.result()
+    if entry and entry[2]:
+        entry[2].discard()
+
+
+async def _batch_inputs(files: list):
+    """Every item of a batch as (filename, media_type, upload, error), archives expanded in order"""
+    pipeline = get_pipeline()
+
+    for file in files:
+        if not is_archive(file.filename):
+            media_type = _media_type(file.filename)
+            if media_type is None:
+                yield file.filename, None, None, "Unsupported file type"
+                continue
+
+            try:
+                upload = await ingest_upload(file, UPLOAD_FOLDER, MAX_FILE_SIZE)
+            except UploadTooLargeError:
+                yield file.filename, media_type, None, "File too large"
+                continue
+
+            yield file.filename, media_type, upload, None
+            continue
+
+        members = iter_archive(file.file, file.filename)
+        while True:
+            spool = asyncio.ensure_future(pipeline.io.run(_next_archive_member, members))
+            try:
+                entry = await asyncio.shield(spool)
+            except asyncio.CancelledError:
+                # The batch was abandoned mid-spool; drop the member once it lands
+                spool.add_done_callback(_discard_spooled_member)
+                raise
+            except StageBusyError:
+                raise
+            except Exception as e:
+                yield file.filename, "archive", None, f"Unreadable archive: {e}"
+                break
+
+            if entry is None:
+                break
+            yield entry
+
+
+async def _batch_events(files: list):
+    """
+    Analyse a batch, yielding ("item", item) as items progress and a final ("summary", summary)
+
+    Items are spooled one at a time (archives are never unpacked up front)
+    and identical files are only analysed once. At most BATCH_CONCURRENCY
+    items are in flight, which is what lets the detector score them in
+    micro-batches; reading further input waits for a free slot, so disk use
+    stays bounded however large the batch is. Closing the generator early
+    (a streaming client that disconnects) stops reading input and cancels
+    the analyses still in flight.
+    """
+    batch_id = generate_batch_id()
+    events = asyncio.Queue()
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    items = []
+    first_by_hash = {}
+    running = set()
+    outcome = {"truncated": False, "aborted": None}
+
+    def report(item: dict, **fields):
+        item.update(fields)
+        events.put_nowait(("item", dict(item)))
+
+    async def analyze(item: dict, upload):
+        try:
+            response = await analyze_spooled(upload, item["filename"], item["media_type"])
+            report(
+                item,
+                status="existing" if response["duplicate"] else "analyzed",
+                case_id=response["case_id"],
+                detection=response["detection"]
+            )
+        except Exception as e:
+            report(item, status="error", error=str(e))
+        finally:
+            upload.discard()
+            slots.release()
+
+    async def produce():
+        inputs = _batch_inputs(files)
+        try:
+            while True:
+                await slots.acquire()
+                try:
+                    filename, media_type, upload, error = await inputs.__anext__()
+                except StopAsyncIteration:
+                    slots.release()
+                    break
+
+                if len(items) >= BATCH_MAX_ITEMS:
+                    outcome["truncated"] = True
+                    if upload:
+                        upload.discard()
+                    slots.release()
+                    break
+
+                item = {"index": len(items), "filename": filename, "media_type": media_type}
+                items.append(item)
+
+                if error:
+                    report(item, status="skipped" if media_type is None else "error", error=error)
+                    slots.release()
+                    continue
+
+                item["sha256"] = upload.sha256
+                first = first_by_hash.get(upload.sha256)
+                if first is not None:
+                    upload.discard()
+                    slots.release()
+                    report(item, status="duplicate_in_batch", duplicate_of=first["index"])
+                    continue
+
+                first_by_hash[upload.sha256] = item
+                report(item, status="queued")
+
+                task = asyncio.ensure_future(analyze(item, upload))
+                running.add(task)
+                task.add_done_callback(running.discard)
+
+        except Exception as e:
+            outcome["aborted"] = str(e)
+        finally:
+            await inputs.aclose()
+            if running:
+                await asyncio.gather(*running)
+            events.put_nowait(None)
+
+    producer = asyncio.ensure_future(produce())
 
     try:
-        # ================= DUPLICATE =================
-        existing = db.query(Case).filter(Case.media_hash == media_hash).first()
-
-        if existing:
-            return {
-                "success": True,
-                "duplicate": True,
-                "case_id": existing.id,
-                "media_type": existing.media_type,
-                "filename": existing.filename,
-                "detection": {
-                    "is_ai_generated": existing.is_ai_generated,
-                    "confidence": existing.detection_score
-                },
-                "timestamp": existing.created_at.isoformat(),
-                "blockchain_tx": existing.blockchain_tx,
-                "blockchain_status": "anchored" if existing.blockchain_tx else "pending"
-            }
-
-        # ================= CREATE CASE =================
-        case_id = generate_case_id()
-        filename = file.filename
-
-        if is_image(filename):
-            media_type = "image"
-        elif is_video(filename):
-            media_type = "video"
-        else:
-            raise HTTPException(400, "Unsupported file type")
-
-        file_path = Path(UPLOAD_FOLDER) / f"{case_id}_{filename}"
-
-        with open(file_path, "wb") as f:
-            f.write(content)
-
-        # ================= AI DETECTION =================
-        detector = get_detector()
-
-        result = (
-            detector.detect_fake_image(str(file_path))
-            if media_type == "image"
-            else detector.detect_fake_video(str(file_path))
+        completed = 0
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+
+            kind, item = event
+            if item["status"] != "queued":
+                completed += 1
+            yield kind, {**item, "completed": completed}
+
+        await producer
+    finally:
+        if not producer.done():
+            # Nobody is listening: the producer's cleanup closes the input,
+            # each cancelled analysis discards its own upload
+            abandoned = [producer, *running]
+            for task in abandoned:
+                task.cancel()
+            await asyncio.gather(*abandoned, return_exceptions=True)
+
+    # Copies of a file inside the batch share the case of its first occurrence
+    for item in items:
+        if item["status"] == "duplicate_in_batch":
+            first = items[item["duplicate_of"]]
+            item["case_id"] = first.get("case_id")
+            item["detection"] = first.get("detection")
+
+    statuses = [item["status"] for item in items]
+    case_ids = sorted({item["case_id"] for item in items if item.get("case_id")})
+
+    yield "summary", {
+        "batch_id": batch_id,
+        "total_items": len(items),
+        "analyzed": statuses.count("analyzed"),
+        "existing": statuses.count("existing"),
+        "duplicates_in_batch": statuses.count("duplicate_in_batch"),
+        "skipped": statuses.count("skipped"),
+        "errors": statuses.count("error"),
+        "ai_generated": sum(
+            1 for item in items
+            if item["status"] in ("analyzed", "existing") and item["detection"]["is_ai_generated"]
+        ),
+        "truncated": outcome["truncated"],
+        "aborted": outcome["aborted"],
+        "cases": case_ids,
+        "items": items
+    }
+
+
+async def _sse(events):
+    try:
+        async for kind, payload in events:
+            yield f"event: {kind}\ndata: {json.dumps(payload, default=str)}\n\n"
+    finally:
+        # Runs when the client goes away too, so the batch stops with it
+        await events.aclose()
+
+
+@router.post("/batch")
+async def analyze_batch(files: list[UploadFile] = File(...), stream: bool = False):
+    """
+    Analyse many files, or ZIP/TAR archives of them, in one request
+
+    With `stream=true` the response is Server-Sent Events: an `item` event
+    each time an item is queued or finishes, then one `summary` event.
+    Otherwise the summary is returned once the whole batch is done.
+    """
+    if stream:
+        return StreamingResponse(
+            _sse(_batch_events(files)),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
         )
 
-        if result.get("error"):
-            raise HTTPException(500, result["error"])
+    summary = None
+    async for kind, payload in _batch_events(files):
+        if kind == "summary":
+            summary = payload
 
-        # ================= BLOCKCHAIN FIRST =================
-        blockchain = get_blockchain_service()
+    return summary
 
-        report_hash = hashlib.sha256(content).hexdigest()
-        blockchain_tx = None
-        blockchain_status = "pending"
 
-        if blockchain.enabled:
-            bc_result = blockchain.store_evidence(
-                case_id=case_id,
-                media_hash=media_hash,
-                report_hash=report_hash
-            )
+# ------------------------------------------------
+# Queued analysis (run by `python -m app.services.job_worker`)
 
-            if bc_result.get("success"):
-                blockchain_tx = bc_result["tx_hash"]
-                blockchain_status = "anchored"
-
-        # ================= SAVE CASE =================
-        case = Case(
-            id=case_id,
-            media_type=media_type,
-            filename=filename,
-            media_hash=media_hash,
-            detection_score=result["confidence"],
-            is_ai_generated=result["is_ai_generated"],
-            blockchain_tx=blockchain_tx,
-            report_path=None,
-            created_at=datetime.utcnow()
-        )
+@router.post("/jobs", status_code=202)
+async def submit_job(file: UploadFile = File(...), priority: int = 0):
+    """Queue a file for analysis and return at once; poll the status URL for the result"""
+    filename = file.filename
 
-        db.add(case)
-        db.commit()
-        db.refresh(case)
-
-        # ================= GENERATE PDF WITH REAL STATUS =================
-        pdf_gen = get_pdf_generator()
-
-        pdf_data = {
-            "case_id": case_id,
-            "timestamp": datetime.utcnow().isoformat(),
-            "media_type": media_type,
-            "filename": filename,
-            "media_hash": media_hash,
-            "confidence": result["confidence"],
-            "is_ai_generated": result["is_ai_generated"],
-            "model": result.get("model", "AI Detector"),
-            "detection_details": result,
-            "blockchain_tx": blockchain_tx
-        }
+    media_type = _media_type(filename)
+    if media_type is None:
+        raise HTTPException(400, "Unsupported file type")
 
-        pdf_path = pdf_gen.generate_report(pdf_data, str(file_path))
-
-        case.report_path = pdf_path
-        db.commit()
-
-        return {
-            "success": True,
-            "duplicate": False,
-            "case_id": case_id,
-            "media_type": media_type,
-            "filename": filename,
-            "detection": {
-                "is_ai_generated": result["is_ai_generated"],
-                "confidence": result["confidence"]
-            },
-            "timestamp": datetime.utcnow().isoformat(),
-            "blockchain_tx": blockchain_tx,
-            "blockchain_status": blockchain_status
-        }
+    try:
+        upload = await ingest_upload(file, UPLOAD_FOLDER, MAX_FILE_SIZE)
+    except UploadTooLargeError:
+        raise HTTPException(400, "File too large")
 
+    try:
+        job_id = await get_pipeline().db.run(enqueue_job, upload, filename, media_type, priority)
+    except StageBusyError as e:
+        raise HTTPException(503, str(e))
     finally:
-        db.close()
+        upload.discard()
+
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/detect/jobs/{job_id}"
+    }
+
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
 
 
 @router.get("/report/{case_id}")
-def download_report(case_id: str):
-    db = SessionLocal()
+async def download_report(case_id: str):
     try:
-        case = db.query(Case).filter(Case.id == case_id).first()
-        if not case or not case.report_path:
-            raise HTTPException(404, "Report not found")
-
-        return FileResponse(
-            case.report_path,
-            filename=f"{case_id}_forensic_report.pdf",
-            media_type="application/pdf"
-        )
+        report_path = await get_report_builder().get(case_id)
+    except StageBusyError as e:
+        raise HTTPException(503, str(e))
+
+    if not report_path:
+        raise HTTPException(404, "Report not found")
+
+    return FileResponse(
+        report_path,
+        filename=f"{case_id}_forensic_report.pdf",
+        media_type="application/pdf"
+    )
+
+
+@router.post("/similar")
+async def find_similar_media(
+    file: UploadFile = File(...),
+    max_distance: int = SIMILARITY_MAX_DISTANCE,
+    db: Session = Depends(get_db)
+):
+
+    if is_image(file.filename):
+        media_type = "image"
+    elif is_video(file.filename):
+        media_type = "video"
+    else:
+        raise HTTPException(400, "Unsupported file type")
+
+    pipeline = get_pipeline()
+
+    try:
+        upload = await ingest_upload(file, UPLOAD_FOLDER, MAX_FILE_SIZE)
+    except UploadTooLargeError:
+        raise HTTPException(400, "File too large")
+
+    try:
+        fingerprints = await pipeline.io.run(fingerprints_or_empty, upload.temp_path, media_type)
+        # The request's session is only ever used from one db-stage thread at a time
+        matches = await pipeline.db.run(_similar_cases, db, fingerprints, max_distance)
+    except StageBusyError as e:
+        raise HTTPException(503, str(e))
     finally:
-        db.close()
+        upload.discard()
+
+    return {
+        "media_hash": upload.sha256,
+        "query_frames": len(fingerprints),
+        "max_distance": max_distance,
+        "matches": matches
+    }
+
+
+@router.get("/similar/{case_id}")
+def find_similar_cases(case_id: str, max_distance: int = SIMILARITY_MAX_DISTANCE, db: Session = Depends(get_db)):
+    if not db.get(Case, case_id):
+        raise HTTPException(404, "Case not found")
+
+    fingerprints = load_fingerprints(db, case_id)
+
+    return {
+        "case_id": case_id,
+        "query_frames": len(fingerprints),
+        "max_distance": max_distance,
+        "matches": _similar_cases(db, fingerprints, max_distance, exclude_case=case_id)
+    }
+
+
+@router.get("/verify/{case_id}")
+def verify_case(case_id: str, db: Session = Depends(get_db)):
+    case = db.query(Case).filter(Case.id == case_id).first()
+    if not case:
+        raise HTTPException(404, "Case not found")
+
+    return verify_case_inclusion(db, case)
 
 
 @router.get("/cases")
-def list_cases(limit: int = 100):
-    db = SessionLocal()
+def list_cases(
+    limit: int = CASES_DEFAULT_LIMIT,
+    cursor: str = None,
+    media_type: str = None,
+    is_ai_generated: bool = None,
+    min_confidence: float = None,
+    max_confidence: float = None,
+    created_after: datetime = None,
+    created_before: datetime = None,
+    anchor_status: str = None,
+    format: str = "json",
+    db: Session = Depends(get_db)
+):
+    """
+    Cases newest first, filtered server-side
+
+    Pages are keyed on (created_at, id): pass `next_cursor` from one page as
+    `cursor` to get the next. `format=ndjson` streams every matching case,
+    one JSON object per line, ignoring limit and cursor.
+    """
+    if anchor_status is not None and anchor_status not in ANCHOR_STATUSES:
+        raise HTTPException(400, f"anchor_status must be one of {', '.join(ANCHOR_STATUSES)}")
+    if format not in ("json", "ndjson"):
+        raise HTTPException(400, "format must be json or ndjson")
+
+    filters = {
+        "media_type": media_type,
+        "is_ai_generated": is_ai_generated,
+        "min_confidence": min_confidence,
+        "max_confidence": max_confidence,
+        "created_after": created_after,
+        "created_before": created_before,
+        "anchor_status": anchor_status
+    }
+
+    if format == "ndjson":
+        return StreamingResponse(iter_ndjson(filters), media_type="application/x-ndjson")
+
     try:
-        cases = db.query(Case).order_by(Case.created_at.desc()).limit(limit).all()
-
-        return {
-            "cases": [
-                {
-                    "case_id": c.id,
-                    "media_type": c.media_type,
-                    "filename": c.filename,
-                    "is_ai_generated": c.is_ai_generated,
-                    "confidence": c.detection_score,
-                    "blockchain_tx": c.blockchain_tx,
-                    "created_at": c.created_at.isoformat()
-                }
-                for c in cases
-            ]
-        }
-    finally:
-        db.close()
\ No newline at end of file
+        return fetch_page(db, filters, cursor, max(1, min(limit, CASES_MAX_LIMIT)))
+    except InvalidCursorError:
+        raise HTTPException(400, "Invalid cursor")
+
+
+@router.get("/analytics")
+def case_analytics(start: date = None, end: date = None, db: Session = Depends(get_db)):
+    """Dashboard totals, ratios, histograms and anchoring rates from the rollup tables"""
+    return analytics_summary(db, start, end)
+
+
+@router.get("/stats")
+def pipeline_stats():
+    return {
+        "batching": get_detector_stats(),
+        "inference_pool": get_inference_pool().stats(),
+        "pipeline": get_pipeline().stats(),
+        "anchoring": anchor_queue_stats(),
+        "verdict_cache": get_verdict_cache().stats(),
+        "similarity_index": get_similarity_index().stats(),
+        "reports": get_report_builder().stats(),
+        "jobs": job_queue_stats(),
+        "media_store": get_media_store().stats()
+    }
@@ -1,15 +1,166 @@
-from transformers import pipeline
 from PIL import Image
-import torch
 import numpy as np
 import cv2
 import os
+import json
+import hashlib
+import threading
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
 from pathlib import Path
 
+from .batching import MicroBatcher
+from .frame_sampler import FrameSampler, MIN_FRAME_STRIDE
+from .inference_backends import create_backend, probe_images, DETECTOR_BACKEND
+from .readiness import get_readiness, LOADING, READY, FAILED
+from .artifacts import analyze_frames, metadata_score, ARTIFACT_VERSION
+from .sequential import SequentialScorer, VIDEO_MIN_FRAMES, VIDEO_CONFIDENCE_Z, VIDEO_MIN_STD
+from .scene_filter import (
+    SceneFilter,
+    VIDEO_SCENE_FILTER,
+    VIDEO_SCENE_OVERSAMPLE,
+    VIDEO_SCENE_DHASH_THRESHOLD,
+    VIDEO_SCENE_HIST_THRESHOLD
+)
+
+# Micro-batching of concurrent classifier calls
+MAX_BATCH_SIZE = int(os.getenv("DETECTOR_MAX_BATCH_SIZE", "8"))
+MAX_BATCH_WAIT_MS = float(os.getenv("DETECTOR_MAX_WAIT_MS", "10"))
+
+# Sampled video frames are handed to the batcher in chunks of this size
+VIDEO_FRAME_BATCH = int(os.getenv("DETECTOR_VIDEO_FRAME_BATCH", str(MAX_BATCH_SIZE)))
+
+# Frames scored per video, spread uniformly over the whole clip
+MAX_VIDEO_FRAMES = int(os.getenv("DETECTOR_MAX_VIDEO_FRAMES", "40"))
+
+# Stop scoring a video once the verdict is statistically settled
+VIDEO_ADAPTIVE = os.getenv("DETECTOR_VIDEO_ADAPTIVE", "true").lower() in ("1", "true", "yes")
+
+# single: first model that loads; ensemble: every configured model, weighted
+DETECTOR_MODE = os.getenv("DETECTOR_MODE", "single").lower()
+
+# "model=weight,model=weight"; unlisted models weigh 1.0
+ENSEMBLE_WEIGHTS = os.getenv("DETECTOR_ENSEMBLE_WEIGHTS", "")
+# Models still running after this are left out of the combined score
+ENSEMBLE_DEADLINE_MS = float(os.getenv("DETECTOR_ENSEMBLE_DEADLINE_MS", "5000"))
+
+# Report forensic artifact scores in each verdict's breakdown. Opt-in: it
+# needs a full-resolution decode, which rules out the ensemble's draft decode
+ARTIFACT_ANALYSIS = os.getenv("DETECTOR_ARTIFACT_ANALYSIS", "false").lower() in ("1", "true", "yes")
+# Share of the final score taken by the artifact score (implies the analysis).
+# Off by default: the calibration constants in artifacts.py are not yet
+# fitted to labelled data
+ARTIFACT_WEIGHT = float(os.getenv("DETECTOR_ARTIFACT_WEIGHT", "0"))
+_ARTIFACTS_ON = ARTIFACT_ANALYSIS or ARTIFACT_WEIGHT > 0
+
+
+def _parse_weights(spec: str) -> dict:
+    weights = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, weight = part.rsplit("=", 1)
+            weights[name.strip()] = float(weight)
+    return weights
+
+
+class ModelMember:
+    """One resident classifier with its own backend, batcher and latency counters"""
+
+    def __init__(self, model_name: str, classifier, backend, parity, weight: float = 1.0):
+        self.model_name = model_name
+        self.classifier = classifier
+        self.backend = backend
+        self.parity = parity
+        self.weight = weight
+
+        self._start_batcher()
+
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def _start_batcher(self):
+        # Each model batches (and runs) on its own thread, so ensemble
+        # members score the same images concurrently
+        self.batcher = MicroBatcher(
+            self.backend.classify,
+            max_batch_size=MAX_BATCH_SIZE,
+            max_wait_ms=MAX_BATCH_WAIT_MS,
+            name=self.model_name
+        )
+
+    def after_fork(self, threads: int):
+        """Threads and locks don't survive fork: new batcher, fresh counters"""
+        self.backend.after_fork(threads)
+        self._lock = threading.Lock()
+        self._start_batcher()
+        self.reset_stats()
+
+    def track(self, futures: list, started: float) -> dict:
+        """
+        Record this model's latency once every future of a call resolves
+
+        Late members are timed too, so the counters show how slow a dropped
+        model really was. The returned dict receives "latency" on completion.
+        """
+        timing = {}
+        remaining = [len(futures)]
+
+        def on_done(_):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+                latency = time.perf_counter() - started
+                timing["latency"] = latency
+                self._calls += 1
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+
+        for future in futures:
+            future.add_done_callback(on_done)
+
+        return timing
+
+    def record_dropped(self):
+        with self._lock:
+            self._dropped += 1
+
+    def reset_stats(self):
+        self.batcher.reset_stats()
+        self._calls = 0
+        self._dropped = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.batcher.stats(),
+                "backend": self.backend.name,
+                "backend_parity": self.parity,
+                "weight": self.weight,
+                "calls": self._calls,
+                "dropped": self._dropped,
+                "avg_latency_ms": round(self._latency_total / self._calls * 1000, 3) if self._calls else 0.0,
+                "max_latency_ms": round(self._latency_max * 1000, 3),
+            }
+
+
+def _input_side(classifier) -> int:
+    """Largest side the classifier's image processor resizes to"""
+    size = getattr(getattr(classifier, "image_processor", None), "size", None) or {}
+    if isinstance(size, int):
+        return size
+    return max([v for v in size.values() if isinstance(v, int)] or [224])
+
 
 class AIDetector:
     def __init__(self):
         """Initialize AI detection models"""
+        # Deferred so importing the app (and serving /health) never waits on them
+        import torch
+        from transformers import pipeline
+
         print("\nLoading AI detection models...\n")
 
         # Use GPU if available, else CPU
@@ -22,67 +173,238 @@ class AIDetector:
             "umm-maybe/AI-image-detector",            # Lightweight fallback
         ]
 
-        self.image_classifier = None
-        self.model_name = None
+        self.mode = "ensemble" if DETECTOR_MODE == "ensemble" else "single"
+        weights = _parse_weights(ENSEMBLE_WEIGHTS)
+
+        self.members = []
 
         for model_name in self.models_to_try:
             try:
                 print(f"Trying to load: {model_name}")
 
-                self.image_classifier = pipeline(
+                classifier = pipeline(
                     "image-classification",
                     model=model_name,
                     device=self.device
                 )
 
-                self.model_name = model_name
                 print(f"✅ Loaded model: {model_name}\n")
-                break
 
             except Exception as e:
                 print(f"❌ Failed loading {model_name}: {str(e)}\n")
                 continue
 
-        if self.image_classifier is None:
+            # Forward passes go through the selected backend (torch unless an
+            # ONNX variant loads and passes its parity check)
+            backend, parity = create_backend(
+                DETECTOR_BACKEND,
+                classifier,
+                model_name,
+                lambda results: self._score_results(results)["confidence"]
+            )
+
+            self.members.append(ModelMember(model_name, classifier, backend, parity, weights.get(model_name, 1.0)))
+
+            if self.mode == "single":
+                break
+
+        if not self.members:
             raise RuntimeError("No AI detection model could be loaded!")
 
+        primary = self.members[0]
+        self.image_classifier = primary.classifier
+        self.backend = primary.backend
+        self.backend_parity = primary.parity
+        self.batcher = primary.batcher
+
+        if self.mode == "single":
+            self.model_name = primary.model_name
+        else:
+            self.model_name = "ensemble:" + "+".join(m.model_name for m in self.members)
+
+        # Ensemble members share one decode + downscale per image; this is
+        # the largest input side any member's processor asks for
+        self.shared_input_size = max(_input_side(m.classifier) for m in self.members)
+
+        # Everything that changes the verdict for the same bytes; cached
+        # verdicts are only reused when this matches
+        self.config = {
+            "model": self.model_name,
+            "backend": self.backend.name,
+            "scoring": "label-keywords-v1",
+            "max_video_frames": MAX_VIDEO_FRAMES,
+            "min_frame_stride": MIN_FRAME_STRIDE,
+        }
+        if VIDEO_ADAPTIVE:
+            self.config["video_early_exit"] = {
+                "min_frames": VIDEO_MIN_FRAMES,
+                "z": VIDEO_CONFIDENCE_Z,
+                "min_std": VIDEO_MIN_STD,
+            }
+        if VIDEO_SCENE_FILTER:
+            self.config["video_scene_filter"] = {
+                "oversample": VIDEO_SCENE_OVERSAMPLE,
+                "dhash_threshold": VIDEO_SCENE_DHASH_THRESHOLD,
+                "hist_threshold": VIDEO_SCENE_HIST_THRESHOLD,
+            }
+        if _ARTIFACTS_ON:
+            self.config["artifacts"] = {"version": ARTIFACT_VERSION, "weight": ARTIFACT_WEIGHT}
+        if self.mode == "ensemble":
+            self.config["ensemble"] = {
+                "weights": {m.model_name: m.weight for m in self.members},
+                "backends": {m.model_name: m.backend.name for m in self.members},
+                "shared_input_size": self.shared_input_size,
+            }
+        self.config_hash = hashlib.sha256(
+            json.dumps(self.config, sort_keys=True).encode()
+        ).hexdigest()[:16]
+
         print("AI Detection Service initialized successfully 🚀")
 
     # ------------------------------------------------
 
+    def _score_results(self, results: list, model_name: str = None) -> dict:
+        """Turn raw classifier labels into an AI-generation verdict"""
+        ai_score = 0.0
+        real_score = 0.0
+
+        for r in results:
+            label = r["label"].lower()
+            score = float(r["score"])
+
+            if any(word in label for word in ["fake", "ai", "generated", "artificial"]):
+                ai_score = max(ai_score, score)
+
+            if any(word in label for word in ["real", "authentic", "human", "natural"]):
+                real_score = max(real_score, score)
+
+        # Normalize if needed
+        if ai_score == 0 and real_score > 0:
+            ai_score = 1 - real_score
+
+        is_ai = ai_score >= 0.5
+
+        return {
+            "is_ai_generated": is_ai,
+            "confidence": round(ai_score, 4),
+            "model_used": model_name or self.model_name,
+            "raw_results": results
+        }
+
+    def _shared_preprocess(self, image: Image.Image) -> Image.Image:
+        """Downscale once so no member resizes a full-resolution image itself"""
+        side = self.shared_input_size
+        if min(image.size) <= side:
+            return image
+
+        scale = side / min(image.size)
+        return image.resize((round(image.width * scale), round(image.height * scale)), Image.BICUBIC)
+
+    def _score_images(self, images: list) -> list:
+        """Verdicts for RGB PIL images, from one model or the weighted ensemble"""
+        if self.mode == "single":
+            # Submit the whole chunk at once so the images share forward passes
+            return [self._score_results(r) for r in self.batcher.run_many(images)]
+
+        images = [self._shared_preprocess(img) for img in images]
+
+        started = time.perf_counter()
+        pending = {}
+        timings = {}
+        for member in self.members:
+            pending[member] = [member.batcher.submit(img) for img in images]
+            timings[member] = member.track(pending[member], started)
+
+        all_futures = [f for futures in pending.values() for f in futures]
+        done, _ = wait(all_futures, timeout=ENSEMBLE_DEADLINE_MS / 1000.0)
+
+        finished = [m for m, futures in pending.items() if all(f in done for f in futures)]
+        # Nothing made the deadline; take whichever model finishes first
+        # rather than failing the request
+        outstanding = [f for f in all_futures if f not in done]
+        while not finished:
+            _, outstanding = wait(outstanding, return_when=FIRST_COMPLETED)
+            finished = [m for m, futures in pending.items() if all(f.done() for f in futures)]
+
+        latency = time.perf_counter() - started
+        dropped = [m for m in self.members if m not in finished]
+        for member in dropped:
+            member.record_dropped()
+
+        # Done callbacks can trail the waiter by a moment; fall back to the wall time
+        model_latency_ms = {
+            m.model_name: round(timings[m].get("latency", latency) * 1000, 3) for m in finished
+        }
+
+        verdicts = []
+        for i in range(len(images)):
+            scores = {}
+            for member in finished:
+                # A member whose batch failed is left out like a late one
+                try:
+                    scores[member] = self._score_results(pending[member][i].result(), member.model_name)["confidence"]
+                except Exception as e:
+                    print(f"⚠️ {member.model_name} failed: {e}")
+
+            if not scores:
+                raise RuntimeError("No ensemble member produced a score")
+
+            total_weight = sum(m.weight for m in scores)
+            confidence = sum(m.weight * score for m, score in scores.items()) / total_weight
+
+            verdicts.append({
+                "is_ai_generated": confidence >= 0.5,
+                "confidence": round(confidence, 4),
+                "model_used": self.model_name,
+                "model_scores": {m.model_name: score for m, score in scores.items()},
+                "model_latency_ms": model_latency_ms,
+                "dropped_models": [m.model_name for m in dropped],
+                "ensemble_latency_ms": round(latency * 1000, 3)
+            })
+
+        return verdicts
+
+    def _blend(self, verdict: dict, artifacts: dict) -> dict:
+        """Attach the artifact score, folding it into the verdict only if ARTIFACT_WEIGHT > 0"""
+        ml_score = verdict["confidence"]
+        if ARTIFACT_WEIGHT > 0:
+            confidence = round((1 - ARTIFACT_WEIGHT) * ml_score + ARTIFACT_WEIGHT * artifacts["artifact_score"], 4)
+            is_ai_generated = confidence >= 0.5
+        else:
+            confidence = ml_score
+            is_ai_generated = verdict["is_ai_generated"]
+
+        return {
+            **verdict,
+            "is_ai_generated": is_ai_generated,
+            "confidence": confidence,
+            "breakdown": {
+                "ml_model_score": ml_score,
+                "artifact_score": artifacts["artifact_score"],
+                "artifact_features": artifacts["features"]
+            }
+        }
+
     def detect_fake_image(self, image_path: str) -> dict:
         """Detect AI-generated image"""
 
         try:
-            image = Image.open(image_path).convert("RGB")
-
-            results = self.image_classifier(image)
-
-            ai_score = 0.0
-            real_score = 0.0
+            with Image.open(image_path) as img:
+                metadata = metadata_score(dict(img.getexif()), img.info) if _ARTIFACTS_ON else None
 
-            for r in results:
-                label = r["label"].lower()
-                score = float(r["score"])
+                # JPEG can decode straight to a reduced size; artifact analysis
+                # needs the full-resolution pixels (and the 8x8 grid) though
+                if self.mode == "ensemble" and not _ARTIFACTS_ON:
+                    img.draft("RGB", (self.shared_input_size, self.shared_input_size))
+                image = img.convert("RGB")
 
-                if any(word in label for word in ["fake", "ai", "generated", "artificial"]):
-                    ai_score = max(ai_score, score)
+            verdict = self._score_images([image])[0]
 
-                if any(word in label for word in ["real", "authentic", "human", "natural"]):
-                    real_score = max(real_score, score)
+            if _ARTIFACTS_ON:
+                artifacts = analyze_frames(np.asarray(image), metadata=[metadata])[0]
+                verdict = self._blend(verdict, artifacts)
 
-            # Normalize if needed
-            if ai_score == 0 and real_score > 0:
-                ai_score = 1 - real_score
-
-            is_ai = ai_score >= 0.5
-
-            return {
-                "is_ai_generated": is_ai,
-                "confidence": round(ai_score, 4),
-                "model_used": self.model_name,
-                "raw_results": results
-            }
+            return verdict
 
         except Exception as e:
             return {
@@ -91,64 +413,169 @@ class AIDetector:
                 "confidence": 0.0
             }
 
-    # ------------------------------------------------
+    def detect_fake_frames(self, frames: list) -> list:
+        """
+        Score decoded frames without touching the filesystem
 
-    def detect_fake_video(self, video_path: str, sample_rate: int = 15) -> dict:
-        """Detect deepfake video using frame sampling"""
+        Args:
+            frames: OpenCV BGR arrays or PIL images
 
-        try:
-            cap = cv2.VideoCapture(video_path)
+        Returns:
+            One verdict dict per frame
+        """
+        arrays = [
+            cv2.cvtColor(f, cv2.COLOR_BGR2RGB) if isinstance(f, np.ndarray) else np.asarray(f.convert("RGB"))
+            for f in frames
+        ]
 
-            if not cap.isOpened():
-                return {"error": "Unable to open video"}
+        verdicts = self._score_images([Image.fromarray(a) for a in arrays])
 
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if not _ARTIFACTS_ON:
+            return verdicts
 
-            analyzed = 0
-            ai_scores = []
+        # Frames of one video share a size and go through as a single batch
+        if len({a.shape for a in arrays}) == 1:
+            artifacts = analyze_frames(arrays)
+        else:
+            artifacts = [analyze_frames(a)[0] for a in arrays]
+
+        return [self._blend(v, a) for v, a in zip(verdicts, artifacts)]
+
+    def warm_up(self) -> float:
+        """
+        Push one full synthetic batch through the batcher
+
+        The first forward pass pays for lazy kernel/graph initialisation;
+        doing it here keeps that off the first real request.
+
+        Returns:
+            Seconds taken
+        """
+        started = time.perf_counter()
+        self._score_images(probe_images(MAX_BATCH_SIZE))
+        return time.perf_counter() - started
 
-            max_frames = min(40, total_frames // sample_rate + 1)
+    def reset_stats(self):
+        for member in self.members:
+            member.reset_stats()
 
-            frame_index = 0
+    def after_fork(self, threads: int):
+        """Re-initialise thread state in a forked inference worker"""
+        for member in self.members:
+            member.after_fork(threads)
+        self.batcher = self.members[0].batcher
 
-            while cap.isOpened() and analyzed < max_frames:
-                ret, frame = cap.read()
-                if not ret:
-                    break
+    def batch_stats(self) -> dict:
+        """Micro-batching and per-model latency counters"""
+        if self.mode == "single":
+            return self.members[0].stats()
 
-                if frame_index % sample_rate == 0:
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    pil_img = Image.fromarray(frame_rgb)
+        return {
+            "mode": self.mode,
+            "deadline_ms": ENSEMBLE_DEADLINE_MS,
+            "models": {m.model_name: m.stats() for m in self.members}
+        }
 
-                    temp_path = f"/tmp/frame_{analyzed}.jpg"
-                    pil_img.save(temp_path)
+    # ------------------------------------------------
 
-                    result = self.detect_fake_image(temp_path)
+    def detect_fake_video(self, video_path: str, max_frames: int = MAX_VIDEO_FRAMES, adaptive: bool = VIDEO_ADAPTIVE) -> dict:
+        """
+        Detect deepfake video using uniform temporal frame sampling
 
-                    if result.get("confidence") is not None:
-                        ai_scores.append(result["confidence"])
+        In adaptive mode frames arrive coarse to fine and scoring stops as
+        soon as the running confidence interval clears the 0.5 threshold.
+        With the scene filter on, more candidates than `max_frames` are
+        decoded and only frames unlike those already scored are classified.
+        """
 
-                    os.remove(temp_path)
-                    analyzed += 1
+        try:
+            started = time.perf_counter()
 
-                frame_index += 1
+            scene_filter = SceneFilter() if VIDEO_SCENE_FILTER else None
+            oversample = VIDEO_SCENE_OVERSAMPLE if scene_filter else 1
+            sampler = FrameSampler(video_path, max_frames=max_frames * oversample)
 
-            cap.release()
+            analyzed = 0
+            ai_scores = []
+            breakdowns = []
+            pending = []
+            inference_time = 0.0
+
+            if adaptive:
+                scorer = SequentialScorer(max_frames=max_frames)
+                frames = sampler.sample_coarse_to_fine(scorer.min_frames, VIDEO_FRAME_BATCH)
+                chunk_size = scorer.min_frames
+            else:
+                scorer = None
+                frames = sampler.sample()
+                chunk_size = VIDEO_FRAME_BATCH
+
+            try:
+                for _, _, frame in frames:
+                    if analyzed + len(pending) >= max_frames:
+                        break
+                    if scene_filter and not scene_filter.accept(frame):
+                        continue
+
+                    pending.append(frame)
+
+                    if len(pending) < chunk_size:
+                        continue
+
+                    inference_time += self._score_frame_chunk(pending, ai_scores, breakdowns)
+                    analyzed += len(pending)
+                    pending = []
+                    chunk_size = VIDEO_FRAME_BATCH
+
+                    if scorer:
+                        for score in ai_scores[scorer.n:]:
+                            scorer.add(score)
+                        if scorer.should_stop():
+                            break
+            finally:
+                # Releases the capture without decoding the remaining rounds
+                frames.close()
+
+            if pending:
+                inference_time += self._score_frame_chunk(pending, ai_scores, breakdowns)
+                analyzed += len(pending)
 
             if not ai_scores:
                 return {"error": "No frames processed"}
 
+            elapsed = time.perf_counter() - started
             avg_conf = float(np.mean(ai_scores))
             max_conf = float(np.max(ai_scores))
 
-            return {
+            result = {
                 "is_ai_generated": avg_conf >= 0.5,
                 "confidence": round(avg_conf, 4),
                 "max_confidence": round(max_conf, 4),
                 "frames_analyzed": analyzed,
+                "frames_per_second": round(analyzed / elapsed, 2) if elapsed > 0 else None,
+                "inference_frames_per_second": round(analyzed / inference_time, 2) if inference_time > 0 else None,
+                "processing_seconds": round(elapsed, 3),
+                "sampling": sampler.stats(),
                 "model_used": self.model_name
             }
 
+            if scorer:
+                for score in ai_scores[scorer.n:]:
+                    scorer.add(score)
+                scorer.finish()
+                result["early_exit"] = {**scorer.summary(), "frames_planned": min(sampler.planned, max_frames)}
+
+            if scene_filter:
+                result["scene_selection"] = {**scene_filter.stats(), "candidates_planned": sampler.planned}
+
+            if breakdowns:
+                result["breakdown"] = {
+                    "ml_model_score": round(float(np.mean([b["ml_model_score"] for b in breakdowns])), 4),
+                    "artifact_score": round(float(np.mean([b["artifact_score"] for b in breakdowns])), 4)
+                }
+
+            return result
+
         except Exception as e:
             return {
                 "error": str(e),
@@ -156,17 +583,89 @@ class AIDetector:
                 "confidence": 0.0
             }
 
+    def _score_frame_chunk(self, frames: list, ai_scores: list, breakdowns: list) -> float:
+        """Score a chunk of frames in memory, returning the inference time"""
+        started = time.perf_counter()
+
+        for result in self.detect_fake_frames(frames):
+            if result.get("confidence") is not None:
+                ai_scores.append(result["confidence"])
+                if "breakdown" in result:
+                    breakdowns.append(result["breakdown"])
+
+        return time.perf_counter() - started
+
 
 # ------------------------------------------------
 # Singleton loader (so model loads only once)
 
 _detector_instance = None
+_detector_lock = threading.Lock()
 
 
 def get_detector():
     global _detector_instance
 
+    # Inference runs on several threads; only the first one loads the model
+    with _detector_lock:
+        if _detector_instance is None:
+            _detector_instance = AIDetector()
+
+    return _detector_instance
+
+
+def load_detector_in_background():
+    """Load and warm up the detector on a daemon thread, reporting readiness"""
+    readiness = get_readiness()
+
+    def load():
+        readiness.set("model", LOADING)
+        started = time.perf_counter()
+
+        try:
+            detector = get_detector()
+            load_seconds = time.perf_counter() - started
+
+            from .worker_pool import get_inference_pool
+            pool = get_inference_pool()
+
+            if pool.enabled:
+                # Workers load and warm up in their own processes; the model
+                # is only ready once every one of them has reported in
+                pool.start()
+                try:
+                    pool.wait_ready()
+                except Exception:
+                    pool.stop()
+                    raise
+                warm_up_seconds = 0.0
+            else:
+                warm_up_seconds = detector.warm_up()
+                # Warm-up traffic shouldn't show up in the batching counters
+                detector.reset_stats()
+        except Exception as e:
+            print(f"❌ Model load failed: {e}")
+            readiness.set("model", FAILED, error=str(e))
+            return
+
+        print(f"🔥 Model warm: loaded in {load_seconds:.1f}s, warm-up batch {warm_up_seconds:.2f}s")
+        readiness.set(
+            "model",
+            READY,
+            model=detector.model_name,
+            backend=detector.backend.name,
+            load_seconds=round(load_seconds, 2),
+            warm_up_seconds=round(warm_up_seconds, 3)
+        )
+
+    thread = threading.Thread(target=load, name="model-loader", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_detector_stats():
+    """Batching stats for the loaded detector, or None if not loaded yet"""
     if _detector_instance is None:
-        _detector_instance = AIDetector()
+        return None
 
-    return _detector_instance
\ No newline at end of file
+    return _detector_instance.batch_stats()
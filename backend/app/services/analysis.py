@@ -0,0 +1,228 @@
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy.exc import IntegrityError
+
+from ..models import SessionLocal, Case
+from ..utils import generate_case_id
+from .ai_detector import get_detector
+from .analytics import record_case
+from .anchoring import enqueue_anchor, get_anchor_status, get_anchor_worker
+from .media_store import get_media_store
+from .phash import compute_media_fingerprints
+from .pipeline import get_pipeline
+from .report_builder import get_report_builder, REPORT_PREBUILD
+from .similarity_index import (
+    get_similarity_index,
+    fingerprint_rows,
+    near_duplicate_verdict,
+    NEAR_DUPLICATE_SKIP_INFERENCE
+)
+from .verdict_cache import get_verdict_cache
+from .worker_pool import get_inference_pool
+
+# Uploads are spooled here, then moved into the media store
+UPLOAD_FOLDER = "uploads"
+MAX_FILE_SIZE = 50 * 1024 * 1024
+
+Path(UPLOAD_FOLDER).mkdir(exist_ok=True)
+
+
+class AnalysisError(RuntimeError):
+    """The detector could not score the media"""
+
+
+def _find_existing_case(media_hash: str):
+    """Snapshot of the case already holding this hash, if any"""
+    db = SessionLocal()
+    try:
+        existing = db.query(Case).filter(Case.media_hash == media_hash).first()
+
+        if not existing:
+            return None
+
+        return {
+            "case_id": existing.id,
+            "media_type": existing.media_type,
+            "filename": existing.filename,
+            "timestamp": existing.created_at.isoformat(),
+            "blockchain_tx": existing.blockchain_tx,
+            "blockchain_status": get_anchor_status(db, existing)
+        }
+    finally:
+        db.close()
+
+
+def _run_detection(media_type: str, file_path: str) -> dict:
+    method = "detect_fake_image" if media_type == "image" else "detect_fake_video"
+
+    # Forked inference workers when configured, else this process's detector
+    pool = get_inference_pool()
+    if pool.running:
+        try:
+            return pool.run(method, file_path)
+        except Exception as e:
+            return {"error": str(e), "is_ai_generated": None, "confidence": 0.0}
+
+    return getattr(get_detector(), method)(file_path)
+
+
+def fingerprints_or_empty(file_path: str, media_type: str) -> list:
+    # Near-duplicate search is best effort; never fail an analysis over it
+    try:
+        return compute_media_fingerprints(file_path, media_type)
+    except Exception as e:
+        print(f"⚠️ Fingerprinting failed: {e}")
+        return []
+
+
+def _save_case(case: Case, report_hash: str, fingerprints: list):
+    """
+    Persist the case together with its media reference, anchoring job and fingerprints
+
+    Returns:
+        None once saved, or the snapshot of the case that a concurrent
+        upload of the same media saved first (nothing of ours is kept)
+    """
+    case_id = case.id
+
+    db = SessionLocal()
+    try:
+        db.add(case)
+        db.flush()
+        get_media_store().acquire(db, case.media_hash)
+        enqueue_anchor(db, case_id, case.media_hash, report_hash)
+        record_case(db, case)
+        db.add_all(fingerprint_rows(case_id, fingerprints))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = _find_existing_case(case.media_hash)
+        if existing is None:
+            raise
+        return existing
+    finally:
+        db.close()
+
+    get_similarity_index().add(case_id, fingerprints)
+    return None
+
+
+def _duplicate_result(existing: dict, result: dict) -> dict:
+    return {
+        "success": True,
+        "duplicate": True,
+        **existing,
+        "detection": {
+            "is_ai_generated": result["is_ai_generated"],
+            "confidence": result["confidence"],
+            "model_used": result.get("model_used")
+        }
+    }
+
+
+async def analyze_spooled(upload, filename: str, media_type: str, prebuild_report: bool = REPORT_PREBUILD) -> dict:
+    """
+    Score a spooled upload and open its case (or report the existing one)
+
+    The caller owns the upload and discards it afterwards. Raises
+    AnalysisError when detection fails and StageBusyError when a pipeline
+    stage is full.
+    """
+    pipeline = get_pipeline()
+    media_hash = upload.sha256
+
+    detector = await pipeline.inference.run(get_detector)
+    cache = get_verdict_cache()
+    cache_key = (detector.model_name, detector.config_hash)
+
+    # ================= VERDICT CACHE =================
+    # In-process tier first; the table is only consulted on a miss
+    result = None
+    if cache.is_active(*cache_key):
+        result = cache.get_memory(media_hash, *cache_key)
+    if result is None:
+        result = await pipeline.db.run(cache.get_persistent, media_hash, *cache_key)
+
+    # ================= DUPLICATE =================
+    existing = await pipeline.db.run(_find_existing_case, media_hash)
+
+    if existing:
+        if result is None:
+            # Known media, but not yet scored by the current model/config
+            result = await pipeline.inference.run(_run_detection, existing["media_type"], upload.temp_path)
+
+            if result.get("error"):
+                raise AnalysisError(result["error"])
+
+            await pipeline.db.run(cache.put, media_hash, *cache_key, result)
+
+        return _duplicate_result(existing, result)
+
+    # ================= CREATE CASE =================
+    case_id = generate_case_id()
+
+    # Stored by content; the case takes its reference when it is saved
+    file_path = await pipeline.io.run(get_media_store().put, upload)
+
+    fingerprints = await pipeline.io.run(fingerprints_or_empty, file_path, media_type)
+
+    # ================= AI DETECTION =================
+    if result is None and NEAR_DUPLICATE_SKIP_INFERENCE:
+        result = await pipeline.db.run(near_duplicate_verdict, fingerprints, media_type)
+
+    if result is None:
+        result = await pipeline.inference.run(_run_detection, media_type, file_path)
+
+        if result.get("error"):
+            raise AnalysisError(result["error"])
+
+        await pipeline.db.run(cache.put, media_hash, *cache_key, result)
+
+    # ================= SAVE CASE + QUEUE ANCHORING =================
+    # The report is bound to the exact bytes that were analysed
+    report_hash = media_hash
+    blockchain_tx = None
+    blockchain_status = "pending"
+
+    case = Case(
+        id=case_id,
+        media_type=media_type,
+        filename=filename,
+        media_hash=media_hash,
+        detection_score=result["confidence"],
+        is_ai_generated=result["is_ai_generated"],
+        blockchain_tx=blockchain_tx,
+        report_path=None,
+        created_at=datetime.utcnow(),
+        model_name=detector.model_name,
+        config_hash=detector.config_hash
+    )
+
+    existing = await pipeline.db.run(_save_case, case, report_hash, fingerprints)
+    if existing:
+        # A concurrent upload of the same media opened its case first
+        return _duplicate_result(existing, result)
+
+    get_anchor_worker().wake()
+
+    # ================= REPORT =================
+    # Rendered off the request path; a download joins or starts the build
+    if prebuild_report:
+        get_report_builder().prebuild(case_id)
+
+    return {
+        "success": True,
+        "duplicate": False,
+        "case_id": case_id,
+        "media_type": media_type,
+        "filename": filename,
+        "detection": {
+            "is_ai_generated": result["is_ai_generated"],
+            "confidence": result["confidence"],
+            "near_duplicate_of": result.get("near_duplicate_of")
+        },
+        "timestamp": datetime.utcnow().isoformat(),
+        "blockchain_tx": blockchain_tx,
+        "blockchain_status": blockchain_status
+    }
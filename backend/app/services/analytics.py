@@ -0,0 +1,240 @@
+"""
+Dashboard analytics from pre-aggregated rollup tables.
+
+Cases are counted into case_daily_rollup and case_confidence_rollup in the
+same transaction that saves or anchors them, so dashboard queries read a
+few rows per day instead of scanning cases. To backfill or repair the
+rollups from the cases table:
+
+    python -m app.services.analytics --rebuild
+"""
+import argparse
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import select, update, insert, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..models import engine, Case, CaseDailyRollup, CaseConfidenceRollup
+
+# Width of the confidence histogram; changing it needs a --rebuild
+CONFIDENCE_BUCKETS = 10
+
+# Rollup key for cases saved without a media type; the key is part of the
+# rollups' primary key, so it cannot be NULL
+UNKNOWN_MEDIA_TYPE = "unknown"
+
+
+def confidence_bucket(confidence: float) -> int:
+    return min(max(int(confidence * CONFIDENCE_BUCKETS), 0), CONFIDENCE_BUCKETS - 1)
+
+
+def media_key(media_type: str) -> str:
+    return media_type or UNKNOWN_MEDIA_TYPE
+
+
+def _increment(db, model, keys: dict, deltas: dict):
+    """Add `deltas` to the rollup row at `keys`, creating it if needed"""
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        upsert = (sqlite_insert if dialect == "sqlite" else pg_insert)(table).values(**keys, **deltas)
+        db.execute(upsert.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={column: table.c[column] + upsert.excluded[column] for column in deltas}
+        ))
+        return
+
+    updated = db.execute(
+        update(table)
+        .where(*[table.c[k] == v for k, v in keys.items()])
+        .values({column: table.c[column] + delta for column, delta in deltas.items()})
+    ).rowcount
+    if not updated:
+        db.execute(insert(table).values(**keys, **deltas))
+
+
+# ------------------------------------------------
+# Incremental updates (call inside the transaction that changes the case)
+
+def record_case(db, case: Case):
+    """Count a newly inserted case"""
+    keys = {"day": case.created_at.date(), "media_type": media_key(case.media_type)}
+
+    _increment(db, CaseDailyRollup, keys, {
+        "total": 1,
+        "ai_generated": int(bool(case.is_ai_generated)),
+        "anchored": int(case.blockchain_tx is not None),
+        "confidence_sum": case.detection_score or 0.0,
+    })
+
+    if case.detection_score is not None:
+        _increment(db, CaseConfidenceRollup, {**keys, "bucket": confidence_bucket(case.detection_score)}, {"count": 1})
+
+
+def mark_anchored(db, case_ids: list, tx_hash: str) -> int:
+    """
+    Set blockchain_tx on cases, counting the ones anchored for the first time
+
+    Returns:
+        Number of cases that moved from pending to anchored
+    """
+    newly = db.execute(
+        select(Case.created_at, Case.media_type)
+        .where(Case.id.in_(case_ids), Case.blockchain_tx.is_(None))
+    ).all()
+
+    db.query(Case).filter(Case.id.in_(case_ids)).update(
+        {Case.blockchain_tx: tx_hash},
+        synchronize_session=False
+    )
+
+    per_key = defaultdict(int)
+    for created_at, media_type in newly:
+        per_key[(created_at.date(), media_key(media_type))] += 1
+
+    for (day, media_type), count in per_key.items():
+        _increment(db, CaseDailyRollup, {"day": day, "media_type": media_type}, {"anchored": count})
+
+    return len(newly)
+
+
+# ------------------------------------------------
+# Reads
+
+def _totals(total: int, ai_generated: int, anchored: int, confidence_sum: float) -> dict:
+    return {
+        "total": total,
+        "ai_generated": ai_generated,
+        "authentic": total - ai_generated,
+        "ai_ratio": round(ai_generated / total, 4) if total else 0.0,
+        "anchored": anchored,
+        "pending": total - anchored,
+        "anchor_rate": round(anchored / total, 4) if total else 0.0,
+        "avg_confidence": round(confidence_sum / total, 4) if total else 0.0,
+    }
+
+
+def summary(db, start: date = None, end: date = None) -> dict:
+    """Dashboard figures for [start, end] (UTC days, inclusive), all time by default"""
+    daily_query = select(CaseDailyRollup)
+    buckets_query = select(
+        CaseConfidenceRollup.media_type,
+        CaseConfidenceRollup.bucket,
+        func.sum(CaseConfidenceRollup.count)
+    ).group_by(CaseConfidenceRollup.media_type, CaseConfidenceRollup.bucket)
+
+    if start:
+        daily_query = daily_query.where(CaseDailyRollup.day >= start)
+        buckets_query = buckets_query.where(CaseConfidenceRollup.day >= start)
+    if end:
+        daily_query = daily_query.where(CaseDailyRollup.day <= end)
+        buckets_query = buckets_query.where(CaseConfidenceRollup.day <= end)
+
+    overall = [0, 0, 0, 0.0]
+    by_type = defaultdict(lambda: [0, 0, 0, 0.0])
+    by_day = defaultdict(lambda: [0, 0, 0, 0.0])
+
+    for row in db.execute(daily_query.order_by(CaseDailyRollup.day)).scalars():
+        values = (row.total, row.ai_generated, row.anchored, row.confidence_sum)
+        for acc in (overall, by_type[row.media_type], by_day[row.day]):
+            for i, value in enumerate(values):
+                acc[i] += value or 0
+
+    histogram = [0] * CONFIDENCE_BUCKETS
+    histogram_by_type = defaultdict(lambda: [0] * CONFIDENCE_BUCKETS)
+    for media_type, bucket, count in db.execute(buckets_query):
+        histogram[bucket] += count
+        histogram_by_type[media_type][bucket] += count
+
+    def labelled(counts: list) -> list:
+        return [
+            {"bucket": f"{i / CONFIDENCE_BUCKETS:.1f}-{(i + 1) / CONFIDENCE_BUCKETS:.1f}", "count": c}
+            for i, c in enumerate(counts)
+        ]
+
+    return {
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat() if end else None,
+        "totals": _totals(*overall),
+        "by_media_type": {
+            media_type: {**_totals(*values), "confidence_histogram": labelled(histogram_by_type[media_type])}
+            for media_type, values in sorted(by_type.items())
+        },
+        "daily": [
+            {"day": day.isoformat(), "total": v[0], "ai_generated": v[1], "anchored": v[2]}
+            for day, v in by_day.items()
+        ],
+        "confidence_histogram": labelled(histogram),
+    }
+
+
+# ------------------------------------------------
+# Backfill
+
+def rebuild(bind=None) -> dict:
+    """
+    Recompute every rollup from the cases table in one transaction
+
+    Streams the cases once; memory grows with days x media types, not with
+    the number of cases. Cases saved while this runs on a separate
+    connection may be missed, so run it while writes are quiet.
+    """
+    bind = bind or engine
+    daily = defaultdict(lambda: [0, 0, 0, 0.0])
+    buckets = defaultdict(int)
+    scanned = 0
+
+    with Session(bind=bind) as db:
+        rows = db.execute(
+            select(Case.created_at, Case.media_type, Case.is_ai_generated, Case.blockchain_tx, Case.detection_score)
+            .execution_options(yield_per=5000)
+        )
+        for created_at, media_type, is_ai, tx, confidence in rows:
+            if created_at is None:
+                continue
+
+            key = (created_at.date(), media_key(media_type))
+            acc = daily[key]
+            acc[0] += 1
+            acc[1] += int(bool(is_ai))
+            acc[2] += int(tx is not None)
+            acc[3] += confidence or 0.0
+            if confidence is not None:
+                buckets[(*key, confidence_bucket(confidence))] += 1
+            scanned += 1
+
+        db.query(CaseDailyRollup).delete(synchronize_session=False)
+        db.query(CaseConfidenceRollup).delete(synchronize_session=False)
+
+        if daily:
+            db.execute(insert(CaseDailyRollup), [
+                {"day": day, "media_type": media_type, "total": v[0],
+                 "ai_generated": v[1], "anchored": v[2], "confidence_sum": v[3]}
+                for (day, media_type), v in daily.items()
+            ])
+        if buckets:
+            db.execute(insert(CaseConfidenceRollup), [
+                {"day": day, "media_type": media_type, "bucket": bucket, "count": count}
+                for (day, media_type, bucket), count in buckets.items()
+            ])
+
+        db.commit()
+
+    return {"cases": scanned, "daily_rows": len(daily), "bucket_rows": len(buckets)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Case analytics rollups")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the rollups from the cases table")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        result = rebuild()
+        print(f"📊 Rebuilt analytics from {result['cases']} cases "
+              f"({result['daily_rows']} daily rows, {result['bucket_rows']} histogram rows)")
+    else:
+        parser.print_help()
@@ -0,0 +1,570 @@
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from ..models import SessionLocal, Case, AnchorJob, AnchorBatch
+from .blockchain import get_blockchain_service
+from .merkle import MerkleTree, evidence_leaf, compute_root
+from .analytics import mark_anchored
+
+# "single": one transaction per case; "merkle": one root per batch of cases
+ANCHOR_MODE = os.getenv("ANCHOR_MODE", "single").lower()
+ANCHOR_BATCH_SIZE = int(os.getenv("ANCHOR_BATCH_SIZE", "64"))
+ANCHOR_BATCH_WINDOW_SECONDS = float(os.getenv("ANCHOR_BATCH_WINDOW_SECONDS", "300"))
+
+ANCHOR_POLL_SECONDS = float(os.getenv("ANCHOR_POLL_SECONDS", "5"))
+ANCHOR_MAX_ATTEMPTS = int(os.getenv("ANCHOR_MAX_ATTEMPTS", "8"))
+ANCHOR_BACKOFF_SECONDS = float(os.getenv("ANCHOR_BACKOFF_SECONDS", "15"))
+ANCHOR_BACKOFF_MAX_SECONDS = float(os.getenv("ANCHOR_BACKOFF_MAX_SECONDS", "900"))
+
+# A submitted transaction with no receipt after this long is sent again
+ANCHOR_CONFIRM_TIMEOUT_SECONDS = float(os.getenv("ANCHOR_CONFIRM_TIMEOUT_SECONDS", "600"))
+
+# Re-send an unconfirmed transaction at the same nonce with bumped fees after this long
+TX_STUCK_SECONDS = float(os.getenv("TX_STUCK_SECONDS", "120"))
+TX_MAX_FEE_BUMPS = int(os.getenv("TX_MAX_FEE_BUMPS", "3"))
+
+# How long a claimed job stays invisible to other workers while it is being sent
+ANCHOR_LEASE_SECONDS = float(os.getenv("ANCHOR_LEASE_SECONDS", "120"))
+
+ANCHOR_BATCH_LIMIT = int(os.getenv("ANCHOR_BATCH_LIMIT", "20"))
+
+
+def enqueue_anchor(db, case_id: str, media_hash: str, report_hash: str) -> AnchorJob:
+    """Add an anchoring job in the caller's transaction, next to its Case"""
+    job = AnchorJob(
+        case_id=case_id,
+        media_hash=media_hash,
+        report_hash=report_hash,
+        status="pending",
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(job)
+    return job
+
+
+def enqueue_unanchored_cases() -> int:
+    """Queue cases saved before the anchoring queue existed (or whose send failed)"""
+    db = SessionLocal()
+    try:
+        orphans = db.query(Case.id, Case.media_hash).outerjoin(
+            AnchorJob, AnchorJob.case_id == Case.id
+        ).filter(
+            Case.blockchain_tx.is_(None),
+            AnchorJob.id.is_(None)
+        ).all()
+
+        for case_id, media_hash in orphans:
+            enqueue_anchor(db, case_id, media_hash, media_hash)
+
+        db.commit()
+        return len(orphans)
+    finally:
+        db.close()
+
+
+def get_anchor_status(db, case: Case) -> str:
+    """Anchoring state of a case as reported to clients"""
+    if case.blockchain_tx:
+        return "anchored"
+
+    job = db.query(AnchorJob).filter(AnchorJob.case_id == case.id).first()
+    return job.status if job else "pending"
+
+
+def anchor_queue_stats() -> dict:
+    """Job and batch counts per anchoring status"""
+    db = SessionLocal()
+    try:
+        jobs = db.query(AnchorJob.status, func.count(AnchorJob.id)).group_by(AnchorJob.status).all()
+        batches = db.query(AnchorBatch.status, func.count(AnchorBatch.id)).group_by(AnchorBatch.status).all()
+        blockchain = get_blockchain_service()
+
+        return {
+            "mode": ANCHOR_MODE,
+            "jobs": {status: count for status, count in jobs},
+            "batches": {status: count for status, count in batches},
+            "transactions": blockchain.tx_manager.stats() if blockchain.enabled else None
+        }
+    finally:
+        db.close()
+
+
+def verify_case_inclusion(db, case: Case, check_chain: bool = True) -> dict:
+    """
+    Recompute the anchored commitment for a case from its own hashes
+
+    For Merkle-batched cases the leaf is rebuilt from the case id, media hash
+    and report hash and folded up the stored proof; the result must equal the
+    batch root (and, when the chain is reachable, the root stored on-chain).
+    Until the case's transaction or batch root is confirmed there is nothing
+    to verify against: status is "pending" (or "failed") and valid is None.
+    """
+    job = db.query(AnchorJob).filter(AnchorJob.case_id == case.id).first()
+    if not job:
+        return {"case_id": case.id, "status": "pending", "valid": None, "reason": "No anchoring job"}
+
+    # Batched jobs are merkle, jobs sent on their own are single; a job not
+    # yet in either will be anchored the way the worker is configured
+    if job.batch_id:
+        mode = "merkle"
+    elif job.tx_hash:
+        mode = "single"
+    else:
+        mode = ANCHOR_MODE
+
+    result = {
+        "case_id": case.id,
+        "status": job.status if job.status in ("anchored", "failed") else "pending",
+        "job_status": job.status,
+        "blockchain_tx": job.tx_hash,
+        "mode": mode
+    }
+
+    if job.status != "anchored":
+        result.update({"valid": None, "reason": "Not anchored yet" if job.status != "failed" else job.last_error})
+        return result
+
+    if job.batch_id:
+        batch = db.get(AnchorBatch, job.batch_id)
+        leaf = evidence_leaf(case.id, case.media_hash, job.report_hash)
+        proof = json.loads(job.merkle_proof or "[]")
+        computed = compute_root(leaf, proof)
+
+        result.update({
+            "batch_id": batch.id,
+            "leaf_index": job.leaf_index,
+            "leaf": leaf,
+            "proof": proof,
+            "merkle_root": batch.merkle_root,
+            "computed_root": computed,
+            "valid": computed == batch.merkle_root
+        })
+        record_id, expected = batch.id, batch.merkle_root
+    else:
+        result["valid"] = bool(job.tx_hash) and job.media_hash == case.media_hash
+        record_id, expected = case.id, case.media_hash
+
+    if check_chain:
+        blockchain = get_blockchain_service()
+        if blockchain.enabled:
+            try:
+                onchain = blockchain.get_evidence(record_id)
+                result["onchain_match"] = onchain["media_hash"] == expected
+                result["valid"] = result["valid"] and result["onchain_match"]
+            except Exception as e:
+                result["onchain_error"] = str(e)
+
+    return result
+
+
+def _backoff(attempts: int) -> timedelta:
+    seconds = min(ANCHOR_BACKOFF_SECONDS * (2 ** max(0, attempts - 1)), ANCHOR_BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=seconds)
+
+
+def _label(row) -> str:
+    return row.case_id if isinstance(row, AnchorJob) else row.id
+
+
+class AnchorWorker:
+    """
+    Drains the anchor queue in the background.
+
+    In "single" mode every case is its own storeEvidence transaction. In
+    "merkle" mode pending cases are grouped into AnchorBatch rows (up to
+    ANCHOR_BATCH_SIZE leaves, or whatever arrived within
+    ANCHOR_BATCH_WINDOW_SECONDS) and only the batch root is sent on-chain;
+    each case keeps its leaf index and proof path.
+
+    Whatever is being sent (a job or a batch) is claimed with a conditional
+    update that also pushes `next_attempt_at` out by a lease, so a crashed
+    worker's claim simply expires. Transactions are signed and recorded
+    first, then broadcast without waiting and polled for receipts on later
+    passes. Failures back off exponentially up to ANCHOR_MAX_ATTEMPTS.
+    """
+
+    def __init__(self, poll_seconds: float = ANCHOR_POLL_SECONDS, mode: str = ANCHOR_MODE):
+        self.poll_seconds = poll_seconds
+        self.mode = mode
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        queued = enqueue_unanchored_cases()
+        if queued:
+            print(f"🔗 Queued {queued} unanchored case(s) for blockchain anchoring")
+
+        print(f"🔗 Anchor worker running in {self.mode} mode")
+        self._thread = threading.Thread(target=self._run, name="anchor-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def wake(self):
+        """Skip the rest of the poll interval, e.g. right after enqueueing"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.drain_once()
+            except Exception as e:
+                print("❌ Anchor worker pass failed:", str(e))
+
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    # ------------------------------------------------
+
+    def drain_once(self):
+        blockchain = get_blockchain_service()
+        if not blockchain.enabled:
+            return
+
+        self._confirm_submitted(blockchain, AnchorJob, self._job_anchored)
+        self._confirm_submitted(blockchain, AnchorBatch, self._batch_anchored)
+        self.reserve_recorded_nonces(blockchain)
+
+        # Batches formed before a switch to single mode are still sent;
+        # only unbatched jobs follow the current mode
+        if self.mode == "merkle":
+            self.form_batches()
+        self._submit_pending(blockchain, AnchorBatch)
+        if self.mode != "merkle":
+            self._submit_pending(blockchain, AnchorJob)
+
+    def reserve_recorded_nonces(self, blockchain):
+        """
+        Keep new sends clear of nonces held by submitted rows
+
+        A transaction recorded but never broadcast (the process died in
+        between) is not in the chain's pending count, so after a restart the
+        sender would hand its nonce to a new transaction.
+        """
+        db = SessionLocal()
+        try:
+            recorded = [
+                db.query(func.max(model.tx_nonce)).filter(model.status == "submitted").scalar()
+                for model in (AnchorJob, AnchorBatch)
+            ]
+        finally:
+            db.close()
+
+        recorded = [n for n in recorded if n is not None]
+        if recorded:
+            blockchain.tx_manager.reserve_through(max(recorded))
+
+    def form_batches(self, now: datetime = None) -> list:
+        """Group unbatched pending jobs into Merkle batches once a batch is full or old enough"""
+        now = now or datetime.utcnow()
+        formed = []
+
+        db = SessionLocal()
+        try:
+            while True:
+                jobs = db.query(AnchorJob).filter(
+                    AnchorJob.status == "pending",
+                    AnchorJob.batch_id.is_(None)
+                ).order_by(AnchorJob.created_at, AnchorJob.id).limit(ANCHOR_BATCH_SIZE).all()
+
+                if not jobs:
+                    break
+
+                window_closed = (now - jobs[0].created_at).total_seconds() >= ANCHOR_BATCH_WINDOW_SECONDS
+                if len(jobs) < ANCHOR_BATCH_SIZE and not window_closed:
+                    break
+
+                tree = MerkleTree([evidence_leaf(j.case_id, j.media_hash, j.report_hash) for j in jobs])
+                batch = AnchorBatch(
+                    id=f"BATCH-{now.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}",
+                    merkle_root=tree.root,
+                    leaf_count=len(jobs),
+                    status="pending",
+                    next_attempt_at=now
+                )
+                db.add(batch)
+
+                for index, job in enumerate(jobs):
+                    job.batch_id = batch.id
+                    job.leaf_index = index
+                    job.merkle_proof = json.dumps(tree.proof(index))
+
+                db.commit()
+                formed.append(batch.id)
+                print(f"🌳 Formed {batch.id} with {batch.leaf_count} case(s), root {batch.merkle_root[:16]}...")
+        finally:
+            db.close()
+
+        return formed
+
+    # ------------------------------------------------
+
+    def _claim(self, db, model, row_id, now: datetime) -> bool:
+        claimed = db.query(model).filter(
+            model.id == row_id,
+            model.status == "pending",
+            model.next_attempt_at <= now
+        ).update(
+            {
+                model.next_attempt_at: now + timedelta(seconds=ANCHOR_LEASE_SECONDS),
+                model.attempts: model.attempts + 1
+            },
+            synchronize_session=False
+        )
+        db.commit()
+        return claimed == 1
+
+    @staticmethod
+    def _evidence_args(row) -> tuple:
+        """storeEvidence arguments for a job or a batch root"""
+        if isinstance(row, AnchorBatch):
+            return row.id, row.merkle_root, f"merkle-batch:{row.leaf_count}"
+        return row.case_id, row.media_hash, row.report_hash
+
+    @staticmethod
+    def _record_sent(row, result: dict):
+        row.tx_hash = result["tx_hash"]
+        row.tx_nonce = result.get("nonce")
+        row.max_fee_per_gas = result.get("max_fee_per_gas")
+        row.max_priority_fee_per_gas = result.get("max_priority_fee_per_gas")
+        row.submitted_at = datetime.utcnow()
+        row.last_error = None
+
+    def _submit_pending(self, blockchain, model):
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            query = db.query(model.id).filter(
+                model.status == "pending",
+                model.next_attempt_at <= now
+            )
+            if model is AnchorJob:
+                # Batched jobs are sent as part of their root, never on their own
+                query = query.filter(AnchorJob.batch_id.is_(None))
+
+            due = query.order_by(model.next_attempt_at).limit(ANCHOR_BATCH_LIMIT).all()
+
+            for (row_id,) in due:
+                if not self._claim(db, model, row_id, now):
+                    continue
+
+                row = db.get(model, row_id)
+                prepared = blockchain.prepare_evidence(*self._evidence_args(row))
+                if not prepared.get("success"):
+                    self._retry_later(db, row, prepared.get("error"))
+                    db.commit()
+                    continue
+
+                # Record the signed transaction before it leaves. If we die
+                # after the broadcast the row is already submitted at this
+                # nonce: the receipt check finds it, or the stuck-fee path
+                # re-sends it at the same nonce, never under a fresh one.
+                row.status = "submitted"
+                row.fee_bumps = 0
+                row.prior_tx_hashes = None
+                self._record_sent(row, prepared)
+                if model is AnchorBatch:
+                    self._set_batch_job_status(db, row.id, "submitted")
+                db.commit()
+
+                sent = blockchain.broadcast(prepared)
+                if not sent.get("success"):
+                    self._retry_later(db, row, sent.get("error"))
+                    db.commit()
+        finally:
+            db.close()
+
+    def _confirm_submitted(self, blockchain, model, on_anchored):
+        db = SessionLocal()
+        try:
+            query = db.query(model).filter(model.status == "submitted")
+            if model is AnchorJob:
+                # Batched jobs are confirmed through their batch's receipt
+                query = query.filter(AnchorJob.batch_id.is_(None))
+
+            submitted = query.order_by(model.submitted_at).limit(ANCHOR_BATCH_LIMIT).all()
+
+            for row in submitted:
+                try:
+                    receipt = self._find_receipt(blockchain, row)
+                except Exception as e:
+                    # RPC hiccup: leave it submitted and look again next pass
+                    print(f"⚠️ Receipt lookup failed for {_label(row)}: {e}")
+                    continue
+
+                if receipt is None:
+                    age = (datetime.utcnow() - row.submitted_at).total_seconds()
+                    if age > TX_STUCK_SECONDS and (row.fee_bumps or 0) < TX_MAX_FEE_BUMPS:
+                        self._bump_fee(blockchain, row)
+                    elif age > ANCHOR_CONFIRM_TIMEOUT_SECONDS:
+                        self._resend_unconfirmed(db, blockchain, row)
+                    db.commit()
+                    continue
+
+                if receipt["status"] == 1:
+                    row.status = "anchored"
+                    row.block_number = receipt["blockNumber"]
+                    on_anchored(db, row)
+                else:
+                    self._retry_later(db, row, "Transaction reverted")
+
+                db.commit()
+        finally:
+            db.close()
+
+    def _find_receipt(self, blockchain, row):
+        """Receipt for the current transaction or any fee-bumped predecessor"""
+        hashes = [row.tx_hash] + json.loads(row.prior_tx_hashes or "[]")
+
+        for tx_hash in hashes:
+            receipt = blockchain.get_receipt(tx_hash)
+            if receipt is not None:
+                # Whichever version was mined is the one on record
+                row.tx_hash = tx_hash
+                return receipt
+
+        return None
+
+    def _bump_fee(self, blockchain, row) -> bool:
+        """Re-send a stuck transaction at the same nonce with higher fees"""
+        if row.tx_nonce is None:
+            return False
+
+        result = blockchain.submit_evidence(
+            *self._evidence_args(row),
+            replace={
+                "nonce": row.tx_nonce,
+                "maxFeePerGas": row.max_fee_per_gas,
+                "maxPriorityFeePerGas": row.max_priority_fee_per_gas,
+            }
+        )
+
+        if not result.get("success"):
+            # e.g. the original was mined in the meantime; the next receipt check settles it
+            row.last_error = result.get("error")
+            return False
+
+        row.prior_tx_hashes = json.dumps(json.loads(row.prior_tx_hashes or "[]") + [row.tx_hash])
+        row.fee_bumps = (row.fee_bumps or 0) + 1
+        self._record_sent(row, result)
+        return True
+
+    def _resend_unconfirmed(self, db, blockchain, row):
+        """
+        Start another confirmation window for a transaction that never got a receipt
+
+        The transaction keeps its nonce and is replaced with bumped fees.
+        Taking a fresh nonce instead would leave a gap that every later
+        transaction from the account queues behind. Each window counts as
+        an attempt; after the last one the job fails and the sender
+        resyncs its nonce from the chain, so a dropped transaction's slot
+        is reused by the next send.
+        """
+        error = "Transaction not confirmed in time"
+
+        if row.tx_nonce is None:
+            self._retry_later(db, row, error)
+            return
+
+        if row.attempts >= ANCHOR_MAX_ATTEMPTS:
+            row.status = "failed"
+            row.last_error = error
+            blockchain.tx_manager.resync()
+            print(f"❌ Anchoring gave up for {_label(row)}: {error}")
+            if isinstance(row, AnchorBatch):
+                self._release_batch_jobs(db, row.id, error)
+            return
+
+        row.attempts += 1
+        if self._bump_fee(blockchain, row):
+            # A fresh window with the stuck-fee bumps available again
+            row.fee_bumps = 0
+        else:
+            # Try again after another window rather than on every pass
+            row.submitted_at = datetime.utcnow()
+
+    def _job_anchored(self, db, job: AnchorJob):
+        mark_anchored(db, [job.case_id], job.tx_hash)
+        print(f"✅ Evidence anchored: {job.case_id} (block {job.block_number})")
+
+    def _batch_anchored(self, db, batch: AnchorBatch):
+        jobs = db.query(AnchorJob).filter(AnchorJob.batch_id == batch.id).all()
+
+        for job in jobs:
+            job.status = "anchored"
+            job.tx_hash = batch.tx_hash
+            job.block_number = batch.block_number
+
+        mark_anchored(db, [j.case_id for j in jobs], batch.tx_hash)
+        print(f"✅ Batch anchored: {batch.id} ({batch.leaf_count} cases, block {batch.block_number})")
+
+    def _set_batch_job_status(self, db, batch_id: str, status: str):
+        db.query(AnchorJob).filter(AnchorJob.batch_id == batch_id).update(
+            {AnchorJob.status: status},
+            synchronize_session=False
+        )
+
+    def _release_batch_jobs(self, db, batch_id: str, error: str) -> int:
+        """Detach a failed batch's jobs and queue them again for a later batch (or send)"""
+        released = db.query(AnchorJob).filter(AnchorJob.batch_id == batch_id).update(
+            {
+                AnchorJob.batch_id: None,
+                AnchorJob.leaf_index: None,
+                AnchorJob.merkle_proof: None,
+                AnchorJob.status: "pending",
+                AnchorJob.attempts: 0,
+                AnchorJob.last_error: error,
+                AnchorJob.next_attempt_at: datetime.utcnow()
+            },
+            synchronize_session=False
+        )
+        if released:
+            print(f"🔁 Re-queued {released} case(s) from failed {batch_id}")
+        return released
+
+    def _retry_later(self, db, row, error: str):
+        row.last_error = error
+        row.tx_hash = None
+        row.tx_nonce = None
+        row.prior_tx_hashes = None
+        row.submitted_at = None
+
+        if row.attempts >= ANCHOR_MAX_ATTEMPTS:
+            row.status = "failed"
+            print(f"❌ Anchoring gave up for {_label(row)}: {error}")
+        else:
+            row.status = "pending"
+            row.next_attempt_at = datetime.utcnow() + _backoff(row.attempts)
+
+        if isinstance(row, AnchorBatch):
+            if row.status == "failed":
+                self._release_batch_jobs(db, row.id, error)
+            else:
+                self._set_batch_job_status(db, row.id, row.status)
+
+
+# ------------------------------------------------
+# Singleton
+
+_anchor_worker = None
+
+
+def get_anchor_worker():
+    global _anchor_worker
+    if _anchor_worker is None:
+        _anchor_worker = AnchorWorker()
+    return _anchor_worker
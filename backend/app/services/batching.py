@@ -0,0 +1,159 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class _PendingItem:
+    """A single caller's input waiting to be batched"""
+
+    __slots__ = ("payload", "future", "enqueued_at")
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent classifier calls into batched forward passes.
+
+    Callers submit one input each. A single background thread waits for the
+    first input, keeps collecting until either `max_batch_size` inputs are
+    queued or `max_wait_ms` has passed since the first one arrived, then runs
+    `batch_fn` once on the whole batch and hands every caller its own result.
+    """
+
+    def __init__(self, batch_fn, max_batch_size: int = 8, max_wait_ms: float = 10.0, name: str = "classifier"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+        self._thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------
+
+    def submit(self, payload) -> Future:
+        """Queue one input, returning a future for its result"""
+        item = _PendingItem(payload)
+        self._queue.put(item)
+        return item.future
+
+    def run(self, payload, timeout: float = None):
+        """Queue one input and block until its result is ready"""
+        return self.submit(payload).result(timeout=timeout)
+
+    def run_many(self, payloads: list, timeout: float = None) -> list:
+        """Queue several inputs at once so they share batches"""
+        futures = [self.submit(p) for p in payloads]
+        return [f.result(timeout=timeout) for f in futures]
+
+    def close(self):
+        """Stop the batching thread once queued work is drained"""
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    # ------------------------------------------------
+
+    def _collect(self, first: _PendingItem) -> list:
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is None:
+                # Re-queue the sentinel so the run loop exits after this batch
+                self._queue.put(None)
+                break
+
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = self._collect(first)
+            started = time.perf_counter()
+
+            try:
+                results = self.batch_fn([item.payload for item in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"Batch function returned {len(results)} results for {len(batch)} inputs"
+                    )
+            except Exception as e:
+                for item in batch:
+                    item.future.set_exception(e)
+                self._record(batch, started, failed=True)
+                continue
+
+            for item, result in zip(batch, results):
+                item.future.set_result(result)
+
+            self._record(batch, started)
+
+    # ------------------------------------------------
+
+    def _reset_stats(self):
+        self._batches = 0
+        self._items = 0
+        self._failed_batches = 0
+        self._size_histogram = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._infer_total = 0.0
+
+    def _record(self, batch: list, started: float, failed: bool = False):
+        finished = time.perf_counter()
+        size = len(batch)
+        waits = [started - item.enqueued_at for item in batch]
+
+        with self._stats_lock:
+            self._batches += 1
+            self._items += size
+            self._size_histogram[size] = self._size_histogram.get(size, 0) + 1
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+            self._infer_total += finished - started
+            if failed:
+                self._failed_batches += 1
+
+    def stats(self) -> dict:
+        """Batch size and queue wait counters for tuning"""
+        with self._stats_lock:
+            batches = self._batches
+            items = self._items
+
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "queued": self._queue.qsize(),
+                "batches": batches,
+                "items": items,
+                "failed_batches": self._failed_batches,
+                "avg_batch_size": round(items / batches, 3) if batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._size_histogram.items())),
+                "avg_queue_wait_ms": round(self._wait_total / items * 1000, 3) if items else 0.0,
+                "max_queue_wait_ms": round(self._wait_max * 1000, 3),
+                "avg_batch_inference_ms": round(self._infer_total / batches * 1000, 3) if batches else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._reset_stats()
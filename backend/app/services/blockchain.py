@@ -1,7 +1,9 @@
 import os
 from web3 import Web3
+from web3.exceptions import TransactionNotFound
 from dotenv import load_dotenv
 import json
+import threading
 import time
 
 load_dotenv()
@@ -11,6 +13,10 @@ CONTRACT_ADDRESS = os.getenv("CONTRACT_ADDRESS")
 WALLET_ADDRESS = os.getenv("WALLET_ADDRESS")
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 
+GAS_LIMIT = int(os.getenv("TX_GAS_LIMIT", "300000"))
+FEE_CACHE_SECONDS = float(os.getenv("TX_FEE_CACHE_SECONDS", "15"))
+FEE_BUMP_PERCENT = float(os.getenv("TX_FEE_BUMP_PERCENT", "15"))  # nodes require >= 10% to replace
+
 ABI = [
     {
         "inputs": [
@@ -22,9 +28,181 @@ ABI = [
         "outputs": [],
         "stateMutability": "nonpayable",
         "type": "function",
+    },
+    {
+        "inputs": [
+            {"internalType": "string", "name": "_caseId", "type": "string"},
+        ],
+        "name": "getEvidence",
+        "outputs": [
+            {"internalType": "string", "name": "caseId", "type": "string"},
+            {"internalType": "string", "name": "mediaHash", "type": "string"},
+            {"internalType": "string", "name": "reportHash", "type": "string"},
+            {"internalType": "uint256", "name": "timestamp", "type": "uint256"},
+            {"internalType": "address", "name": "submitter", "type": "address"},
+        ],
+        "stateMutability": "view",
+        "type": "function",
     }
 ]
 
+class TransactionManager:
+    """
+    Local nonce and fee bookkeeping for one sending account.
+
+    The next nonce is kept in memory behind a lock, so concurrent sends get
+    consecutive nonces without an RPC round-trip each, and is resynced from
+    the chain's pending count whenever a send fails. The lock only covers
+    handing out the nonce; fee lookups, building, signing and the broadcast
+    run outside it so one slow RPC does not serialise every sender. EIP-1559
+    fees are cached for FEE_CACHE_SECONDS. A stuck transaction can be
+    replaced by re-sending the same nonce with both fee caps bumped by
+    FEE_BUMP_PERCENT.
+    """
+
+    def __init__(self, w3, account, private_key):
+        self.w3 = w3
+        self.account = account
+        self.private_key = private_key
+
+        self._lock = threading.Lock()
+        self._next_nonce = None
+        self._fees = None
+        self._fees_at = 0.0
+
+        self.sent = 0
+        self.replaced = 0
+        self.resyncs = 0
+        self.fee_refreshes = 0
+
+    # ------------------------------------------------
+
+    def resync(self):
+        """Forget the local nonce; the next send reloads it from the chain"""
+        with self._lock:
+            self._next_nonce = None
+
+    def reserve_through(self, nonce: int):
+        """Never hand out `nonce` or below, e.g. nonces recorded before a restart"""
+        with self._lock:
+            if self._next_nonce is None:
+                self._load_nonce()
+            self._next_nonce = max(self._next_nonce, nonce + 1)
+
+    def _load_nonce(self):
+        self._next_nonce = self.w3.eth.get_transaction_count(self.account, "pending")
+        self.resyncs += 1
+
+    def _take_nonce(self) -> int:
+        with self._lock:
+            if self._next_nonce is None:
+                self._load_nonce()
+            nonce = self._next_nonce
+            self._next_nonce = nonce + 1
+            return nonce
+
+    def fees(self) -> dict:
+        """Current EIP-1559 fee caps, refreshed at most every FEE_CACHE_SECONDS"""
+        now = time.monotonic()
+        if self._fees is None or now - self._fees_at > FEE_CACHE_SECONDS:
+            base_fee = self.w3.eth.get_block("latest").get("baseFeePerGas", 0)
+            priority = self.w3.eth.max_priority_fee
+
+            self._fees = {
+                # Headroom for the base fee doubling over a couple of blocks
+                "maxFeePerGas": 2 * base_fee + priority,
+                "maxPriorityFeePerGas": priority,
+            }
+            self._fees_at = now
+            self.fee_refreshes += 1
+
+        return dict(self._fees)
+
+    def _bumped(self, previous: dict) -> dict:
+        current = self.fees()
+        factor = 1 + FEE_BUMP_PERCENT / 100
+
+        return {
+            key: max(int(previous[key] * factor) + 1, current[key])
+            for key in ("maxFeePerGas", "maxPriorityFeePerGas")
+        }
+
+    def prepare(self, contract_call, replace: dict = None) -> dict:
+        """
+        Assign a nonce and fees to a contract call and sign it, without sending
+
+        Args:
+            contract_call: Bound contract function, e.g. contract.functions.storeEvidence(...)
+            replace: Optional {"nonce", "maxFeePerGas", "maxPriorityFeePerGas"} of a
+                stuck transaction to replace with bumped fees
+
+        Returns:
+            Dict with tx_hash, nonce, the fee caps used and the signed raw_transaction
+        """
+        try:
+            if replace:
+                nonce = replace["nonce"]
+                fees = self._bumped(replace)
+            else:
+                fees = self.fees()
+                nonce = self._take_nonce()
+
+            txn = contract_call.build_transaction({
+                "from": self.account,
+                "nonce": nonce,
+                "gas": GAS_LIMIT,
+                "type": 2,
+                **fees,
+            })
+            signed_txn = self.w3.eth.account.sign_transaction(txn, private_key=self.private_key)
+        except Exception:
+            if not replace:
+                # The nonce taken above will never be sent
+                self.resync()
+            raise
+
+        return {
+            "tx_hash": signed_txn.hash.hex(),
+            "nonce": nonce,
+            "max_fee_per_gas": fees["maxFeePerGas"],
+            "max_priority_fee_per_gas": fees["maxPriorityFeePerGas"],
+            "raw_transaction": signed_txn.rawTransaction,
+            "replacement": bool(replace),
+        }
+
+    def broadcast(self, prepared: dict):
+        """Send a transaction returned by prepare()"""
+        try:
+            self.w3.eth.send_raw_transaction(prepared["raw_transaction"])
+        except Exception:
+            # Nonce may be stale, taken by another sender, or left behind a
+            # dropped transaction: resync from the chain's pending count
+            self._fees = None
+            self.resync()
+            raise
+
+        if prepared["replacement"]:
+            self.replaced += 1
+        self.sent += 1
+
+    def send(self, contract_call, replace: dict = None) -> dict:
+        """Build, sign and broadcast a contract call (see prepare())"""
+        prepared = self.prepare(contract_call, replace=replace)
+        self.broadcast(prepared)
+        return prepared
+
+    def stats(self) -> dict:
+        return {
+            "next_nonce": self._next_nonce,
+            "fees": self._fees,
+            "fee_age_seconds": round(time.monotonic() - self._fees_at, 1) if self._fees else None,
+            "sent": self.sent,
+            "replaced": self.replaced,
+            "resyncs": self.resyncs,
+            "fee_refreshes": self.fee_refreshes,
+        }
+
+
 class BlockchainService:
     def __init__(self):
         print("\n🔗 Initializing blockchain service...")
@@ -44,41 +222,99 @@ class BlockchainService:
             abi=ABI
         )
 
+        self.tx_manager = TransactionManager(self.w3, self.account, PRIVATE_KEY)
+
         balance = self.w3.eth.get_balance(self.account)
         print(f"Wallet balance: {self.w3.from_wei(balance,'ether')} ETH")
 
         self.enabled = True
         print("✅ Blockchain ready\n")
 
-    def store_evidence(self, case_id, media_hash, report_hash):
-        try:
-            print("\n📝 Storing evidence on blockchain...")
-            print(f"   Case ID: {case_id}")
-            print(f"   Media Hash: {media_hash[:20]}...")
-            print(f"   Report Hash: {report_hash[:20]}...")
-
-            nonce = self.w3.eth.get_transaction_count(self.account)
-
-            txn = self.contract.functions.storeEvidence(
-                case_id,
-                media_hash,
-                report_hash
-            ).build_transaction({
-                "from": self.account,
-                "nonce": nonce,
-                "gas": 300000,
-                "gasPrice": self.w3.eth.gas_price,
-            })
+    def prepare_evidence(self, case_id, media_hash, report_hash, replace=None):
+        """
+        Sign a storeEvidence transaction without sending it
 
-            print("📤 Sending transaction...")
+        The returned tx_hash and nonce can be recorded before broadcast(), so
+        a crash in between leaves a known transaction to re-send rather than
+        an unknown one.
 
-            signed_txn = self.w3.eth.account.sign_transaction(
-                txn, private_key=PRIVATE_KEY
+        Args:
+            replace: Optional nonce and fee caps of a stuck transaction to fee-bump
+        """
+        try:
+            prepared = self.tx_manager.prepare(
+                self.contract.functions.storeEvidence(case_id, media_hash, report_hash),
+                replace=replace
             )
+            return {"success": True, **prepared}
+
+        except Exception as e:
+            print("❌ Blockchain failed:", str(e))
+            return {"success": False, "error": str(e)}
+
+    def broadcast(self, prepared):
+        """Send a transaction returned by prepare_evidence()"""
+        try:
+            print(f"📤 Sending transaction {prepared['tx_hash']} (nonce {prepared['nonce']})...")
+            self.tx_manager.broadcast(prepared)
+            return {"success": True}
 
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+        except Exception as e:
+            print("❌ Blockchain failed:", str(e))
+            return {"success": False, "error": str(e)}
+
+    def submit_evidence(self, case_id, media_hash, report_hash, replace=None):
+        """
+        Sign and broadcast a storeEvidence transaction without waiting for it
+
+        Args:
+            replace: Optional nonce and fee caps of a stuck transaction to fee-bump
+        """
+        print("\n📝 Storing evidence on blockchain...")
+        print(f"   Case ID: {case_id}")
+        print(f"   Media Hash: {media_hash[:20]}...")
+        print(f"   Report Hash: {report_hash[:20]}...")
+
+        if replace:
+            print(f"⛽ Replacing stuck transaction at nonce {replace['nonce']}")
+
+        prepared = self.prepare_evidence(case_id, media_hash, report_hash, replace=replace)
+        if not prepared["success"]:
+            return prepared
+
+        sent = self.broadcast(prepared)
+        return prepared if sent["success"] else sent
+
+    def get_receipt(self, tx_hash):
+        """Receipt for a broadcast transaction, or None while it is still pending"""
+        try:
+            return self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+
+    def get_evidence(self, case_id):
+        """Read a stored evidence record back from the contract"""
+        case_id, media_hash, report_hash, timestamp, submitter = \
+            self.contract.functions.getEvidence(case_id).call()
+
+        return {
+            "case_id": case_id,
+            "media_hash": media_hash,
+            "report_hash": report_hash,
+            "timestamp": timestamp,
+            "submitter": submitter
+        }
+
+    def store_evidence(self, case_id, media_hash, report_hash):
+        submitted = self.submit_evidence(case_id, media_hash, report_hash)
+
+        if not submitted.get("success"):
+            return submitted
+
+        try:
+            tx_hash = submitted["tx_hash"]
 
-            print(f"⏳ Waiting for confirmation... {tx_hash.hex()}")
+            print(f"⏳ Waiting for confirmation... {tx_hash}")
 
             receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
 
@@ -87,7 +323,7 @@ class BlockchainService:
 
             return {
                 "success": True,
-                "tx_hash": tx_hash.hex(),
+                "tx_hash": tx_hash,
                 "block": receipt.blockNumber
             }
 
@@ -96,9 +332,12 @@ class BlockchainService:
             return {"success": False, "error": str(e)}
 
 _blockchain = None
+_blockchain_lock = threading.Lock()
 
 def get_blockchain_service():
     global _blockchain
-    if _blockchain is None:
-        _blockchain = BlockchainService()
+    # Initialised from the startup thread and the anchor worker; connect once
+    with _blockchain_lock:
+        if _blockchain is None:
+            _blockchain = BlockchainService()
     return _blockchain
\ No newline at end of file
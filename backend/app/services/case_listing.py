@@ -0,0 +1,158 @@
+import base64
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import select, and_, or_, func, tuple_, case as sql_case
+
+from ..models import SessionLocal, Case, AnchorJob
+
+# Page size bounds for GET /cases
+CASES_DEFAULT_LIMIT = int(os.getenv("CASES_DEFAULT_LIMIT", "100"))
+CASES_MAX_LIMIT = int(os.getenv("CASES_MAX_LIMIT", "1000"))
+
+# Rows per query while streaming an NDJSON export
+CASES_EXPORT_CHUNK = int(os.getenv("CASES_EXPORT_CHUNK", "1000"))
+
+ANCHOR_STATUSES = ("anchored", "pending", "submitted", "failed")
+
+
+class InvalidCursorError(ValueError):
+    """The cursor was not produced by this API"""
+
+
+def encode_cursor(created_at: datetime, case_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{case_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, case_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), case_id
+    except Exception:
+        raise InvalidCursorError(cursor)
+
+
+# ------------------------------------------------
+
+def _anchor_status_column():
+    # Same rule as anchoring.get_anchor_status, evaluated in SQL
+    return sql_case(
+        (Case.blockchain_tx.isnot(None), "anchored"),
+        else_=func.coalesce(AnchorJob.status, "pending")
+    ).label("anchor_status")
+
+
+def build_query(filters: dict, after: tuple = None, limit: int = None):
+    """
+    Column-only SELECT over cases, newest first, keyed on (created_at, id)
+
+    filters may hold media_type, is_ai_generated, min_confidence,
+    max_confidence, created_after, created_before and anchor_status; None
+    values are ignored. `after` is a decoded cursor.
+    """
+    anchor_status = _anchor_status_column()
+
+    query = select(
+        Case.id,
+        Case.media_type,
+        Case.filename,
+        Case.is_ai_generated,
+        Case.detection_score,
+        Case.blockchain_tx,
+        Case.created_at,
+        anchor_status
+    ).outerjoin(AnchorJob, AnchorJob.case_id == Case.id)
+
+    conditions = []
+    if filters.get("media_type") is not None:
+        conditions.append(Case.media_type == filters["media_type"])
+    if filters.get("is_ai_generated") is not None:
+        conditions.append(Case.is_ai_generated == filters["is_ai_generated"])
+    if filters.get("min_confidence") is not None:
+        conditions.append(Case.detection_score >= filters["min_confidence"])
+    if filters.get("max_confidence") is not None:
+        conditions.append(Case.detection_score <= filters["max_confidence"])
+    if filters.get("created_after") is not None:
+        conditions.append(Case.created_at >= filters["created_after"])
+    if filters.get("created_before") is not None:
+        conditions.append(Case.created_at < filters["created_before"])
+
+    status = filters.get("anchor_status")
+    if status == "anchored":
+        conditions.append(Case.blockchain_tx.isnot(None))
+    elif status == "pending":
+        conditions.append(and_(
+            Case.blockchain_tx.is_(None),
+            or_(AnchorJob.status.is_(None), AnchorJob.status == "pending")
+        ))
+    elif status is not None:
+        conditions.append(and_(Case.blockchain_tx.is_(None), AnchorJob.status == status))
+
+    if after is not None:
+        # Row-value comparison, so the (created_at, id) index serves the seek
+        conditions.append(tuple_(Case.created_at, Case.id) < tuple_(*after))
+
+    if conditions:
+        query = query.where(and_(*conditions))
+
+    query = query.order_by(Case.created_at.desc(), Case.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+
+    return query
+
+
+def _row_dict(row) -> dict:
+    return {
+        "case_id": row.id,
+        "media_type": row.media_type,
+        "filename": row.filename,
+        "is_ai_generated": row.is_ai_generated,
+        "confidence": row.detection_score,
+        "blockchain_tx": row.blockchain_tx,
+        "blockchain_status": row.anchor_status,
+        "created_at": row.created_at.isoformat()
+    }
+
+
+def fetch_page(db, filters: dict, cursor: str = None, limit: int = CASES_DEFAULT_LIMIT) -> dict:
+    """One page of cases plus the cursor for the next (None on the last page)"""
+    after = decode_cursor(cursor) if cursor else None
+
+    # One extra row tells us whether another page exists without a COUNT
+    rows = db.execute(build_query(filters, after, limit + 1)).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "cases": [_row_dict(r) for r in rows],
+        "next_cursor": encode_cursor(rows[-1].created_at, rows[-1].id) if more else None
+    }
+
+
+def iter_ndjson(filters: dict, chunk: int = CASES_EXPORT_CHUNK):
+    """
+    Every matching case as one JSON line each, newest first
+
+    Walks the keyset in chunks, each on a short-lived session, so an
+    export of the whole table holds neither a connection nor the result
+    set for its full duration.
+    """
+    after = None
+    while True:
+        db = SessionLocal()
+        try:
+            rows = db.execute(build_query(filters, after, chunk)).all()
+        finally:
+            db.close()
+
+        if rows:
+            yield "".join(json.dumps(_row_dict(r)) + "\n" for r in rows)
+
+        if len(rows) < chunk:
+            return
+
+        after = (rows[-1].created_at, rows[-1].id)
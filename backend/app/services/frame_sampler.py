@@ -0,0 +1,286 @@
+import cv2
+import os
+
+# Assumed GOP length in seconds when deciding between grab() stepping and seeking
+KEYFRAME_INTERVAL_SECONDS = float(os.getenv("VIDEO_KEYFRAME_INTERVAL_SECONDS", "2"))
+
+# Never sample frames closer together than this (keeps short clips cheap)
+MIN_FRAME_STRIDE = int(os.getenv("VIDEO_MIN_FRAME_STRIDE", "15"))
+
+DEFAULT_FPS = 25.0
+
+
+def uniform_targets(total_frames: int, count: int) -> list:
+    """Frame indices at the centre of `count` equal segments of the clip"""
+    if total_frames <= 0 or count <= 0:
+        return []
+
+    count = min(count, total_frames)
+    segment = total_frames / count
+
+    return sorted({min(total_frames - 1, int(segment * (i + 0.5))) for i in range(count)})
+
+
+def coarse_to_fine(items: list) -> list:
+    """
+    Reorder a sorted list so every prefix is spread over the whole range
+
+    Bit-reversed index order: the first items split the clip in halves, the
+    next ones in quarters, and so on, so stopping after any prefix still
+    leaves a uniform-looking sample.
+    """
+    n = len(items)
+    if n <= 2:
+        return list(items)
+
+    bits = (n - 1).bit_length()
+    order = []
+    for i in range(1 << bits):
+        j = int(format(i, f"0{bits}b")[::-1], 2)
+        if j < n:
+            order.append(j)
+
+    return [items[j] for j in order]
+
+
+class FrameSampler:
+    """
+    Uniform temporal sampling over a whole clip.
+
+    Target frames are spread across the full duration. Each one is reached by
+    grab()-stepping when it is within one keyframe interval of the current
+    position (a seek would decode from the previous keyframe anyway), and by
+    seeking with CAP_PROP_POS_FRAMES otherwise. Only target frames are
+    retrieved. Containers that cannot seek or report no frame count fall back
+    to a single sequential grab() pass.
+    """
+
+    def __init__(self, video_path: str, max_frames: int = 40, min_stride: int = MIN_FRAME_STRIDE):
+        self.video_path = video_path
+        self.max_frames = max_frames
+        self.min_stride = max(1, min_stride)
+
+        self.total_frames = 0
+        self.fps = DEFAULT_FPS
+        self.planned = 0
+        self.method = None
+        self.seeks = 0
+        self.grabs = 0
+        self.decoded = 0
+        self.opens = 0
+
+        self._cap = None
+        self._position = 0
+
+    # ------------------------------------------------
+
+    def _open(self):
+        if self._cap is not None:
+            self._cap.release()
+
+        self._cap = cv2.VideoCapture(self.video_path)
+        if not self._cap.isOpened():
+            raise ValueError("Unable to open video")
+
+        self.opens += 1
+        self._position = 0
+        return self._cap
+
+    def _close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def _read_properties(self, cap):
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else DEFAULT_FPS
+
+    def plan(self, total_frames: int) -> list:
+        """Pick target frame indices for a clip of known length"""
+        count = min(self.max_frames, total_frames // self.min_stride + 1)
+        targets = uniform_targets(total_frames, count)
+        self.planned = len(targets)
+        return targets
+
+    def probe(self) -> int:
+        """Read frame count and fps without decoding anything"""
+        try:
+            self._read_properties(self._open())
+        finally:
+            self._close()
+
+        return self.total_frames
+
+    def sample_coarse_to_fine(self, first_round: int, round_size: int):
+        """
+        Yield the uniform plan in rounds, coarse to fine
+
+        The first round covers the whole clip with `first_round` frames and
+        each later round fills the gaps between frames already yielded, so a
+        consumer can stop after any round with an evenly spread sample.
+        Rounds are only decoded when the consumer asks for them. All rounds
+        share one capture and each is read in frame order, so a round costs
+        one backward seek at most on top of what its spacing needs. Clips
+        of unknown length fall back to the single-pass sampler.
+        """
+        try:
+            cap = self._open()
+            self._read_properties(cap)
+
+            if self.total_frames <= 0:
+                self.method = "sequential"
+                yield from self._sample_unknown_length(cap)
+                return
+
+            order = coarse_to_fine(self.plan(self.total_frames))
+            start, size = 0, max(1, first_round)
+            self.method = "seek"
+
+            while start < len(order):
+                yield from self._sample_targets(sorted(order[start:start + size]))
+                start += size
+                size = max(1, round_size)
+
+        finally:
+            self._close()
+
+    def sample(self, targets: list = None):
+        """
+        Yield (frame_index, timestamp_seconds, frame) for each sampled frame
+
+        Args:
+            targets: Optional explicit frame indices; defaults to a uniform plan
+        """
+        try:
+            cap = self._open()
+            self._read_properties(cap)
+
+            if self.total_frames <= 0:
+                self.method = "sequential"
+                yield from self._sample_unknown_length(cap)
+                return
+
+            if targets is None:
+                targets = self.plan(self.total_frames)
+
+            self.method = "seek"
+            yield from self._sample_targets(sorted(targets))
+
+        finally:
+            self._close()
+
+    def _sample_targets(self, targets: list):
+        """Read sorted targets from the open capture, seeking while it allows"""
+        if self.method == "seek":
+            targets = yield from self._sample_seek(self._cap, targets)
+            if not targets:
+                return
+            # The container refused to seek or landed elsewhere, so our
+            # position is unknown: walk it from the start from here on
+            self.method = "sequential"
+            self._open()
+        elif targets[0] < self._position:
+            self._open()
+
+        yield from self._sample_sequential(self._cap, targets)
+
+    # ------------------------------------------------
+
+    def _sample_seek(self, cap, targets: list):
+        """Seek/step to each target; returns the targets it could not reach"""
+        keyframe_gap = max(1, int(round(self.fps * KEYFRAME_INTERVAL_SECONDS)))
+
+        for i, target in enumerate(targets):
+            gap = target - self._position
+
+            if 0 <= gap <= keyframe_gap:
+                for _ in range(gap):
+                    if not cap.grab():
+                        # Frame count overstated the stream; nothing left to read
+                        return []
+                    self.grabs += 1
+            else:
+                if not cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+                    return targets[i:]
+                if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != target:
+                    return targets[i:]
+                self.seeks += 1
+
+            ret, frame = cap.read()
+            if not ret:
+                return []
+
+            self.decoded += 1
+            self._position = target + 1
+            yield target, target / self.fps, frame
+
+        return []
+
+    def _sample_sequential(self, cap, targets: list):
+        """Grab every frame, retrieving only the targets"""
+        wanted = set(targets)
+        last = max(targets)
+        index = self._position
+
+        while index <= last and cap.grab():
+            self.grabs += 1
+            self._position = index + 1
+
+            if index in wanted:
+                ret, frame = cap.retrieve()
+                if ret:
+                    self.decoded += 1
+                    yield index, index / self.fps, frame
+
+            index += 1
+
+    def _sample_unknown_length(self, cap):
+        """
+        One sequential pass when the frame count is unknown.
+
+        Keeps every `stride`-th frame and doubles the stride (dropping every
+        other kept frame) whenever the buffer overflows, so the survivors stay
+        evenly spread over however long the clip turns out to be.
+        """
+        stride = self.min_stride
+        kept = []
+        index = 0
+
+        while cap.grab():
+            self.grabs += 1
+
+            if index % stride == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    self.decoded += 1
+                    kept.append((index, frame))
+
+                if len(kept) > 2 * self.max_frames:
+                    stride *= 2
+                    kept = [(i, f) for i, f in kept if i % stride == 0]
+
+            index += 1
+
+        self.total_frames = index
+
+        if len(kept) > self.max_frames:
+            step = len(kept) / self.max_frames
+            kept = [kept[int(i * step)] for i in range(self.max_frames)]
+
+        for i, frame in kept:
+            yield i, i / self.fps, frame
+
+    # ------------------------------------------------
+
+    def stats(self) -> dict:
+        return {
+            "method": self.method,
+            "total_frames": self.total_frames,
+            "fps": round(self.fps, 3),
+            "duration_seconds": round(self.total_frames / self.fps, 3) if self.fps else None,
+            "seeks": self.seeks,
+            "grabs": self.grabs,
+            "decoded": self.decoded,
+            "opens": self.opens,
+        }
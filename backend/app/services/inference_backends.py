@@ -0,0 +1,222 @@
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# torch | onnx | onnx-int8
+DETECTOR_BACKEND = os.getenv("DETECTOR_BACKEND", "torch").lower()
+
+# Exported graphs are reused across restarts
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", "models/onnx")
+ONNX_OPSET = int(os.getenv("ONNX_OPSET", "14"))
+# 0 lets ONNX Runtime pick (one thread per physical core)
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+
+# Largest allowed |AI score difference| against PyTorch on the probe images
+PARITY_TOLERANCE = {
+    "onnx": float(os.getenv("DETECTOR_PARITY_TOLERANCE", "0.01")),
+    "onnx-int8": float(os.getenv("DETECTOR_PARITY_TOLERANCE_INT8", "0.05")),
+}
+
+# Labels returned per image, as the transformers pipeline does by default
+TOP_K = 5
+
+
+class TorchBackend:
+    """Eager PyTorch through the transformers image-classification pipeline"""
+
+    name = "torch"
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+
+    def after_fork(self, threads: int):
+        """Size torch's intra-op pool for a forked worker"""
+        import torch
+        torch.set_num_threads(threads)
+
+    def classify(self, images: list) -> list:
+        results = self.classifier(images, batch_size=len(images))
+
+        # A single-image batch may come back unwrapped
+        if len(images) == 1 and results and isinstance(results[0], dict):
+            results = [results]
+
+        return results
+
+
+class OnnxBackend:
+    """
+    The pipeline's classifier exported to ONNX and run with ONNX Runtime.
+
+    Preprocessing still goes through the pipeline's own image processor, so
+    resizing and normalisation are identical to the PyTorch path; only the
+    forward pass moves. With `quantize=True` the graph's weights are
+    dynamically quantized to int8, which is usually the fastest option on
+    CPU-only nodes at a small cost in score accuracy.
+    """
+
+    def __init__(self, classifier, model_name: str, quantize: bool = False):
+        # Fail before the (slow) export if the runtime is missing
+        import onnxruntime  # noqa: F401
+
+        self.name = "onnx-int8" if quantize else "onnx"
+        self.processor = classifier.image_processor
+
+        config = classifier.model.config
+        self.labels = [config.id2label[i] for i in range(config.num_labels)]
+        self.multi_label = config.problem_type == "multi_label_classification" or config.num_labels == 1
+
+        self.path = _export(classifier, model_name, quantize)
+        self._open_session(ONNX_INTRA_OP_THREADS)
+
+    def _open_session(self, threads: int):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(str(self.path), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def after_fork(self, threads: int):
+        """ONNX Runtime's thread pool does not survive fork; open a fresh session"""
+        self._open_session(threads)
+
+    def classify(self, images: list) -> list:
+        pixel_values = self.processor(images=images, return_tensors="np")["pixel_values"].astype(np.float32)
+        logits = self.session.run(None, {self.input_name: pixel_values})[0]
+
+        if self.multi_label:
+            probs = 1.0 / (1.0 + np.exp(-logits))
+        else:
+            shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs = shifted / shifted.sum(axis=1, keepdims=True)
+
+        top_k = min(TOP_K, len(self.labels))
+        results = []
+        for row in probs:
+            order = np.argsort(row)[::-1][:top_k]
+            results.append([{"label": self.labels[i], "score": float(row[i])} for i in order])
+
+        return results
+
+
+def _cache_dir(model_name: str) -> Path:
+    return Path(ONNX_CACHE_DIR) / model_name.replace("/", "__")
+
+
+def _export(classifier, model_name: str, quantize: bool) -> Path:
+    """Export (and optionally quantize) once; later loads reuse the files"""
+    import torch
+
+    directory = _cache_dir(model_name)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    fp32_path = directory / "model.onnx"
+    int8_path = directory / "model.int8.onnx"
+
+    if not fp32_path.exists():
+        print(f"📦 Exporting {model_name} to ONNX...")
+
+        class LogitsOnly(torch.nn.Module):
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+
+            def forward(self, pixel_values):
+                return self.model(pixel_values=pixel_values).logits
+
+        dummy = classifier.image_processor(
+            images=[Image.new("RGB", (224, 224))], return_tensors="pt"
+        )["pixel_values"]
+
+        # Write under a temporary name so an interrupted export is never loaded
+        partial = directory / "model.onnx.partial"
+        with torch.no_grad():
+            torch.onnx.export(
+                LogitsOnly(classifier.model.eval()),
+                (dummy,),
+                str(partial),
+                input_names=["pixel_values"],
+                output_names=["logits"],
+                dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+                opset_version=ONNX_OPSET
+            )
+        os.replace(partial, fp32_path)
+
+    if not quantize:
+        return fp32_path
+
+    if not int8_path.exists():
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        print(f"📦 Quantizing {model_name} to int8...")
+        partial = directory / "model.int8.onnx.partial"
+        quantize_dynamic(str(fp32_path), str(partial), weight_type=QuantType.QInt8)
+        os.replace(partial, int8_path)
+
+    return int8_path
+
+
+# ------------------------------------------------
+
+def probe_images(count: int = 4) -> list:
+    """Deterministic synthetic images for parity checks"""
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 255, 256, dtype=np.uint8)
+
+    images = [
+        Image.fromarray(np.stack([np.tile(gradient, (256, 1))] * 3, axis=-1)),
+        Image.fromarray(rng.integers(0, 256, (256, 256, 3), dtype=np.uint8)),
+    ]
+    while len(images) < count:
+        smooth = rng.integers(0, 256, (16, 16, 3), dtype=np.uint8)
+        images.append(Image.fromarray(smooth).resize((256, 256), Image.BICUBIC))
+
+    return images[:count]
+
+
+def parity_check(reference, candidate, images: list, score_fn) -> float:
+    """Largest |score difference| between two backends over `images`"""
+    expected = [score_fn(r) for r in reference.classify(images)]
+    actual = [score_fn(r) for r in candidate.classify(images)]
+
+    return max(abs(a - b) for a, b in zip(expected, actual))
+
+
+def create_backend(name: str, classifier, model_name: str, score_fn):
+    """
+    Build the requested backend, falling back to PyTorch
+
+    ONNX backends are only used when onnxruntime is installed, the export
+    succeeds and their scores agree with PyTorch within PARITY_TOLERANCE.
+
+    Returns:
+        (backend, parity) where parity is the measured max difference or None
+    """
+    torch_backend = TorchBackend(classifier)
+
+    if name == "torch":
+        return torch_backend, None
+
+    if name not in PARITY_TOLERANCE:
+        print(f"⚠️ Unknown DETECTOR_BACKEND '{name}', using torch")
+        return torch_backend, None
+
+    try:
+        backend = OnnxBackend(classifier, model_name, quantize=(name == "onnx-int8"))
+        parity = parity_check(torch_backend, backend, probe_images(), score_fn)
+    except Exception as e:
+        print(f"⚠️ {name} backend unavailable ({e}), using torch")
+        return torch_backend, None
+
+    if parity > PARITY_TOLERANCE[name]:
+        print(f"⚠️ {name} backend off by {parity:.4f} (> {PARITY_TOLERANCE[name]}), using torch")
+        return torch_backend, parity
+
+    print(f"✅ Inference backend: {name} (parity {parity:.4f})")
+    return backend, parity
@@ -0,0 +1,20 @@
+"""
+Imported by the inference pool's fork server (see worker_pool.py).
+
+Loads the detector once in that single-threaded process, so every worker
+forked from it shares the weight pages. Must not run inference: thread
+pools started here would not survive the fork.
+"""
+import gc
+
+from .ai_detector import get_detector
+
+try:
+    get_detector()
+except Exception as e:
+    # Each worker then loads its own copy (and reports if that fails too)
+    print(f"⚠️ Fork server could not preload the model: {e}")
+
+# Objects created so far never move again; keeping the collector off
+# them stops it dirtying (and un-sharing) pages in every worker
+gc.freeze()
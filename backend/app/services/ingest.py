@@ -0,0 +1,143 @@
+import hashlib
+import os
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path
+
+import aiofiles
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+class UploadTooLargeError(ValueError):
+    """Raised while streaming once an upload passes the size limit"""
+
+
+class SpooledUpload:
+    """An upload that has been streamed to a temp file and hashed in the same pass"""
+
+    def __init__(self, temp_path: str, sha256: str, size: int):
+        self.temp_path = temp_path
+        self.sha256 = sha256
+        self.size = size
+
+    def move_to(self, dest_path) -> str:
+        """Atomically move the spooled file into its final location"""
+        dest_path = str(dest_path)
+        os.replace(self.temp_path, dest_path)
+        self.temp_path = None
+        return dest_path
+
+    def discard(self):
+        """Remove the temp file if it was never moved into place"""
+        if self.temp_path and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+        self.temp_path = None
+
+
+def _temp_path(dest_dir: str) -> str:
+    Path(dest_dir).mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=dest_dir, prefix=".upload-", suffix=".part")
+    os.close(fd)
+    # mkstemp creates 0600 files; match what a plain open() would have produced
+    os.chmod(temp_path, 0o644)
+    return temp_path
+
+
+async def ingest_upload(file, dest_dir: str, max_size: int, chunk_size: int = UPLOAD_CHUNK_SIZE) -> SpooledUpload:
+    """
+    Stream an UploadFile to disk once, hashing it as it goes
+
+    The temp file is created inside `dest_dir` so the final move is an atomic
+    rename on the same filesystem. Only one chunk is ever held in memory.
+
+    Raises:
+        UploadTooLargeError: as soon as more than `max_size` bytes arrive
+    """
+    temp_path = _temp_path(dest_dir)
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError("File too large")
+
+                digest.update(chunk)
+                await out.write(chunk)
+
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return SpooledUpload(temp_path, digest.hexdigest(), size)
+
+
+def spool_stream(stream, dest_dir: str, max_size: int, chunk_size: int = UPLOAD_CHUNK_SIZE) -> SpooledUpload:
+    """
+    Blocking counterpart of ingest_upload for file-like objects, e.g. archive members
+
+    The size is counted from the bytes actually read, never from archive
+    headers, so a crafted entry cannot slip past `max_size`.
+    """
+    temp_path = _temp_path(dest_dir)
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(temp_path, "wb") as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError("File too large")
+
+                digest.update(chunk)
+                out.write(chunk)
+
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return SpooledUpload(temp_path, digest.hexdigest(), size)
+
+
+def is_archive(filename: str) -> bool:
+    return (filename or "").lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def iter_archive(fileobj, filename: str):
+    """
+    Yield (member name, readable stream) for each regular file in a ZIP or TAR
+
+    Members are decompressed lazily as their stream is read; nothing is
+    unpacked up front. TAR archives (optionally compressed) are read as a
+    forward-only stream, so each member must be consumed before the next
+    one is requested. ZIP needs a seekable file for its central directory.
+    """
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                with archive.open(info) as stream:
+                    yield info.filename, stream
+        return
+
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            yield member.name, archive.extractfile(member)
@@ -0,0 +1,262 @@
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, and_
+
+from ..models import SessionLocal, AnalysisJob
+from .media_store import get_media_store
+
+# How long a claimed job stays invisible to other workers; running workers
+# extend it by heartbeat, so it only runs out when a worker dies or hangs
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", str(JOB_LEASE_SECONDS / 4)))
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_BACKOFF_SECONDS = float(os.getenv("JOB_BACKOFF_SECONDS", "10"))
+
+# Candidates fetched per claim attempt (others may win the race for some)
+JOB_CLAIM_CANDIDATES = 8
+
+
+def _new_job_id() -> str:
+    return f"JOB-{datetime.now().strftime('%Y%m%d%H%M%S')}-{str(uuid.uuid4())[:8]}"
+
+
+def _snapshot(job: AnalysisJob) -> dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "priority": job.priority,
+        "filename": job.filename,
+        "media_type": job.media_type,
+        "media_hash": job.media_hash,
+        "upload_path": job.upload_path,
+        "attempts": job.attempts,
+        "case_id": job.case_id,
+        "last_error": job.last_error,
+    }
+
+
+def enqueue(upload, filename: str, media_type: str, priority: int = 0) -> str:
+    """Store a spooled upload and queue it for analysis (blocking)"""
+    job_id = _new_job_id()
+
+    # The job holds a reference to its upload until it finishes
+    store = get_media_store()
+    upload_path = store.put(upload)
+
+    db = SessionLocal()
+    try:
+        store.acquire(db, upload.sha256)
+        db.add(AnalysisJob(
+            id=job_id,
+            status="queued",
+            priority=priority,
+            filename=filename,
+            media_type=media_type,
+            media_hash=upload.sha256,
+            upload_path=upload_path,
+            attempts=0,
+            available_at=datetime.utcnow(),
+            created_at=datetime.utcnow()
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+    return job_id
+
+
+# ------------------------------------------------
+# Worker side
+
+def _expire_abandoned(db, now: datetime):
+    """Fail jobs whose worker died on their last allowed attempt"""
+    abandoned = db.query(AnalysisJob).filter(
+        AnalysisJob.status == "running",
+        AnalysisJob.available_at <= now,
+        AnalysisJob.attempts >= JOB_MAX_ATTEMPTS
+    ).all()
+
+    for job in abandoned:
+        job.status = "failed"
+        job.last_error = f"Worker lost the job on attempt {job.attempts} of {JOB_MAX_ATTEMPTS}"
+        job.lease_owner = None
+        job.finished_at = now
+        get_media_store().release(db, job.media_hash)
+
+    if abandoned:
+        db.commit()
+
+
+def claim(owner: str):
+    """
+    Lease the next runnable job for `owner` (blocking)
+
+    Runnable means queued and due, or running with an expired lease, which
+    is how jobs of crashed workers are recovered. Higher priority first,
+    then oldest. The conditional UPDATE makes the claim atomic across
+    processes without row locks, the same way anchoring claims its jobs.
+
+    Returns:
+        Job snapshot dict, or None when nothing is runnable
+    """
+    now = datetime.utcnow()
+    runnable = and_(
+        AnalysisJob.status.in_(("queued", "running")),
+        AnalysisJob.available_at <= now
+    )
+
+    db = SessionLocal()
+    try:
+        _expire_abandoned(db, now)
+
+        candidates = db.query(AnalysisJob.id).filter(runnable).order_by(
+            AnalysisJob.priority.desc(),
+            AnalysisJob.created_at
+        ).limit(JOB_CLAIM_CANDIDATES).all()
+
+        for (job_id,) in candidates:
+            claimed = db.query(AnalysisJob).filter(AnalysisJob.id == job_id, runnable).update(
+                {
+                    AnalysisJob.status: "running",
+                    AnalysisJob.lease_owner: owner,
+                    AnalysisJob.available_at: now + timedelta(seconds=JOB_LEASE_SECONDS),
+                    AnalysisJob.attempts: AnalysisJob.attempts + 1,
+                    AnalysisJob.started_at: now
+                },
+                synchronize_session=False
+            )
+            db.commit()
+
+            if claimed == 1:
+                return _snapshot(db.get(AnalysisJob, job_id))
+
+        return None
+    finally:
+        db.close()
+
+
+def _owned(db, job_id: str, owner: str):
+    return db.query(AnalysisJob).filter(
+        AnalysisJob.id == job_id,
+        AnalysisJob.status == "running",
+        AnalysisJob.lease_owner == owner
+    )
+
+
+def heartbeat(job_id: str, owner: str) -> bool:
+    """Extend the lease; False once another worker has taken the job over"""
+    db = SessionLocal()
+    try:
+        extended = _owned(db, job_id, owner).update(
+            {AnalysisJob.available_at: datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)},
+            synchronize_session=False
+        )
+        db.commit()
+        return extended == 1
+    finally:
+        db.close()
+
+
+def complete(job_id: str, owner: str, result: dict) -> bool:
+    db = SessionLocal()
+    try:
+        job = _owned(db, job_id, owner).first()
+        if not job:
+            return False
+
+        job.status = "done"
+        job.result = json.dumps(result, default=str)
+        job.case_id = result.get("case_id")
+        job.lease_owner = None
+        job.last_error = None
+        job.finished_at = datetime.utcnow()
+        get_media_store().release(db, job.media_hash)
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+
+def fail(job_id: str, owner: str, error: str) -> bool:
+    """Record a failed attempt: retry with backoff, or give up after JOB_MAX_ATTEMPTS"""
+    db = SessionLocal()
+    try:
+        job = _owned(db, job_id, owner).first()
+        if not job:
+            return False
+
+        now = datetime.utcnow()
+        job.last_error = error[:2000]
+        job.lease_owner = None
+
+        if job.attempts >= JOB_MAX_ATTEMPTS:
+            job.status = "failed"
+            job.finished_at = now
+            get_media_store().release(db, job.media_hash)
+        else:
+            job.status = "queued"
+            job.available_at = now + timedelta(seconds=JOB_BACKOFF_SECONDS * (2 ** (job.attempts - 1)))
+
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+
+# ------------------------------------------------
+# Readers
+
+def get_job(job_id: str):
+    db = SessionLocal()
+    try:
+        job = db.get(AnalysisJob, job_id)
+        if not job:
+            return None
+
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "priority": job.priority,
+            "filename": job.filename,
+            "media_type": job.media_type,
+            "attempts": job.attempts,
+            "max_attempts": JOB_MAX_ATTEMPTS,
+            "case_id": job.case_id,
+            "result": json.loads(job.result) if job.result else None,
+            "error": job.last_error,
+            "created_at": job.created_at.isoformat(),
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        }
+    finally:
+        db.close()
+
+
+def job_queue_stats() -> dict:
+    db = SessionLocal()
+    try:
+        counts = dict(
+            db.query(AnalysisJob.status, func.count(AnalysisJob.id)).group_by(AnalysisJob.status).all()
+        )
+        expired = db.query(func.count(AnalysisJob.id)).filter(
+            AnalysisJob.status == "running",
+            AnalysisJob.available_at <= datetime.utcnow()
+        ).scalar()
+        oldest = db.query(func.min(AnalysisJob.created_at)).filter(AnalysisJob.status == "queued").scalar()
+    finally:
+        db.close()
+
+    return {
+        "queued": counts.get("queued", 0),
+        "running": counts.get("running", 0),
+        "done": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "expired_leases": expired,
+        "oldest_queued_seconds": round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else None,
+        "lease_seconds": JOB_LEASE_SECONDS,
+        "max_attempts": JOB_MAX_ATTEMPTS,
+    }
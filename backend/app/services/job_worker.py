@@ -0,0 +1,242 @@
+"""
+Worker processes for queued analysis jobs.
+
+    python -m app.services.job_worker --processes 2
+
+The supervisor loads the detector once and forks the workers from it, as
+the inference pool does, so the weights are shared copy-on-write. Each
+worker claims jobs from the analysis_jobs table, runs the same analysis
+as POST /analyze plus the PDF report, and records the outcome. A worker
+that dies is forked again; the lease on whatever it was running expires
+and another worker picks the job up.
+"""
+import argparse
+import asyncio
+import gc
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import threading
+import time
+import traceback
+from multiprocessing.connection import wait
+
+from dotenv import load_dotenv
+
+from . import job_queue
+from .ai_detector import get_detector
+from .analysis import analyze_spooled, AnalysisError
+from .ingest import SpooledUpload
+from .media_store import get_media_store
+from .pipeline import get_pipeline
+from .report_builder import get_report_builder
+
+JOB_WORKER_PROCESSES = int(os.getenv("JOB_WORKER_PROCESSES", "2"))
+
+# Intra-op threads per worker; by default the cores are split evenly
+JOB_WORKER_THREADS = int(os.getenv(
+    "JOB_WORKER_THREADS",
+    str(max(1, (os.cpu_count() or 1) // max(1, JOB_WORKER_PROCESSES)))
+))
+
+# Idle wait between claims when the queue is empty
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+
+
+def _working_copy(job: dict) -> SpooledUpload:
+    """
+    A spooled copy of the job's stored upload for analyze_spooled to consume
+
+    Hard-linked next to the store, so it costs no copy and the stored
+    object stays put until the job releases it.
+    """
+    store = get_media_store()
+    temp_path = store.temp_path()
+    os.remove(temp_path)
+    try:
+        os.link(job["upload_path"], temp_path)
+    except OSError:
+        shutil.copyfile(job["upload_path"], temp_path)
+
+    return SpooledUpload(temp_path, job["media_hash"], os.path.getsize(temp_path))
+
+
+class _Heartbeat:
+    """Keeps a job's lease alive while it runs"""
+
+    def __init__(self, job_id: str, owner: str):
+        self.job_id = job_id
+        self.owner = owner
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="job-heartbeat", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(job_queue.JOB_HEARTBEAT_SECONDS):
+            try:
+                if not job_queue.heartbeat(self.job_id, self.owner):
+                    print(f"⚠️ Lost the lease on {self.job_id}")
+                    return
+            except Exception as e:
+                print(f"⚠️ Heartbeat for {self.job_id} failed: {e}")
+
+
+async def process_job(job: dict, owner: str):
+    """Analyse one claimed job and record the outcome"""
+    pipeline = get_pipeline()
+    upload = await pipeline.io.run(_working_copy, job)
+
+    with _Heartbeat(job["job_id"], owner):
+        try:
+            result = await analyze_spooled(upload, job["filename"], job["media_type"], prebuild_report=False)
+
+            # The job is done once its report is on disk too
+            if await get_report_builder().get(result["case_id"]):
+                result["report_url"] = f"/api/detect/report/{result['case_id']}"
+        except Exception as e:
+            reason = str(e) if isinstance(e, AnalysisError) else f"{type(e).__name__}: {e}"
+            print(f"❌ Job {job['job_id']} attempt {job['attempts']} failed: {reason}")
+            if not isinstance(e, AnalysisError):
+                traceback.print_exc()
+            await pipeline.db.run(job_queue.fail, job["job_id"], owner, reason)
+            return False
+        finally:
+            upload.discard()
+
+    if not await pipeline.db.run(job_queue.complete, job["job_id"], owner, result):
+        print(f"⚠️ Job {job['job_id']} finished after its lease moved on; result dropped")
+        return False
+
+    return True
+
+
+async def run_worker(owner: str, stop: threading.Event = None, max_jobs: int = None):
+    """Claim and process jobs until `stop` is set (or `max_jobs` ran)"""
+    pipeline = get_pipeline()
+    processed = 0
+
+    while not (stop and stop.is_set()):
+        if max_jobs is not None and processed >= max_jobs:
+            return processed
+
+        try:
+            job = await pipeline.db.run(job_queue.claim, owner)
+        except Exception as e:
+            print(f"❌ Claiming a job failed: {e}")
+            job = None
+
+        if job is None:
+            if max_jobs is not None:
+                return processed
+            await asyncio.sleep(JOB_POLL_SECONDS)
+            continue
+
+        await process_job(job, owner)
+        processed += 1
+
+    return processed
+
+
+# ------------------------------------------------
+# Supervisor
+
+def _worker_main(index: int, threads: int, stop):
+    """Job worker loop; runs in the forked child"""
+    # The supervisor decides when we stop; finish the current job first
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    detector = get_detector()
+    detector.after_fork(threads)
+    detector.warm_up()
+    detector.reset_stats()
+
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"🛠️ Job worker {index} ready ({owner})")
+
+    asyncio.run(run_worker(owner, stop))
+
+
+class JobWorkerSupervisor:
+    """Forks the job workers from a loaded detector and restarts any that die"""
+
+    def __init__(self, processes: int = JOB_WORKER_PROCESSES, threads: int = JOB_WORKER_THREADS):
+        self.processes = processes
+        self.threads = threads
+
+        self._ctx = multiprocessing.get_context("fork")
+        self._stop = self._ctx.Event()
+        self._children = [None] * processes
+        self.restarts = 0
+
+    def _spawn(self, index: int):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self.threads, self._stop),
+            name=f"job-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self._children[index] = process
+
+    def run(self):
+        get_detector()
+
+        # Objects created so far never move again; keeping the collector off
+        # them stops it dirtying (and un-sharing) pages in every worker
+        gc.freeze()
+
+        for index in range(self.processes):
+            self._spawn(index)
+
+        print(f"🛠️ Job workers: {self.processes} processes x {self.threads} threads")
+
+        signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+        try:
+            while not self._stop.is_set():
+                sentinels = {p.sentinel: i for i, p in enumerate(self._children)}
+                for ready in wait(list(sentinels), timeout=1.0):
+                    if self._stop.is_set():
+                        break
+
+                    index = sentinels[ready]
+                    self._children[index].join(timeout=1)
+                    print(f"💥 Job worker {index} exited ({self._children[index].exitcode}); restarting")
+                    self.restarts += 1
+                    self._spawn(index)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        print("🛠️ Stopping job workers after their current jobs...")
+
+        deadline = time.monotonic() + job_queue.JOB_LEASE_SECONDS
+        for process in self._children:
+            if process:
+                process.join(timeout=max(0.0, deadline - time.monotonic()))
+                if process.is_alive():
+                    # Its lease expires and another worker retries the job
+                    process.terminate()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Run analysis job workers")
+    parser.add_argument("--processes", type=int, default=JOB_WORKER_PROCESSES)
+    parser.add_argument("--threads", type=int, default=JOB_WORKER_THREADS)
+    args = parser.parse_args()
+
+    JobWorkerSupervisor(args.processes, args.threads).run()
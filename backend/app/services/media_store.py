@@ -0,0 +1,356 @@
+"""
+Content-addressed store for uploaded media and rendered reports.
+
+Every file lives at {MEDIA_STORE_DIR}/ab/cd/abcd... named by its SHA-256,
+so identical bytes are kept once however often they arrive, no directory
+grows past a few thousand entries, and nothing user-supplied ends up in a
+path. Files are moved into place with an atomic rename.
+
+Each object has a row in stored_objects whose refcount is the number of
+records (cases, reports, queued jobs) pointing at it. Owners acquire and
+release references inside the transaction that creates or drops the
+record. Files derived from an object, such as report previews, are kept
+beside it as sidecars (abcd....preview.jpg) and go with it. Objects
+nobody references are removed by garbage collection once they have been
+left alone for MEDIA_STORE_GC_GRACE_SECONDS, which covers an analysis
+between storing its upload and saving its case:
+
+    python -m app.services.media_store --gc
+"""
+import argparse
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import select, update, delete, insert, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ..models import SessionLocal, StoredObject
+
+MEDIA_STORE_DIR = os.getenv("MEDIA_STORE_DIR", "store")
+
+# Unreferenced objects younger than this are never collected
+MEDIA_STORE_GC_GRACE_SECONDS = float(os.getenv("MEDIA_STORE_GC_GRACE_SECONDS", "3600"))
+
+# How long a put waits for garbage collection of the same object to finish
+MEDIA_STORE_PUT_RETRIES = 50
+MEDIA_STORE_RETRY_SECONDS = 0.1
+
+_HASH_CHUNK = 1024 * 1024
+
+
+class MediaStoreError(RuntimeError):
+    """An object is missing from the store or is being collected"""
+
+
+def shard_path(root, sha256: str, suffix: str = "") -> Path:
+    """Where a hash-named file lives under `root`: ab/cd/abcd..."""
+    return Path(root) / sha256[:2] / sha256[2:4] / f"{sha256}{suffix}"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaStore:
+    """
+    Sharded, deduplicating file store with reference-counted objects.
+
+    Putting a file registers its row first and only then renames the file
+    into place, while garbage collection marks the row, unlinks the file
+    and only then deletes the row. A put therefore never places a file
+    that a running collection is about to remove, and a put that finds
+    the row but not the file (an interrupted put) simply places it again.
+    """
+
+    def __init__(self, root: str = MEDIA_STORE_DIR):
+        self.root = Path(root)
+        self.tmp_dir = self.root / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.stored = 0
+        self.deduplicated = 0
+        self.collected = 0
+        self.collected_bytes = 0
+
+    def path(self, sha256: str) -> str:
+        return str(shard_path(self.root, sha256))
+
+    def exists(self, sha256: str) -> bool:
+        return bool(sha256) and os.path.exists(self.path(sha256))
+
+    def sidecar_path(self, sha256: str, name: str) -> str:
+        """Where a file derived from an object lives; collected together with it"""
+        return str(shard_path(self.root, sha256, f".{name}"))
+
+    def put_sidecar(self, src_path: str, sha256: str, name: str) -> str:
+        """Move a file from `temp_path` into place as a sidecar of an object"""
+        dest = self.sidecar_path(sha256, name)
+        self._place(src_path, dest)
+        return dest
+
+    def _remove(self, sha256: str) -> int:
+        """Unlink an object and its sidecars; returns the bytes freed"""
+        object_path = Path(self.path(sha256))
+        freed = 0
+
+        for path in [object_path, *object_path.parent.glob(f"{sha256}.*")]:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                freed += size
+            except FileNotFoundError:
+                pass
+
+        return freed
+
+    def temp_path(self, suffix: str = "") -> str:
+        """A fresh file on the store's filesystem to write into before `put_file`"""
+        fd, path = tempfile.mkstemp(dir=self.tmp_dir, prefix=".put-", suffix=suffix)
+        os.close(fd)
+        os.chmod(path, 0o644)
+        return path
+
+    # ------------------------------------------------
+    # Storing (blocking)
+
+    def put(self, upload, kind: str = "media", db=None) -> str:
+        """Move a SpooledUpload into the store; returns its object path"""
+        self.put_file(upload.temp_path, upload.sha256, kind, db=db)
+        upload.temp_path = None
+        return self.path(upload.sha256)
+
+    def put_file(self, src_path: str, sha256: str = None, kind: str = "media", db=None) -> str:
+        """
+        Move a file into the store, or drop it if the bytes are already there
+
+        The object starts unreferenced; owners `acquire` it. Pass `db` to
+        register it in the caller's transaction instead of a session of
+        its own.
+
+        Returns:
+            The object's SHA-256
+        """
+        sha256 = sha256 or file_sha256(src_path)
+        size = os.path.getsize(src_path)
+
+        for _ in range(MEDIA_STORE_PUT_RETRIES):
+            if db is not None:
+                state = self._register(db, sha256, kind, size)
+            else:
+                session = SessionLocal()
+                try:
+                    state = self._register(session, sha256, kind, size)
+                    session.commit()
+                finally:
+                    session.close()
+
+            if state == "collecting":
+                time.sleep(MEDIA_STORE_RETRY_SECONDS)
+                continue
+
+            dest = self.path(sha256)
+            if state == "created" or not os.path.exists(dest):
+                self._place(src_path, dest)
+                with self._lock:
+                    self.stored += 1
+            else:
+                os.remove(src_path)
+                with self._lock:
+                    self.deduplicated += 1
+
+            return sha256
+
+        raise MediaStoreError(f"Object {sha256} is still being collected")
+
+    def _register(self, db, sha256: str, kind: str, size: int) -> str:
+        """'existing', 'created', or 'collecting' if garbage collection holds the row"""
+        now = datetime.utcnow()
+
+        touched = db.execute(
+            update(StoredObject)
+            .where(StoredObject.sha256 == sha256, StoredObject.refcount >= 0)
+            .values(touched_at=now)
+        ).rowcount
+        if touched:
+            return "existing"
+
+        row = {"sha256": sha256, "kind": kind, "size": size, "refcount": 0, "created_at": now, "touched_at": now}
+        dialect = db.get_bind().dialect.name
+
+        if dialect in ("sqlite", "postgresql"):
+            created = db.execute(
+                (sqlite_insert if dialect == "sqlite" else pg_insert)(StoredObject).values(**row).on_conflict_do_nothing()
+            ).rowcount
+        elif db.execute(select(StoredObject.sha256).where(StoredObject.sha256 == sha256)).first() is None:
+            created = db.execute(insert(StoredObject).values(**row)).rowcount
+        else:
+            created = 0
+
+        # A row we could neither touch nor create is being collected
+        return "created" if created else "collecting"
+
+    def _place(self, src_path: str, dest: str):
+        Path(dest).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(src_path, dest)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Spooled on another filesystem: copy next to the store, then rename
+            staged = self.temp_path()
+            shutil.copyfile(src_path, staged)
+            os.replace(staged, dest)
+            os.remove(src_path)
+
+    # ------------------------------------------------
+    # References (inside the owner's transaction)
+
+    def acquire(self, db, sha256: str):
+        acquired = db.execute(
+            update(StoredObject)
+            .where(StoredObject.sha256 == sha256, StoredObject.refcount >= 0)
+            .values(refcount=StoredObject.refcount + 1, touched_at=datetime.utcnow())
+        ).rowcount
+
+        if not acquired:
+            raise MediaStoreError(f"Object {sha256} is not in the store")
+
+    def release(self, db, sha256: str):
+        if not sha256:
+            return
+
+        db.execute(
+            update(StoredObject)
+            .where(StoredObject.sha256 == sha256, StoredObject.refcount > 0)
+            .values(refcount=StoredObject.refcount - 1, touched_at=datetime.utcnow())
+        )
+
+    # ------------------------------------------------
+    # Garbage collection
+
+    def gc(self, grace_seconds: float = MEDIA_STORE_GC_GRACE_SECONDS, limit: int = 1000) -> dict:
+        """
+        Remove up to `limit` unreferenced objects untouched for `grace_seconds`
+
+        Sidecars go with their object. Rows left at refcount -1 by an
+        interrupted collection are finished off too. Stale temp files are
+        removed as well.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        removed = 0
+        freed = 0
+
+        db = SessionLocal()
+        try:
+            candidates = db.execute(
+                select(StoredObject.sha256, StoredObject.refcount)
+                .where(StoredObject.refcount <= 0, StoredObject.touched_at < cutoff)
+                .limit(limit)
+            ).all()
+
+            for sha256, refcount in candidates:
+                # Claim it; an acquire or put since the query wins instead
+                marked = db.execute(
+                    update(StoredObject)
+                    .where(
+                        StoredObject.sha256 == sha256,
+                        StoredObject.refcount == refcount,
+                        StoredObject.touched_at < cutoff
+                    )
+                    .values(refcount=-1)
+                ).rowcount
+                db.commit()
+
+                if not marked:
+                    continue
+
+                freed += self._remove(sha256)
+                db.execute(delete(StoredObject).where(StoredObject.sha256 == sha256, StoredObject.refcount == -1))
+                db.commit()
+
+                removed += 1
+        finally:
+            db.close()
+
+        # Puts that crashed before renaming their file into place
+        horizon = time.time() - grace_seconds
+        for temp in self.tmp_dir.glob(".put-*"):
+            try:
+                if temp.stat().st_mtime < horizon:
+                    temp.unlink()
+            except FileNotFoundError:
+                pass
+
+        with self._lock:
+            self.collected += removed
+            self.collected_bytes += freed
+
+        return {"removed": removed, "freed_bytes": freed}
+
+    # ------------------------------------------------
+
+    def stats(self) -> dict:
+        db = SessionLocal()
+        try:
+            unreferenced = db.execute(
+                select(func.count()).select_from(StoredObject).where(StoredObject.refcount <= 0)
+            ).scalar()
+        finally:
+            db.close()
+
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "unreferenced_objects": unreferenced,
+                "stored": self.stored,
+                "deduplicated": self.deduplicated,
+                "collected": self.collected,
+                "collected_bytes": self.collected_bytes,
+                "gc_grace_seconds": MEDIA_STORE_GC_GRACE_SECONDS,
+            }
+
+
+# ------------------------------------------------
+# Singleton
+
+_media_store = None
+
+
+def get_media_store():
+    global _media_store
+    if _media_store is None:
+        _media_store = MediaStore()
+    return _media_store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Content-addressed media store")
+    parser.add_argument("--gc", action="store_true", help="remove unreferenced objects past the grace period")
+    parser.add_argument("--grace", type=float, default=MEDIA_STORE_GC_GRACE_SECONDS, help="grace period in seconds")
+    args = parser.parse_args()
+
+    if args.gc:
+        store = get_media_store()
+        total = {"removed": 0, "freed_bytes": 0}
+        while True:
+            result = store.gc(args.grace)
+            total["removed"] += result["removed"]
+            total["freed_bytes"] += result["freed_bytes"]
+            if not result["removed"]:
+                break
+        print(f"🧹 Removed {total['removed']} unreferenced objects ({total['freed_bytes'] / 1024 / 1024:.1f} MB)")
+    else:
+        parser.print_help()
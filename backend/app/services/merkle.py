@@ -0,0 +1,83 @@
+import hashlib
+
+# Domain-separation prefixes so a leaf can never be passed off as an inner node
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def _sha256(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+def evidence_leaf(case_id: str, media_hash: str, report_hash: str) -> str:
+    """Hex leaf hash committing to one case's identifiers and hashes"""
+    payload = "|".join([case_id, media_hash, report_hash]).encode()
+    return _sha256(LEAF_PREFIX + payload).hex()
+
+
+def _parent(left: bytes, right: bytes) -> bytes:
+    return _sha256(NODE_PREFIX + left + right)
+
+
+class MerkleTree:
+    """
+    Binary SHA-256 Merkle tree over hex leaf hashes.
+
+    An odd node at the end of a level is promoted unchanged to the next level
+    (no self-pairing), so proofs never contain a duplicated sibling.
+    """
+
+    def __init__(self, leaves: list):
+        if not leaves:
+            raise ValueError("Cannot build a Merkle tree with no leaves")
+
+        self.leaves = list(leaves)
+        self.levels = [[bytes.fromhex(leaf) for leaf in self.leaves]]
+
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            nxt = [_parent(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                nxt.append(level[-1])
+            self.levels.append(nxt)
+
+    @property
+    def root(self) -> str:
+        return self.levels[-1][0].hex()
+
+    def proof(self, index: int) -> list:
+        """
+        Sibling path from leaf `index` up to the root
+
+        Returns:
+            List of {"hash": hex, "position": "left" | "right"} steps
+        """
+        if not 0 <= index < len(self.leaves):
+            raise IndexError("Leaf index out of range")
+
+        path = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                path.append({
+                    "hash": level[sibling].hex(),
+                    "position": "left" if sibling < index else "right"
+                })
+            index //= 2
+
+        return path
+
+
+def compute_root(leaf: str, proof: list) -> str:
+    """Fold a proof path onto a leaf to recover the root it commits to"""
+    node = bytes.fromhex(leaf)
+
+    for step in proof:
+        sibling = bytes.fromhex(step["hash"])
+        node = _parent(sibling, node) if step["position"] == "left" else _parent(node, sibling)
+
+    return node.hex()
+
+
+def verify_proof(leaf: str, proof: list, root: str) -> bool:
+    return compute_root(leaf, proof) == root
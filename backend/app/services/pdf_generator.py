@@ -10,6 +10,10 @@ from pathlib import Path
 import hashlib
 import os
 
+# Bump whenever the report layout or wording changes; cached PDFs built
+# from an older template are then rebuilt on their next download
+REPORT_TEMPLATE_VERSION = "forensic-v2"
+
 class ForensicPDFGenerator:
     """Generate professional forensic analysis reports"""
     
@@ -112,13 +116,15 @@ class ForensicPDFGenerator:
         
         canvas_obj.restoreState()
     
-    def generate_report(self, case_data: dict, media_path: str = None) -> str:
+    def generate_report(self, case_data: dict, media_path: str = None, output_path: str = None) -> str:
         """
         Generate forensic PDF report
         
         Args:
             case_data: Dictionary containing case information
-            media_path: Optional path to media file for inclusion
+            media_path: Optional preview image to embed (a thumbnail, or a
+                contact sheet for videos)
+            output_path: Where to write the PDF (defaults to the reports folder)
             
         Returns:
             Path to generated PDF file
@@ -126,7 +132,7 @@ class ForensicPDFGenerator:
         # Create filename
         case_id = case_data['case_id']
         pdf_filename = f"{case_id}_forensic_report.pdf"
-        pdf_path = os.path.join(self.reports_folder, pdf_filename)
+        pdf_path = output_path or os.path.join(self.reports_folder, pdf_filename)
         
         # Create PDF document
         doc = SimpleDocTemplate(
@@ -220,12 +226,15 @@ class ForensicPDFGenerator:
         story.append(Spacer(1, 0.3 * inch))
         
         # Include media preview if available
-        if media_path and os.path.exists(media_path) and case_data['media_type'] == 'image':
+        if media_path and os.path.exists(media_path):
             try:
                 story.append(Paragraph("MEDIA PREVIEW", self.styles['SectionHeader']))
-                img = RLImage(media_path, width=4*inch, height=3*inch, kind='proportional')
+                img = RLImage(media_path, width=6*inch if case_data['media_type'] == 'video' else 4*inch,
+                              height=3*inch, kind='proportional')
                 img.hAlign = 'CENTER'
                 story.append(img)
+                if case_data['media_type'] == 'video':
+                    story.append(Paragraph("Frames sampled evenly across the video", self.styles['Subtitle']))
                 story.append(Spacer(1, 0.2 * inch))
             except:
                 pass
@@ -0,0 +1,90 @@
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .frame_sampler import FrameSampler
+
+# Frames fingerprinted per video, spread over the clip
+PHASH_VIDEO_FRAMES = int(os.getenv("PHASH_VIDEO_FRAMES", "8"))
+
+# Images are decoded at reduced size (JPEG draft mode) before hashing
+PHASH_DECODE_SIZE = 256
+
+HASH_KINDS = ("ahash", "dhash", "phash")
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    """Pack a boolean array (row-major) into a 64-bit integer"""
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), "big")
+
+
+def average_hash(gray: np.ndarray) -> int:
+    """aHash: 8x8 mean-thresholded thumbnail"""
+    small = cv2.resize(gray, (8, 8), interpolation=cv2.INTER_AREA).astype(np.float32)
+    return _bits_to_int(small > small.mean())
+
+
+def difference_hash(gray: np.ndarray) -> int:
+    """dHash: sign of horizontal gradients on a 9x8 thumbnail"""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.float32)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def perceptual_hash(gray: np.ndarray) -> int:
+    """pHash: low-frequency 8x8 DCT block of a 32x32 thumbnail, median-thresholded"""
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    # Exclude the DC term from the median so flat images don't skew the threshold
+    return _bits_to_int(low > np.median(low.ravel()[1:]))
+
+
+def fingerprint(gray: np.ndarray) -> dict:
+    """All three hashes of a grayscale uint8 array"""
+    return {
+        "ahash": average_hash(gray),
+        "dhash": difference_hash(gray),
+        "phash": perceptual_hash(gray),
+    }
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def from_hex(value: str) -> int:
+    return int(value, 16)
+
+
+# ------------------------------------------------
+
+def _image_gray(path: str) -> np.ndarray:
+    with Image.open(path) as img:
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale directly; other formats ignore this
+        img.draft("L", (PHASH_DECODE_SIZE, PHASH_DECODE_SIZE))
+        img = img.convert("L")
+        img.thumbnail((PHASH_DECODE_SIZE, PHASH_DECODE_SIZE))
+        return np.asarray(img)
+
+
+def compute_media_fingerprints(path: str, media_type: str) -> list:
+    """
+    Perceptual hashes for an uploaded file
+
+    Returns:
+        List of {"frame_index": int | None, "ahash", "dhash", "phash"}; one
+        entry for an image, one per sampled frame for a video
+    """
+    if media_type == "image":
+        return [{"frame_index": None, **fingerprint(_image_gray(path))}]
+
+    sampler = FrameSampler(path, max_frames=PHASH_VIDEO_FRAMES)
+    return [
+        {"frame_index": index, **fingerprint(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))}
+        for index, _, frame in sampler.sample()
+    ]
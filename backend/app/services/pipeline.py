@@ -0,0 +1,150 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+class StageBusyError(RuntimeError):
+    """Raised when a stage's queue is already at its limit"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Pipeline stage '{stage}' is at capacity")
+        self.stage = stage
+
+
+class Stage:
+    """
+    A bounded executor for one kind of blocking work.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more may
+    wait; beyond that `run` raises StageBusyError instead of piling up
+    unbounded work behind a slow dependency.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"stage-{name}")
+
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._max_queued = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+
+    # ------------------------------------------------
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking callable on this stage without blocking the event loop"""
+        with self._lock:
+            if self._queued + self._running >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise StageBusyError(self.name)
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._wait_total += started - submitted
+
+            failed = False
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._run_total += time.perf_counter() - started
+                    if failed:
+                        self._failed += 1
+
+        future = self._executor.submit(task)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _on_done(self, future):
+        # A job cancelled before it started never decremented the queue
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._completed
+
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "running": self._running,
+                "max_queued": self._max_queued,
+                "completed": completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_total / completed * 1000, 3) if completed else 0.0,
+                "avg_run_ms": round(self._run_total / completed * 1000, 3) if completed else 0.0,
+            }
+
+
+class AnalysisPipeline:
+    """Per-stage executors for the analyze request path"""
+
+    def __init__(self):
+        max_queue = _env_int("PIPELINE_MAX_QUEUE", 64)
+
+        # Inference threads feed the micro-batcher, so keep enough of them to fill a batch
+        self.inference = Stage(
+            "inference",
+            _env_int("PIPELINE_INFERENCE_WORKERS", _env_int("DETECTOR_MAX_BATCH_SIZE", 8)),
+            max_queue
+        )
+        self.io = Stage("io", _env_int("PIPELINE_IO_WORKERS", 4), max_queue)
+        self.db = Stage("db", _env_int("PIPELINE_DB_WORKERS", 4), max_queue)
+        self.report = Stage("report", _env_int("PIPELINE_REPORT_WORKERS", 2), max_queue)
+
+        self.stages = {
+            s.name: s for s in (self.inference, self.io, self.db, self.report)
+        }
+
+    def stats(self) -> dict:
+        return {name: stage.stats() for name, stage in self.stages.items()}
+
+    def shutdown(self):
+        for stage in self.stages.values():
+            stage.shutdown()
+
+
+# ------------------------------------------------
+# Singleton
+
+_pipeline = None
+
+
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = AnalysisPipeline()
+    return _pipeline
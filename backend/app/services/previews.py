@@ -0,0 +1,102 @@
+import os
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from .frame_sampler import FrameSampler
+from .media_store import get_media_store
+
+# Longest side of an image preview, in pixels
+PREVIEW_MAX_SIZE = int(os.getenv("PREVIEW_MAX_SIZE", "1024"))
+PREVIEW_JPEG_QUALITY = int(os.getenv("PREVIEW_JPEG_QUALITY", "80"))
+
+# Video contact sheet: frames spread over the clip, laid out in a grid
+PREVIEW_SHEET_FRAMES = int(os.getenv("PREVIEW_SHEET_FRAMES", "6"))
+PREVIEW_SHEET_COLUMNS = int(os.getenv("PREVIEW_SHEET_COLUMNS", "3"))
+PREVIEW_TILE_WIDTH = int(os.getenv("PREVIEW_TILE_WIDTH", "320"))
+
+# Stored as a sidecar of the media object, so garbage collection removes both
+PREVIEW_SIDECAR = "preview.jpg"
+
+
+def image_preview(path: str, max_size: int = PREVIEW_MAX_SIZE) -> Image.Image:
+    """
+    Size-capped RGB copy of an image
+
+    JPEGs are decoded straight at 1/2, 1/4 or 1/8 scale (draft mode), so an
+    8K photo never exists in memory at full resolution; other formats are
+    decoded once and reduced immediately.
+    """
+    with Image.open(path) as img:
+        img.draft("RGB", (max_size, max_size))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_size, max_size), Image.LANCZOS, reducing_gap=2.0)
+        return img.convert("RGB")
+
+
+def contact_sheet(path: str, frames: int = PREVIEW_SHEET_FRAMES,
+                  columns: int = PREVIEW_SHEET_COLUMNS, tile_width: int = PREVIEW_TILE_WIDTH):
+    """Grid of frames sampled evenly over a video, each labelled with its timestamp"""
+    tiles = []
+    for _, timestamp, frame in FrameSampler(path, max_frames=frames).sample():
+        height = max(1, round(frame.shape[0] * tile_width / frame.shape[1]))
+        tile = cv2.resize(frame, (tile_width, height), interpolation=cv2.INTER_AREA)
+
+        label = f"{int(timestamp // 60):02d}:{timestamp % 60:05.2f}"
+        cv2.putText(tile, label, (8, height - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3, cv2.LINE_AA)
+        cv2.putText(tile, label, (8, height - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
+        tiles.append(tile)
+
+    if not tiles:
+        return None
+
+    # Rotated or odd clips can yield tiles of different heights
+    tile_height = max(t.shape[0] for t in tiles)
+    columns = min(columns, len(tiles))
+    rows = -(-len(tiles) // columns)
+
+    sheet = np.full((rows * tile_height, columns * tile_width, 3), 255, dtype=np.uint8)
+    for i, tile in enumerate(tiles):
+        y, x = (i // columns) * tile_height, (i % columns) * tile_width
+        sheet[y:y + tile.shape[0], x:x + tile_width] = tile
+
+    return Image.fromarray(cv2.cvtColor(sheet, cv2.COLOR_BGR2RGB))
+
+
+def ensure_preview(media_hash: str, media_type: str):
+    """
+    Path of the media's preview JPEG, rendering it on first use (blocking)
+
+    Previews are keyed by media hash, so every case and every report
+    rebuild for the same bytes reuses one file. Returns None when the
+    media is gone or cannot be decoded; a report is still built without it.
+    """
+    store = get_media_store()
+    path = store.sidecar_path(media_hash, PREVIEW_SIDECAR)
+    if os.path.exists(path):
+        return path
+
+    media_path = store.path(media_hash)
+    if not os.path.exists(media_path):
+        return None
+
+    try:
+        if media_type == "image":
+            preview = image_preview(media_path)
+        else:
+            preview = contact_sheet(media_path)
+    except Exception as e:
+        print(f"⚠️ Preview failed for {media_path}: {e}")
+        return None
+
+    if preview is None:
+        return None
+
+    partial = store.temp_path(".jpg")
+    try:
+        preview.save(partial, "JPEG", quality=PREVIEW_JPEG_QUALITY, optimize=True)
+        return store.put_sidecar(partial, media_hash, PREVIEW_SIDECAR)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
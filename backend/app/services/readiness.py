@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+
+# Whether /ready also waits for the chain (anchoring is asynchronous, so
+# by default a node can take traffic while the RPC is still connecting)
+READY_REQUIRE_CHAIN = os.getenv("READY_REQUIRE_CHAIN", "false").lower() in ("1", "true", "yes")
+
+# Component states
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+DISABLED = "disabled"
+
+
+class Readiness:
+    """
+    Per-component readiness, updated by the background startup tasks.
+
+    The model and chain report their own state as they load. Dependencies
+    that can go away at any time, like the database, register a probe that
+    runs live on every check and is required for readiness. Probes are
+    registered by the app, so the detector (which reports into this
+    module) never depends on the database layer.
+    """
+
+    def __init__(self):
+        self._components = {
+            "model": {"state": PENDING},
+            "chain": {"state": PENDING},
+        }
+        self._probes = {}
+        self._lock = threading.Lock()
+
+    def set(self, component: str, state: str, **detail):
+        with self._lock:
+            self._components[component] = {"state": state, "since": time.time(), **detail}
+
+    def register_probe(self, component: str, probe):
+        """`probe()` returns the component's state dict; exceptions count as FAILED"""
+        with self._lock:
+            self._probes[component] = probe
+
+    def check(self) -> dict:
+        with self._lock:
+            components = {name: dict(c) for name, c in self._components.items()}
+            probes = dict(self._probes)
+
+        for name, probe in probes.items():
+            try:
+                components[name] = probe()
+            except Exception as e:
+                components[name] = {"state": FAILED, "error": str(e)}
+
+        required = ["model", *probes] + (["chain"] if READY_REQUIRE_CHAIN else [])
+        ready = all(components[name]["state"] == READY for name in required)
+
+        return {
+            "ready": ready,
+            "required": required,
+            "components": components,
+        }
+
+
+# ------------------------------------------------
+# Singleton
+
+_readiness = Readiness()
+
+
+def get_readiness():
+    return _readiness
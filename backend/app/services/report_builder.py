@@ -0,0 +1,201 @@
+import asyncio
+import os
+from pathlib import Path
+
+from ..models import SessionLocal, Case
+from .media_store import get_media_store
+from .pdf_generator import get_pdf_generator, REPORT_TEMPLATE_VERSION
+from .pipeline import get_pipeline, StageBusyError
+from .previews import ensure_preview
+from .verdict_cache import get_verdict_cache
+
+# Start building each report in the background once its case is saved;
+# otherwise reports are only built on their first download
+REPORT_PREBUILD = os.getenv("REPORT_PREBUILD", "true").lower() in ("1", "true", "yes")
+
+
+class ReportBuilder:
+    """
+    Builds forensic PDFs off the request path and keeps them in the media store.
+
+    Builds run on the pipeline's bounded report stage. Callers asking for
+    a report that is already being built await the same task instead of
+    starting another. Each case references its current PDF together with
+    the variant it was rendered for (template version and anchoring
+    transaction); the PDF is reused until the variant changes, and the
+    superseded one is released for garbage collection. Every method except
+    the blocking helpers runs on the event loop, so the in-flight map
+    needs no lock.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+
+        self.disk_hits = 0
+        self.builds = 0
+        self.shared = 0
+        self.failed = 0
+        self.prebuild_skipped = 0
+
+    # ------------------------------------------------
+
+    def _variant(self, data: dict) -> str:
+        anchor = (data["blockchain_tx"] or "pending")[:18]
+        return f"{REPORT_TEMPLATE_VERSION}_{anchor}"
+
+    def _snapshot(self, case_id: str):
+        """Everything a report shows, read from the case and the verdict cache (blocking)"""
+        db = SessionLocal()
+        try:
+            case = db.get(Case, case_id)
+            if not case:
+                return None
+
+            data = {
+                "case_id": case.id,
+                "timestamp": case.created_at.isoformat(),
+                "media_type": case.media_type,
+                "filename": case.filename,
+                "media_hash": case.media_hash,
+                "confidence": case.detection_score,
+                "is_ai_generated": case.is_ai_generated,
+                "blockchain_tx": case.blockchain_tx,
+                "report_sha256": case.report_sha256,
+                "report_variant": case.report_variant,
+            }
+            verdict_key = (case.model_name, case.config_hash)
+        finally:
+            db.close()
+
+        # The verdict the case was scored with, not whatever model ran last
+        details = get_verdict_cache().for_case(data["media_hash"], *verdict_key) or {}
+        data["model"] = details.get("model_used") or verdict_key[0] or "AI Detector"
+        data["detection_details"] = details
+
+        return data
+
+    def _build(self, data: dict) -> str:
+        """Render one report into the media store and point the case at it (blocking, report stage)"""
+        store = get_media_store()
+        variant = self._variant(data)
+
+        # Reports embed a size-capped preview, never the original upload
+        preview = ensure_preview(data["media_hash"], data["media_type"])
+
+        partial = store.temp_path(".pdf")
+        try:
+            get_pdf_generator().generate_report(data, preview, output_path=partial)
+            sha256 = store.put_file(partial, kind="report")
+        finally:
+            Path(partial).unlink(missing_ok=True)
+
+        # Another process may have swapped the report meanwhile; only replace what we read
+        current = data["report_sha256"]
+        db = SessionLocal()
+        try:
+            while True:
+                swapped = db.query(Case).filter(
+                    Case.id == data["case_id"],
+                    Case.report_sha256 == current if current else Case.report_sha256.is_(None)
+                ).update(
+                    {
+                        Case.report_sha256: sha256,
+                        Case.report_variant: variant,
+                        Case.report_path: store.path(sha256)
+                    },
+                    synchronize_session=False
+                )
+
+                if swapped:
+                    if sha256 != current:
+                        store.acquire(db, sha256)
+                        store.release(db, current)
+                    db.commit()
+                    break
+
+                db.rollback()
+                current = db.query(Case.report_sha256).filter(Case.id == data["case_id"]).scalar()
+        finally:
+            db.close()
+
+        self.builds += 1
+        return store.path(sha256)
+
+    # ------------------------------------------------
+
+    async def get(self, case_id: str):
+        """
+        Path of the case's current report, building it if needed
+
+        Returns None for an unknown case; raises StageBusyError when the
+        report stage is full.
+        """
+        pipeline = get_pipeline()
+
+        data = await pipeline.db.run(self._snapshot, case_id)
+        if data is None:
+            return None
+
+        variant = self._variant(data)
+        if data["report_variant"] == variant and get_media_store().exists(data["report_sha256"]):
+            self.disk_hits += 1
+            return get_media_store().path(data["report_sha256"])
+
+        key = (case_id, variant)
+        task = self._inflight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(pipeline.report.run(self._build, data))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_build_done(key, t))
+        else:
+            self.shared += 1
+
+        # A client that disconnects must not cancel a build others are waiting on
+        return await asyncio.shield(task)
+
+    def _on_build_done(self, key: tuple, task):
+        self._inflight.pop(key, None)
+
+        if not task.cancelled() and task.exception() is not None:
+            self.failed += 1
+
+    def prebuild(self, case_id: str):
+        """Start building a report without waiting for it (event loop only)"""
+        asyncio.ensure_future(self._prebuild(case_id))
+
+    async def _prebuild(self, case_id: str):
+        try:
+            await self.get(case_id)
+        except StageBusyError:
+            # Best effort: the first download builds it instead
+            self.prebuild_skipped += 1
+        except Exception as e:
+            print(f"⚠️ Report prebuild failed for {case_id}: {e}")
+
+    # ------------------------------------------------
+
+    def stats(self) -> dict:
+        return {
+            "template_version": REPORT_TEMPLATE_VERSION,
+            "prebuild": REPORT_PREBUILD,
+            "building": len(self._inflight),
+            "builds": self.builds,
+            "disk_hits": self.disk_hits,
+            "shared_builds": self.shared,
+            "failed": self.failed,
+            "prebuild_skipped": self.prebuild_skipped,
+        }
+
+
+# ------------------------------------------------
+# Singleton
+
+_report_builder = None
+
+
+def get_report_builder():
+    global _report_builder
+    if _report_builder is None:
+        _report_builder = ReportBuilder()
+    return _report_builder
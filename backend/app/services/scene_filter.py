@@ -0,0 +1,75 @@
+import os
+
+import cv2
+import numpy as np
+
+from .phash import difference_hash, hamming
+
+# Drop sampled video frames that look like one already scored
+VIDEO_SCENE_FILTER = os.getenv("VIDEO_SCENE_FILTER", "true").lower() in ("1", "true", "yes")
+
+# Candidates decoded per frame of inference budget (decode is far cheaper than a forward pass)
+VIDEO_SCENE_OVERSAMPLE = int(os.getenv("VIDEO_SCENE_OVERSAMPLE", "3"))
+
+# A frame counts as new if either signature moved by more than this
+VIDEO_SCENE_DHASH_THRESHOLD = int(os.getenv("VIDEO_SCENE_DHASH_THRESHOLD", "6"))   # bits of 64
+VIDEO_SCENE_HIST_THRESHOLD = float(os.getenv("VIDEO_SCENE_HIST_THRESHOLD", "0.15"))  # total variation, 0..1
+
+# Signatures are computed on a thumbnail this size
+SIGNATURE_SIZE = (64, 36)
+HIST_BINS = 16
+
+
+def frame_signature(frame: np.ndarray) -> tuple:
+    """(dHash, normalised gray histogram) of a BGR frame, from one small thumbnail"""
+    thumb = cv2.resize(frame, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+
+    hist = cv2.calcHist([gray], [0], None, [HIST_BINS], [0, 256]).ravel()
+    hist /= max(hist.sum(), 1.0)
+
+    return difference_hash(gray), hist
+
+
+class SceneFilter:
+    """
+    Cheap redundancy check in front of the classifier.
+
+    Each candidate frame is reduced to a dHash (structure) and a 16-bin
+    histogram (exposure/colour of the shot). It is kept only if it differs
+    from every frame kept so far by more than a threshold on either one, so
+    a static talking head costs one forward pass instead of forty while a
+    cut, pan or lighting change still gets scored.
+    """
+
+    def __init__(self, dhash_threshold: int = VIDEO_SCENE_DHASH_THRESHOLD,
+                 hist_threshold: float = VIDEO_SCENE_HIST_THRESHOLD):
+        self.dhash_threshold = dhash_threshold
+        self.hist_threshold = hist_threshold
+
+        self._kept = []
+        self.candidates = 0
+        self.dropped = 0
+
+    def accept(self, frame: np.ndarray) -> bool:
+        """True if the frame is distinct enough to score"""
+        self.candidates += 1
+        dhash, hist = frame_signature(frame)
+
+        for kept_hash, kept_hist in self._kept:
+            if (hamming(dhash, kept_hash) <= self.dhash_threshold
+                    and 0.5 * float(np.abs(hist - kept_hist).sum()) <= self.hist_threshold):
+                self.dropped += 1
+                return False
+
+        self._kept.append((dhash, hist))
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "candidates": self.candidates,
+            "kept": len(self._kept),
+            "dropped_similar": self.dropped,
+            "dhash_threshold": self.dhash_threshold,
+            "hist_threshold": self.hist_threshold,
+        }
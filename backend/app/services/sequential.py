@@ -0,0 +1,93 @@
+import math
+import os
+
+# Frames scored before the verdict may be called early, and the hard cap
+VIDEO_MIN_FRAMES = int(os.getenv("VIDEO_MIN_FRAMES", "8"))
+
+# Two-sided z for the interval that must exclude the threshold (2.576 = 99%)
+VIDEO_CONFIDENCE_Z = float(os.getenv("VIDEO_CONFIDENCE_Z", "2.576"))
+
+# Floor on the per-frame standard deviation, so a handful of identical
+# scores does not produce a zero-width interval
+VIDEO_MIN_STD = float(os.getenv("VIDEO_MIN_STD", "0.05"))
+
+DECISION_THRESHOLD = 0.5
+
+
+class SequentialScorer:
+    """
+    Running mean/variance of per-frame scores with an early stopping rule.
+
+    Uses Welford's update, so each score is O(1) and numerically stable.
+    The verdict is settled once at least `min_frames` are in and the
+    confidence interval of the mean lies entirely on one side of 0.5.
+    """
+
+    def __init__(self, min_frames: int = VIDEO_MIN_FRAMES, max_frames: int = 40,
+                 z: float = VIDEO_CONFIDENCE_Z, min_std: float = VIDEO_MIN_STD):
+        self.min_frames = max(1, min_frames)
+        self.max_frames = max(self.min_frames, max_frames)
+        self.z = z
+        self.min_std = min_std
+
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.max = None
+        self.stop_reason = None
+
+    def add(self, score: float):
+        self.n += 1
+        delta = score - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (score - self.mean)
+        self.max = score if self.max is None else max(self.max, score)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def interval(self) -> tuple:
+        """(low, high) confidence interval of the mean"""
+        if self.n == 0:
+            return 0.0, 1.0
+
+        half_width = self.z * max(self.std, self.min_std) / math.sqrt(self.n)
+        return self.mean - half_width, self.mean + half_width
+
+    def should_stop(self) -> bool:
+        """Check the stopping rule, recording why it fired"""
+        if self.n >= self.max_frames:
+            self.stop_reason = "max_frames"
+            return True
+
+        if self.n < self.min_frames:
+            return False
+
+        low, high = self.interval()
+        if low > DECISION_THRESHOLD:
+            self.stop_reason = "settled_ai"
+            return True
+        if high < DECISION_THRESHOLD:
+            self.stop_reason = "settled_real"
+            return True
+
+        return False
+
+    def finish(self, reason: str = "clip_exhausted"):
+        """Mark the end of input when no rule fired first"""
+        if self.stop_reason is None:
+            self.stop_reason = reason
+
+    def summary(self) -> dict:
+        low, high = self.interval()
+        return {
+            "frames_used": self.n,
+            "min_frames": self.min_frames,
+            "max_frames": self.max_frames,
+            "stop_reason": self.stop_reason,
+            "mean": round(self.mean, 4),
+            "std": round(self.std, 4),
+            "ci_low": round(max(0.0, low), 4),
+            "ci_high": round(min(1.0, high), 4),
+        }
@@ -0,0 +1,309 @@
+import os
+import threading
+import time
+from functools import lru_cache
+from itertools import combinations
+from math import comb
+
+from ..models import SessionLocal, Case, MediaFingerprint
+from .phash import hamming, from_hex, to_hex
+
+# Default Hamming radius (on the 64-bit pHash) for similarity queries
+SIMILARITY_MAX_DISTANCE = int(os.getenv("SIMILARITY_MAX_DISTANCE", "10"))
+
+# Substrings per hash in the multi-index; 4 x 16 bits keeps buckets small
+# up to millions of fingerprints while a radius-10 query probes ~550 keys
+SIMILARITY_INDEX_CHUNKS = int(os.getenv("SIMILARITY_INDEX_CHUNKS", "4"))
+
+# Longest a search may go without picking up fingerprints saved by other processes
+SIMILARITY_REFRESH_SECONDS = float(os.getenv("SIMILARITY_REFRESH_SECONDS", "5"))
+
+# Reuse a near-duplicate's verdict instead of running inference
+NEAR_DUPLICATE_SKIP_INFERENCE = os.getenv("NEAR_DUPLICATE_SKIP_INFERENCE", "false").lower() in ("1", "true", "yes")
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "4"))
+# Only verdicts at least this far from the 0.5 threshold are reused (0.35 → ≥0.85 or ≤0.15)
+NEAR_DUPLICATE_MIN_MARGIN = float(os.getenv("NEAR_DUPLICATE_MIN_MARGIN", "0.35"))
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing over 64-bit hashes under Hamming distance.
+
+    Every hash is split into `chunks` substrings, each with its own table of
+    exact substring -> hashes. Two hashes within distance r must agree to
+    within r // chunks bits on at least one substring (pigeonhole), so a
+    query only probes each table with the substrings that close to its own
+    and verifies the candidates by full Hamming distance. Radii so large
+    that probing would cost more than a scan fall back to scanning the
+    distinct hashes.
+    """
+
+    __slots__ = ("chunks", "widths", "size", "_payloads", "_tables")
+
+    def __init__(self, chunks: int = SIMILARITY_INDEX_CHUNKS, bits: int = 64):
+        self.chunks = max(1, min(chunks, bits))
+        base, extra = divmod(bits, self.chunks)
+        self.widths = [base + (1 if i < extra else 0) for i in range(self.chunks)]
+
+        self.size = 0
+        self._payloads = {}
+        self._tables = [{} for _ in range(self.chunks)]
+
+    @property
+    def nodes(self) -> int:
+        return len(self._payloads)
+
+    def _split(self, value: int) -> list:
+        parts = []
+        for width in reversed(self.widths):
+            parts.append(value & ((1 << width) - 1))
+            value >>= width
+        parts.reverse()
+        return parts
+
+    def add(self, value: int, payload):
+        self.size += 1
+
+        payloads = self._payloads.get(value)
+        if payloads is not None:
+            payloads.append(payload)
+            return
+
+        self._payloads[value] = [payload]
+        for table, part in zip(self._tables, self._split(value)):
+            table.setdefault(part, []).append(value)
+
+    def search(self, value: int, radius: int) -> list:
+        """All (distance, payload) pairs within `radius` of `value`"""
+        if not self._payloads or radius < 0:
+            return []
+
+        sub_radius = radius // self.chunks
+        probes = sum(_flip_count(width, sub_radius) for width in self.widths)
+
+        if probes >= len(self._payloads):
+            candidates = self._payloads
+        else:
+            candidates = set()
+            for table, width, part in zip(self._tables, self.widths, self._split(value)):
+                for mask in _flip_masks(width, sub_radius):
+                    bucket = table.get(part ^ mask)
+                    if bucket:
+                        candidates.update(bucket)
+
+        found = []
+        for candidate in candidates:
+            distance = hamming(value, candidate)
+            if distance <= radius:
+                found.extend((distance, p) for p in self._payloads[candidate])
+
+        return found
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(width: int, radius: int) -> tuple:
+    """Every `width`-bit mask with at most `radius` bits set"""
+    return tuple(
+        sum(1 << bit for bit in bits)
+        for flips in range(min(radius, width) + 1)
+        for bits in combinations(range(width), flips)
+    )
+
+
+@lru_cache(maxsize=None)
+def _flip_count(width: int, radius: int) -> int:
+    return sum(comb(width, flips) for flips in range(min(radius, width) + 1))
+
+
+class SimilarityIndex:
+    """
+    In-memory near-duplicate index over every stored fingerprint.
+
+    Built lazily from media_fingerprints on first use, then kept current by
+    reading only rows newer than the last one loaded: right after this
+    process saves a case, and at most every SIMILARITY_REFRESH_SECONDS
+    before a search so cases saved by other processes (job workers, other
+    API workers) show up too. The index is keyed on pHash; aHash and dHash
+    ride along in the payload so callers can report all three distances
+    without another query.
+    """
+
+    def __init__(self, refresh_seconds: float = SIMILARITY_REFRESH_SECONDS):
+        self._index = MultiIndexHash()
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._last_id = 0
+        self._refreshed_at = 0.0
+        self.refresh_seconds = refresh_seconds
+
+    def _refresh(self, force: bool = False):
+        if not force and self._loaded and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+            return
+
+        with self._lock:
+            if not force and self._loaded and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+                return
+
+            db = SessionLocal()
+            try:
+                rows = db.query(
+                    MediaFingerprint.id,
+                    MediaFingerprint.case_id,
+                    MediaFingerprint.frame_index,
+                    MediaFingerprint.ahash,
+                    MediaFingerprint.dhash,
+                    MediaFingerprint.phash
+                ).filter(MediaFingerprint.id > self._last_id).order_by(MediaFingerprint.id).yield_per(10000)
+
+                for row_id, case_id, frame_index, ahash, dhash, phash in rows:
+                    self._index.add(from_hex(phash), (case_id, frame_index, from_hex(ahash), from_hex(dhash)))
+                    self._last_id = row_id
+            finally:
+                db.close()
+
+            self._refreshed_at = time.monotonic()
+
+            if not self._loaded:
+                self._loaded = True
+                print(f"🔎 Similarity index loaded: {self._index.size} fingerprints")
+
+    def add(self, case_id: str, fingerprints: list):
+        """Pick up a just-committed case's fingerprints (and anything else new)"""
+        if fingerprints:
+            self._refresh(force=True)
+
+    def search(self, fingerprints: list, max_distance: int = SIMILARITY_MAX_DISTANCE, exclude_case: str = None) -> list:
+        """
+        Cases with fingerprints within `max_distance` of the query
+
+        Each query fingerprint is matched independently and the hits are
+        grouped per case, keeping the closest match for every query frame.
+
+        Returns:
+            List of dicts sorted by distance, then by how many query frames matched
+        """
+        self._refresh()
+
+        per_case = {}
+        with self._lock:
+            for query_index, fp in enumerate(fingerprints):
+                for distance, (case_id, frame_index, ahash, dhash) in self._index.search(fp["phash"], max_distance):
+                    if case_id == exclude_case:
+                        continue
+
+                    best = per_case.setdefault(case_id, {})
+                    current = best.get(query_index)
+                    if current is None or distance < current["phash_distance"]:
+                        best[query_index] = {
+                            "phash_distance": distance,
+                            "ahash_distance": hamming(fp["ahash"], ahash),
+                            "dhash_distance": hamming(fp["dhash"], dhash),
+                            "frame_index": frame_index,
+                        }
+
+        matches = []
+        for case_id, frames in per_case.items():
+            closest = min(frames.values(), key=lambda m: m["phash_distance"])
+            matches.append({
+                "case_id": case_id,
+                "distance": closest["phash_distance"],
+                "ahash_distance": closest["ahash_distance"],
+                "dhash_distance": closest["dhash_distance"],
+                "matched_frames": len(frames),
+                "query_frames": len(fingerprints),
+            })
+
+        matches.sort(key=lambda m: (m["distance"], -m["matched_frames"]))
+        return matches
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self._loaded,
+            "fingerprints": self._index.size,
+            "last_row_id": self._last_id,
+            "distinct_hashes": self._index.nodes,
+            "index_chunks": self._index.chunks,
+        }
+
+
+def fingerprint_rows(case_id: str, fingerprints: list) -> list:
+    """MediaFingerprint rows for a case's computed hashes"""
+    return [
+        MediaFingerprint(
+            case_id=case_id,
+            frame_index=fp["frame_index"],
+            ahash=to_hex(fp["ahash"]),
+            dhash=to_hex(fp["dhash"]),
+            phash=to_hex(fp["phash"])
+        )
+        for fp in fingerprints
+    ]
+
+
+def load_fingerprints(db, case_id: str) -> list:
+    rows = db.query(MediaFingerprint).filter(MediaFingerprint.case_id == case_id).all()
+    return [
+        {
+            "frame_index": r.frame_index,
+            "ahash": from_hex(r.ahash),
+            "dhash": from_hex(r.dhash),
+            "phash": from_hex(r.phash),
+        }
+        for r in rows
+    ]
+
+
+def near_duplicate_verdict(fingerprints: list, media_type: str):
+    """
+    Verdict of a high-confidence near-duplicate, if one exists
+
+    A candidate must be the same media type, lie within
+    NEAR_DUPLICATE_MAX_DISTANCE on pHash (for video: on at least half of the
+    sampled frames), and carry a score at least NEAR_DUPLICATE_MIN_MARGIN
+    away from the decision threshold.
+    """
+    if not fingerprints:
+        return None
+
+    matches = get_similarity_index().search(fingerprints, NEAR_DUPLICATE_MAX_DISTANCE)
+    if not matches:
+        return None
+
+    db = SessionLocal()
+    try:
+        for match in matches:
+            if match["matched_frames"] * 2 < match["query_frames"]:
+                continue
+
+            case = db.get(Case, match["case_id"])
+            if not case or case.media_type != media_type or case.detection_score is None:
+                continue
+
+            if abs(case.detection_score - 0.5) < NEAR_DUPLICATE_MIN_MARGIN:
+                continue
+
+            return {
+                "is_ai_generated": case.is_ai_generated,
+                "confidence": case.detection_score,
+                "model_used": "near-duplicate",
+                "near_duplicate_of": case.id,
+                "phash_distance": match["distance"],
+                "matched_frames": match["matched_frames"]
+            }
+    finally:
+        db.close()
+
+    return None
+
+
+# ------------------------------------------------
+# Singleton
+
+_similarity_index = None
+
+
+def get_similarity_index():
+    global _similarity_index
+    if _similarity_index is None:
+        _similarity_index = SimilarityIndex()
+    return _similarity_index
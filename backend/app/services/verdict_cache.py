@@ -0,0 +1,322 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, exists, or_
+
+from ..models import SessionLocal, Case, CachedVerdict
+
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", "2048"))
+VERDICT_CACHE_TTL_SECONDS = float(os.getenv("VERDICT_CACHE_TTL_SECONDS", "3600"))
+
+# Persistent entries older than this are treated as misses and pruned (0 = keep forever)
+VERDICT_DB_TTL_DAYS = float(os.getenv("VERDICT_DB_TTL_DAYS", "0"))
+
+# Cap on persistent entries across all keys, oldest pruned first (0 = no cap)
+VERDICT_DB_MAX_ROWS = int(os.getenv("VERDICT_DB_MAX_ROWS", "0"))
+
+# Minimum interval between prunes of the persistent tier
+VERDICT_DB_PRUNE_SECONDS = float(os.getenv("VERDICT_DB_PRUNE_SECONDS", "600"))
+
+
+class LRUCache:
+    """Thread-safe LRU with a per-entry time-to-live"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard_where(self, predicate) -> int:
+        with self._lock:
+            stale = [k for k in self._data if predicate(k)]
+            for k in stale:
+                del self._data[k]
+            return len(stale)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class VerdictCache:
+    """
+    Two-tier cache of detection results keyed by (media_hash, model_name, config_hash).
+
+    Lookups hit the in-process LRU first and only fall through to the
+    verdict_cache table on a miss; persistent hits are promoted into memory.
+    Every lookup matches the full key, so a model change can never serve
+    verdicts the current model did not produce. Switching keys clears other
+    keys from memory and deletes their table rows, except those a case was
+    scored under: they back that case's report until the TTL or the row cap
+    prunes them.
+    """
+
+    def __init__(self, max_size: int = VERDICT_CACHE_SIZE, ttl_seconds: float = VERDICT_CACHE_TTL_SECONDS):
+        self.memory = LRUCache(max_size, ttl_seconds)
+        self._active_key = None
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.memory_misses = 0
+        self.db_hits = 0
+        self.db_misses = 0
+        self.invalidated = 0
+        self.pruned = 0
+
+        self._last_prune = 0.0
+
+    # ------------------------------------------------
+
+    def activate(self, model_name: str, config_hash: str):
+        """Switch the cache to a detector key, dropping other keys' entries (blocking)"""
+        key = (model_name, config_hash)
+        if self._active_key == key:
+            return
+
+        with self._lock:
+            if self._active_key == key:
+                return
+
+            dropped = self.memory.discard_where(lambda k: k[1:] != key)
+            dropped += self._drop_unreferenced(model_name, config_hash)
+            if dropped:
+                print(f"♻️ Verdict cache: cleared {dropped} entries from a previous model/config")
+
+            self.invalidated += dropped
+            self._active_key = key
+
+    def _drop_unreferenced(self, model_name: str, config_hash: str) -> int:
+        """Delete table rows of other keys that no case was scored under"""
+        # Cases saved before the key was recorded keep every verdict for their media
+        referenced = exists().where(
+            Case.media_hash == CachedVerdict.media_hash,
+            or_(
+                Case.model_name.is_(None),
+                and_(Case.model_name == CachedVerdict.model_name, Case.config_hash == CachedVerdict.config_hash)
+            )
+        )
+
+        db = SessionLocal()
+        try:
+            removed = db.query(CachedVerdict).filter(
+                or_(CachedVerdict.model_name != model_name, CachedVerdict.config_hash != config_hash),
+                ~referenced
+            ).delete(synchronize_session=False)
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+    def prune(self) -> int:
+        """Delete persistent entries past the TTL or beyond the row cap (blocking)"""
+        if not VERDICT_DB_TTL_DAYS and not VERDICT_DB_MAX_ROWS:
+            return 0
+
+        db = SessionLocal()
+        try:
+            removed = 0
+
+            if VERDICT_DB_TTL_DAYS:
+                cutoff = datetime.utcnow() - timedelta(days=VERDICT_DB_TTL_DAYS)
+                removed += db.query(CachedVerdict).filter(
+                    CachedVerdict.created_at < cutoff
+                ).delete(synchronize_session=False)
+
+            if VERDICT_DB_MAX_ROWS:
+                boundary = db.query(CachedVerdict.created_at).order_by(
+                    CachedVerdict.created_at.desc()
+                ).offset(VERDICT_DB_MAX_ROWS).limit(1).scalar()
+
+                if boundary is not None:
+                    removed += db.query(CachedVerdict).filter(
+                        CachedVerdict.created_at <= boundary
+                    ).delete(synchronize_session=False)
+
+            db.commit()
+        finally:
+            db.close()
+
+        if removed:
+            print(f"♻️ Verdict cache: pruned {removed} persistent entries")
+
+        self.pruned += removed
+        return removed
+
+    def _maybe_prune(self):
+        now = time.monotonic()
+        if now - self._last_prune < VERDICT_DB_PRUNE_SECONDS:
+            return
+
+        self._last_prune = now
+        try:
+            self.prune()
+        except Exception as e:
+            print(f"⚠️ Verdict cache prune failed: {e}")
+
+    def get_memory(self, media_hash: str, model_name: str, config_hash: str):
+        """In-process lookup only; cheap enough for the event loop"""
+        result = self.memory.get((media_hash, model_name, config_hash))
+
+        if result is None:
+            self.memory_misses += 1
+        else:
+            self.memory_hits += 1
+
+        return result
+
+    def is_active(self, model_name: str, config_hash: str) -> bool:
+        return self._active_key == (model_name, config_hash)
+
+    def get(self, media_hash: str, model_name: str, config_hash: str):
+        """Memory first, then the persistent table (blocking)"""
+        self.activate(model_name, config_hash)
+
+        result = self.get_memory(media_hash, model_name, config_hash)
+        if result is not None:
+            return result
+
+        return self.get_persistent(media_hash, model_name, config_hash)
+
+    def get_persistent(self, media_hash: str, model_name: str, config_hash: str):
+        """Persistent-tier lookup after a memory miss; promotes hits into memory (blocking)"""
+        self.activate(model_name, config_hash)
+
+        db = SessionLocal()
+        try:
+            row = db.get(CachedVerdict, (media_hash, model_name, config_hash))
+
+            if row and VERDICT_DB_TTL_DAYS and row.created_at < datetime.utcnow() - timedelta(days=VERDICT_DB_TTL_DAYS):
+                row = None
+
+            if row is None:
+                self.db_misses += 1
+                return None
+
+            self.db_hits += 1
+            result = json.loads(row.result)
+        finally:
+            db.close()
+
+        self.memory.put((media_hash, model_name, config_hash), result)
+        return result
+
+    def for_case(self, media_hash: str, model_name: str = None, config_hash: str = None):
+        """
+        The stored verdict a case was scored with (blocking)
+
+        For readers such as the report builder. Ignores the TTL, and is not
+        counted in the hit statistics. Cases saved before their key was
+        recorded get the newest verdict for their media.
+        """
+        if model_name is None:
+            db = SessionLocal()
+            try:
+                row = db.query(CachedVerdict).filter(
+                    CachedVerdict.media_hash == media_hash
+                ).order_by(CachedVerdict.created_at.desc()).first()
+                return json.loads(row.result) if row else None
+            finally:
+                db.close()
+
+        result = self.memory.get((media_hash, model_name, config_hash))
+        if result is not None:
+            return result
+
+        db = SessionLocal()
+        try:
+            row = db.get(CachedVerdict, (media_hash, model_name, config_hash))
+            return json.loads(row.result) if row else None
+        finally:
+            db.close()
+
+    def put(self, media_hash: str, model_name: str, config_hash: str, result: dict):
+        """Store a fresh verdict in both tiers (blocking)"""
+        self.activate(model_name, config_hash)
+        self.memory.put((media_hash, model_name, config_hash), result)
+
+        db = SessionLocal()
+        try:
+            db.merge(CachedVerdict(
+                media_hash=media_hash,
+                model_name=model_name,
+                config_hash=config_hash,
+                result=json.dumps(result, default=str),
+                created_at=datetime.utcnow()
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+        self._maybe_prune()
+
+    # ------------------------------------------------
+
+    def stats(self) -> dict:
+        db_lookups = self.db_hits + self.db_misses
+        hits = self.memory_hits + self.db_hits
+        # Every lookup ends as a memory hit, a table hit or a table miss
+        lookups = self.memory_hits + db_lookups
+
+        return {
+            "active_model": self._active_key[0] if self._active_key else None,
+            "active_config": self._active_key[1] if self._active_key else None,
+            "memory_size": len(self.memory),
+            "memory_max_size": self.memory.max_size,
+            "memory_ttl_seconds": self.memory.ttl,
+            "memory_hits": self.memory_hits,
+            "memory_misses": self.memory_misses,
+            "db_hits": self.db_hits,
+            "db_misses": self.db_misses,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "db_hit_rate": round(self.db_hits / db_lookups, 4) if db_lookups else 0.0,
+            "evictions": self.memory.evictions,
+            "expirations": self.memory.expirations,
+            "invalidated": self.invalidated,
+            "pruned": self.pruned,
+            "db_ttl_days": VERDICT_DB_TTL_DAYS,
+            "db_max_rows": VERDICT_DB_MAX_ROWS,
+        }
+
+
+# ------------------------------------------------
+# Singleton
+
+_verdict_cache = None
+
+
+def get_verdict_cache():
+    global _verdict_cache
+    if _verdict_cache is None:
+        _verdict_cache = VerdictCache()
+    return _verdict_cache
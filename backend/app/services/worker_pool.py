@@ -0,0 +1,371 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+
+from .ai_detector import get_detector
+
+# Forked inference processes (0 = score in the API process)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+
+# Intra-op threads per worker; by default the cores are split evenly
+INFERENCE_THREADS_PER_WORKER = int(os.getenv(
+    "INFERENCE_THREADS_PER_WORKER",
+    str(max(1, (os.cpu_count() or 1) // max(1, INFERENCE_WORKERS)))
+))
+
+# How long the model may stay not-ready while the workers load and warm up
+INFERENCE_POOL_READY_TIMEOUT = float(os.getenv("INFERENCE_POOL_READY_TIMEOUT", "600"))
+
+# Imported by the fork server before it forks any worker
+_PRELOAD = [f"{__package__}.inference_preload"]
+
+# Detector methods a worker will run
+ALLOWED_METHODS = ("detect_fake_image", "detect_fake_video", "detect_fake_frames")
+
+
+class WorkerCrashedError(RuntimeError):
+    """The worker running a job exited before replying"""
+
+
+class PoolStartError(RuntimeError):
+    """The workers did not all load their model"""
+
+
+def _worker_main(conn, index: int, threads: int):
+    """Inference worker loop; runs in a child of the fork server"""
+    # Ctrl-C goes to the whole process group; let the parent shut us down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    try:
+        # Already loaded by the fork server unless its preload failed
+        detector = get_detector()
+        detector.after_fork(threads)
+        detector.warm_up()
+        detector.reset_stats()
+    except Exception as e:
+        conn.send(("failed", f"{type(e).__name__}: {e}"))
+        return
+
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+
+        if message is None:
+            return
+
+        job_id, method, args = message
+
+        try:
+            if method not in ALLOWED_METHODS:
+                raise ValueError(f"Unknown detector method: {method}")
+            conn.send((job_id, True, getattr(detector, method)(*args)))
+        except Exception as e:
+            conn.send((job_id, False, f"{type(e).__name__}: {e}\n{traceback.format_exc()}"))
+
+
+def _memory(pid: int) -> dict:
+    """RSS/PSS and shared vs private pages from /proc (Linux only)"""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        return None
+
+    shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+
+    return {
+        "rss_mb": round(fields.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(fields.get("Pss", 0) / 1024, 1),
+        "shared_mb": round(shared / 1024, 1),
+        "private_mb": round(private / 1024, 1),
+    }
+
+
+class _Worker:
+    __slots__ = ("index", "process", "conn", "send_lock", "inflight", "completed", "restarts", "ready", "started_at")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.send_lock = threading.Lock()
+        self.inflight = {}
+        self.completed = 0
+        self.restarts = 0
+        self.ready = False
+        self.started_at = None
+
+
+class InferencePool:
+    """
+    Pre-forked inference processes sharing one copy of the model weights.
+
+    Workers are forked from a fork server rather than from the API process:
+    by the time the pool starts, the API has uvicorn, batcher, pipeline and
+    anchor threads and a database pool, and a lock held by any of them at
+    fork time would stay held forever in the child. The fork server is a
+    fresh single-threaded interpreter that loads the detector once
+    (inference_preload), so the weight pages are shared copy-on-write by
+    every worker, including ones restarted later.
+
+    Each worker owns a duplex pipe and reports once its model is loaded and
+    warm; the pool is ready when all of them have. Jobs go to the worker
+    with the fewest in-flight jobs and one collector thread waits on every
+    pipe and process sentinel, so replies and crashes are noticed without
+    polling. A crashed worker's jobs fail with WorkerCrashedError and it is
+    forked again.
+    """
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, threads: int = INFERENCE_THREADS_PER_WORKER):
+        self.size = workers
+        self.threads = threads
+        self.running = False
+        self.load_error = None
+
+        self._ctx = multiprocessing.get_context("forkserver")
+        self._workers = [_Worker(i) for i in range(workers)]
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._next_job = 0
+        self._collector = None
+
+        self.dispatched = 0
+        self.crashes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    # ------------------------------------------------
+
+    def start(self):
+        """Fork the workers from the fork server; see wait_ready()"""
+        if not self.enabled or self.running:
+            return
+
+        self._ctx.set_forkserver_preload(_PRELOAD)
+
+        for worker in self._workers:
+            self._spawn(worker)
+
+        self.running = True
+        self._collector = threading.Thread(target=self._collect, name="inference-pool", daemon=True)
+        self._collector.start()
+
+        print(f"🧠 Inference pool: {self.size} workers x {self.threads} threads")
+
+    def wait_ready(self, timeout: float = INFERENCE_POOL_READY_TIMEOUT):
+        """Block until every worker has loaded and warmed up its model"""
+        if not self._ready.wait(timeout):
+            raise PoolStartError(f"Inference workers not ready after {timeout:.0f}s")
+        if self.load_error:
+            raise PoolStartError(self.load_error)
+
+    def _spawn(self, worker: _Worker):
+        parent_conn, child_conn = self._ctx.Pipe()
+
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, worker.index, self.threads),
+            name=f"inference-{worker.index}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+
+        worker.process = process
+        worker.conn = parent_conn
+        worker.ready = False
+        worker.started_at = time.time()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+
+        for worker in self._workers:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except Exception:
+                pass
+
+        for worker in self._workers:
+            if worker.process:
+                worker.process.join(timeout=5)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+
+        with self._lock:
+            lost = [f for w in self._workers for f in w.inflight.values()]
+            for worker in self._workers:
+                worker.inflight.clear()
+
+        for future in lost:
+            future.set_exception(WorkerCrashedError("Inference pool stopped"))
+
+    # ------------------------------------------------
+
+    def submit(self, method: str, *args) -> Future:
+        future = Future()
+
+        with self._lock:
+            worker = min(self._workers, key=lambda w: (not w.ready, len(w.inflight)))
+            self._next_job += 1
+            job_id = self._next_job
+            worker.inflight[job_id] = future
+            self.dispatched += 1
+
+        try:
+            with worker.send_lock:
+                worker.conn.send((job_id, method, args))
+        except Exception as e:
+            with self._lock:
+                worker.inflight.pop(job_id, None)
+            future.set_exception(WorkerCrashedError(f"inference-{worker.index}: {e}"))
+
+        return future
+
+    def run(self, method: str, *args, timeout: float = None):
+        """Run a detector method on the least-loaded worker and wait for it"""
+        return self.submit(method, *args).result(timeout=timeout)
+
+    # ------------------------------------------------
+
+    def _collect(self):
+        while self.running:
+            waitables = {}
+            for worker in self._workers:
+                waitables[worker.conn] = worker
+                waitables[worker.process.sentinel] = worker
+
+            for ready in wait(list(waitables), timeout=1.0):
+                worker = waitables[ready]
+
+                if ready is worker.conn:
+                    try:
+                        self._handle_reply(worker, worker.conn.recv())
+                        continue
+                    except (EOFError, OSError):
+                        pass
+                elif ready != worker.process.sentinel:
+                    # Handle of a process already replaced earlier in this round
+                    continue
+
+                if self.load_error:
+                    # Restarting would only fail the same way; stop() cleans up
+                    return
+                if self.running:
+                    self._restart(worker)
+
+    def _handle_reply(self, worker: _Worker, message):
+        if message[0] == "ready":
+            worker.ready = True
+            if all(w.ready for w in self._workers):
+                self._ready.set()
+            return
+
+        if message[0] == "failed":
+            print(f"❌ Inference worker {worker.index} could not load the model: {message[1]}")
+            self.load_error = f"inference-{worker.index}: {message[1]}"
+            self._ready.set()
+            return
+
+        job_id, ok, payload = message
+
+        with self._lock:
+            future = worker.inflight.pop(job_id, None)
+            worker.completed += 1
+
+        if future is None:
+            return
+
+        if ok:
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(payload))
+
+    def _restart(self, worker: _Worker):
+        worker.process.join(timeout=1)
+        exitcode = worker.process.exitcode
+
+        # Replies written just before the exit are still good
+        try:
+            while worker.conn.poll():
+                self._handle_reply(worker, worker.conn.recv())
+        except (EOFError, OSError):
+            pass
+
+        with self._lock:
+            lost = list(worker.inflight.values())
+            worker.inflight.clear()
+
+        for future in lost:
+            future.set_exception(WorkerCrashedError(f"inference-{worker.index} exited with code {exitcode}"))
+
+        self.crashes += 1
+        worker.restarts += 1
+        print(f"💥 Inference worker {worker.index} exited ({exitcode}); restarting")
+
+        worker.conn.close()
+        self._spawn(worker)
+
+    # ------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            workers = [
+                {
+                    "index": w.index,
+                    "pid": w.process.pid if w.process else None,
+                    "alive": bool(w.process and w.process.is_alive()),
+                    "ready": w.ready,
+                    "inflight": len(w.inflight),
+                    "completed": w.completed,
+                    "restarts": w.restarts,
+                    "memory": _memory(w.process.pid) if w.process else None,
+                }
+                for w in self._workers
+            ]
+
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "ready": self._ready.is_set() and not self.load_error,
+            "load_error": self.load_error,
+            "workers": self.size,
+            "threads_per_worker": self.threads,
+            "dispatched": self.dispatched,
+            "crashes": self.crashes,
+            "parent_memory": _memory(os.getpid()),
+            "per_worker": workers,
+        }
+
+
+# ------------------------------------------------
+# Singleton
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_inference_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = InferencePool()
+    return _pool
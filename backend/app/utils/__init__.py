@@ -9,6 +9,12 @@ def generate_case_id():
     unique_id = str(uuid.uuid4())[:8]
     return f"CASE-{timestamp}-{unique_id}"
 
+def generate_batch_id():
+    """Generate unique batch ID"""
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    unique_id = str(uuid.uuid4())[:8]
+    return f"BATCH-{timestamp}-{unique_id}"
+
 def calculate_file_hash(file_content: bytes) -> str:
     """Calculate SHA-256 hash of file"""
     return hashlib.sha256(file_content).hexdigest()
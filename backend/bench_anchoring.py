@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Compare per-case anchoring cost for single vs Merkle-batched submission.
+
+Gas and confirmation figures are inputs (defaults are typical Sepolia
+numbers for storeEvidence); tree build, proof and verification times are
+measured here.
+"""
+import sys
+import time
+import argparse
+sys.path.append('app')
+
+from services.merkle import MerkleTree, evidence_leaf, verify_proof
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--gas-per-tx", type=int, default=180000, help="gas used by one storeEvidence call")
+parser.add_argument("--gas-price-gwei", type=float, default=30.0)
+parser.add_argument("--confirm-seconds", type=float, default=15.0, help="typical time to a receipt")
+parser.add_argument("--window-seconds", type=float, default=300.0, help="ANCHOR_BATCH_WINDOW_SECONDS")
+parser.add_argument("--arrivals-per-minute", type=float, default=10.0, help="case arrival rate")
+parser.add_argument("--sizes", default="1,8,32,128,512,2048")
+args = parser.parse_args()
+
+print("=" * 86)
+print("Merkle Anchoring Benchmark")
+print("=" * 86)
+
+header = f"{'batch':>6} {'gas/case':>10} {'ETH/case':>12} {'rpc/case':>9} {'build ms':>9} {'proof+verify us/case':>21} {'latency s/case':>15}"
+print(header)
+print("-" * len(header))
+
+arrival_interval = 60.0 / args.arrivals_per_minute
+
+for size in [int(s) for s in args.sizes.split(",")]:
+    leaves = [evidence_leaf(f"CASE-{i:08d}", f"{i:064x}", f"{i:064x}") for i in range(size)]
+
+    started = time.perf_counter()
+    tree = MerkleTree(leaves)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for i in range(size):
+        assert verify_proof(leaves[i], tree.proof(i), tree.root)
+    proof_us = (time.perf_counter() - started) / size * 1e6
+
+    gas_per_case = args.gas_per_tx / size
+    eth_per_case = gas_per_case * args.gas_price_gwei * 1e-9
+
+    # A batch closes when full or when the window expires, whichever is first;
+    # on average a case waits half of that fill time before the root is sent
+    fill_seconds = min((size - 1) * arrival_interval, args.window_seconds) if size > 1 else 0.0
+    latency = fill_seconds / 2 + args.confirm_seconds
+
+    # Single mode: nonce + gas price + send + receipt polls; batch mode shares them
+    rpc_per_case = 4 / size
+
+    print(f"{size:>6} {gas_per_case:>10.0f} {eth_per_case:>12.8f} {rpc_per_case:>9.3f} "
+          f"{build_ms:>9.3f} {proof_us:>21.2f} {latency:>15.1f}")
+
+print("\n" + "=" * 86)
+print("Benchmark complete!")
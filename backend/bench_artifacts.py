@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Measure artifact-analysis cost per image and per megapixel.
+
+Synthetic camera-like images (smooth content + sensor noise, optionally
+JPEG re-encoded) at several resolutions, plus batches of video frames.
+"""
+import io
+import sys
+import time
+import argparse
+sys.path.append('app')
+
+import numpy as np
+from PIL import Image
+
+from services.artifacts import analyze_frames
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--sizes", default="640x480,1280x720,1920x1080,3000x2000,4000x3000")
+parser.add_argument("--video-batch", type=int, default=8, help="frames per video batch")
+parser.add_argument("--iterations", type=int, default=5)
+parser.add_argument("--jpeg", action="store_true", help="JPEG re-encode the synthetic images")
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+
+
+def synthetic(width: int, height: int) -> np.ndarray:
+    base = Image.fromarray(rng.integers(0, 256, (height // 64 + 2, width // 64 + 2, 3), dtype=np.uint8))
+    smooth = np.asarray(base.resize((width, height), Image.BICUBIC)).astype(np.int16)
+    noisy = np.clip(smooth + rng.normal(0, 4, smooth.shape), 0, 255).astype(np.uint8)
+
+    if not args.jpeg:
+        return noisy
+
+    buffer = io.BytesIO()
+    Image.fromarray(noisy).save(buffer, "JPEG", quality=85)
+    return np.asarray(Image.open(buffer).convert("RGB"))
+
+
+def timed(fn) -> float:
+    fn()  # warm-up
+    timings = []
+    for _ in range(args.iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2]
+
+
+print("=" * 72)
+print("Artifact Analysis Benchmark")
+print("=" * 72)
+
+header = f"{'input':>22} {'MP':>7} {'ms':>9} {'ms/MP':>8} {'MP/s':>8} {'score':>7}"
+print(header)
+print("-" * len(header))
+
+for size in args.sizes.split(","):
+    width, height = (int(v) for v in size.split("x"))
+    megapixels = width * height / 1e6
+
+    image = synthetic(width, height)
+    seconds = timed(lambda: analyze_frames(image))
+    score = analyze_frames(image)[0]["artifact_score"]
+    print(f"{'image ' + size:>22} {megapixels:>7.2f} {seconds * 1000:>9.1f} "
+          f"{seconds * 1000 / megapixels:>8.1f} {megapixels / seconds:>8.1f} {score:>7.3f}")
+
+    frames = np.stack([synthetic(width, height) for _ in range(args.video_batch)])
+    batch_mp = megapixels * args.video_batch
+    seconds = timed(lambda: analyze_frames(frames))
+    label = f"{args.video_batch} frames {size}"
+    print(f"{label:>22} {batch_mp:>7.2f} {seconds * 1000:>9.1f} "
+          f"{seconds * 1000 / batch_mp:>8.1f} {batch_mp / seconds:>8.1f} {'':>7}")
+
+print("\n" + "=" * 72)
+print("Benchmark complete!")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Compare inference backends (torch, onnx, onnx-int8) for the image classifier.
+
+Reports the AI-score parity of each backend against PyTorch and its
+latency and throughput at several batch sizes. Needs torch, transformers
+and onnxruntime (+ onnx for the export) installed.
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+sys.path.append('app')
+
+import torch
+from PIL import Image
+from transformers import pipeline
+
+from services.inference_backends import TorchBackend, OnnxBackend, probe_images, parity_check, PARITY_TOLERANCE
+from services.ai_detector import AIDetector
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--model", default="Organika/sdxl-detector")
+parser.add_argument("--images", help="directory of images to score (default: synthetic probes)")
+parser.add_argument("--batch-sizes", default="1,4,8")
+parser.add_argument("--iterations", type=int, default=10)
+parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+args = parser.parse_args()
+
+if args.threads:
+    torch.set_num_threads(args.threads)
+
+if args.images:
+    paths = sorted(p for p in Path(args.images).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png", ".webp"))
+    images = [Image.open(p).convert("RGB") for p in paths]
+else:
+    images = probe_images(16)
+
+print("=" * 70)
+print("Inference Backend Benchmark")
+print("=" * 70)
+print(f"Model: {args.model}   images: {len(images)}   torch threads: {torch.get_num_threads()}")
+
+classifier = pipeline("image-classification", model=args.model, device=-1)
+
+
+# Same label-keyword scoring the detector uses, without loading it again
+scorer = AIDetector.__new__(AIDetector)
+scorer.model_name = args.model
+
+
+def ai_score(results):
+    return scorer._score_results(results)["confidence"]
+
+
+backends = [TorchBackend(classifier)]
+for quantize in (False, True):
+    try:
+        backends.append(OnnxBackend(classifier, args.model, quantize=quantize))
+    except Exception as e:
+        print(f"⚠️ ONNX backend (quantize={quantize}) unavailable: {e}")
+
+print(f"\n{'backend':>10} {'parity':>8} {'tolerance':>10}")
+for backend in backends[1:]:
+    parity = parity_check(backends[0], backend, images, ai_score)
+    status = "✓" if parity <= PARITY_TOLERANCE[backend.name] else "✗"
+    print(f"{backend.name:>10} {parity:>8.4f} {PARITY_TOLERANCE[backend.name]:>10} {status}")
+
+header = f"{'backend':>10} {'batch':>6} {'p50 ms':>9} {'p95 ms':>9} {'images/s':>10}"
+print("\n" + header)
+print("-" * len(header))
+
+for backend in backends:
+    for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+        batch = [images[i % len(images)] for i in range(batch_size)]
+        backend.classify(batch)  # warm-up
+
+        timings = []
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            backend.classify(batch)
+            timings.append(time.perf_counter() - started)
+
+        timings.sort()
+        p50 = timings[len(timings) // 2]
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+        print(f"{backend.name:>10} {batch_size:>6} {p50 * 1000:>9.1f} {p95 * 1000:>9.1f} {batch_size / p50:>10.1f}")
+
+print("\n" + "=" * 70)
+print("Benchmark complete!")
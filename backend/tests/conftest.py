@@ -0,0 +1,44 @@
+"""
+Shared setup for the behaviour tests.
+
+app.models binds its engine when it is first imported, so the throwaway
+database is chosen here before anything from the app is imported. Tests
+run inside a scratch working directory (for uploads/ and store/) and
+every test starts with empty tables.
+
+    cd backend && python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_WORKDIR = tempfile.mkdtemp(prefix="cybershield-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_WORKDIR}/test.db"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.models import Base, SchemaMigration, engine  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from app.models.migrations import migrate
+
+    cwd = os.getcwd()
+    os.chdir(_WORKDIR)
+    try:
+        migrate()
+        yield engine
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture(autouse=True)
+def empty_tables(database):
+    yield
+    with database.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            if table.name != SchemaMigration.__tablename__:
+                conn.execute(table.delete())
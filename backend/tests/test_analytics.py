@@ -0,0 +1,56 @@
+import random
+from datetime import date, datetime, timedelta
+
+from app.models import SessionLocal, Case
+from app.services.analytics import mark_anchored, rebuild, record_case, summary
+
+
+def _summary(**window) -> dict:
+    db = SessionLocal()
+    try:
+        return summary(db, **window)
+    finally:
+        db.close()
+
+
+def test_incremental_rollups_match_a_rebuild():
+    rng = random.Random(22)
+    start = datetime(2026, 2, 1, 8, 0, 0)
+    case_ids = []
+
+    db = SessionLocal()
+    try:
+        for i in range(500):
+            case = Case(
+                id=f"CASE-{i:04d}",
+                # Older rows may have no media type at all
+                media_type=rng.choice(["image", "image", "video", None]),
+                filename=f"{i}.bin",
+                media_hash=f"{i:064x}",
+                detection_score=rng.choice([rng.random(), rng.random(), 1.0, None]),
+                is_ai_generated=rng.random() < 0.4,
+                created_at=start + timedelta(hours=rng.randrange(24 * 20))
+            )
+            db.add(case)
+            record_case(db, case)
+            case_ids.append(case.id)
+            if i % 50 == 49:
+                db.commit()
+        db.commit()
+
+        # Batches overlap, so some cases are "anchored" twice
+        for batch in range(12):
+            chosen = rng.sample(case_ids, 40)
+            mark_anchored(db, chosen, f"0x{batch:04x}")
+            db.commit()
+    finally:
+        db.close()
+
+    windows = [{}, {"start": date(2026, 2, 5), "end": date(2026, 2, 12)}]
+    incremental = [_summary(**w) for w in windows]
+
+    assert incremental[0]["totals"]["total"] == 500
+    assert "unknown" in incremental[0]["by_media_type"]
+
+    assert rebuild()["cases"] == 500
+    assert [_summary(**w) for w in windows] == incremental
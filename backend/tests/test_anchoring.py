@@ -0,0 +1,329 @@
+import hashlib
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import SessionLocal, Case, AnchorJob, AnchorBatch
+from app.services import anchoring
+from app.services.analytics import record_case
+from app.services.anchoring import AnchorWorker, enqueue_anchor, verify_case_inclusion
+
+
+class FakeTxManager:
+    """Hands out nonces from the chain's pending count, like TransactionManager"""
+
+    def __init__(self, pending: int):
+        self.pending = pending
+        self.next_nonce = None
+        self.resyncs = 0
+
+    def resync(self):
+        self.next_nonce = None
+        self.resyncs += 1
+
+    def take_nonce(self) -> int:
+        if self.next_nonce is None:
+            self.next_nonce = self.pending
+        nonce, self.next_nonce = self.next_nonce, self.next_nonce + 1
+        return nonce
+
+    def reserve_through(self, nonce: int):
+        if self.next_nonce is None:
+            self.next_nonce = self.pending
+        self.next_nonce = max(self.next_nonce, nonce + 1)
+
+
+class FakeChain:
+    """Records broadcasts; receipts only exist for hashes listed in `mined`"""
+
+    enabled = True
+
+    def __init__(self, nonce: int = 7, fail: bool = False):
+        self.tx_manager = FakeTxManager(nonce)
+        self.fail = fail
+        self.prepared = 0
+        self.sent = []
+        self.mined = {}
+
+    def prepare_evidence(self, case_id, media_hash, report_hash, replace=None):
+        nonce = replace["nonce"] if replace else self.tx_manager.take_nonce()
+        self.prepared += 1
+        return {
+            "success": True,
+            "tx_hash": f"0x{self.prepared:04x}",
+            "nonce": nonce,
+            "max_fee_per_gas": 100 * self.prepared,
+            "max_priority_fee_per_gas": 10 * self.prepared,
+            "case_id": case_id,
+        }
+
+    def broadcast(self, prepared):
+        if self.fail:
+            self.tx_manager.resync()
+            return {"success": False, "error": "insufficient funds"}
+
+        self.sent.append({"case_id": prepared["case_id"], "nonce": prepared["nonce"], "tx_hash": prepared["tx_hash"]})
+        self.tx_manager.pending = max(self.tx_manager.pending, prepared["nonce"] + 1)
+        return {"success": True}
+
+    def submit_evidence(self, case_id, media_hash, report_hash, replace=None):
+        prepared = self.prepare_evidence(case_id, media_hash, report_hash, replace=replace)
+        sent = self.broadcast(prepared)
+        return prepared if sent["success"] else sent
+
+    def get_receipt(self, tx_hash):
+        if tx_hash in self.mined:
+            return {"status": 1, "blockNumber": self.mined[tx_hash]}
+        return None
+
+
+def _cases(count: int) -> list:
+    db = SessionLocal()
+    try:
+        ids = []
+        for i in range(count):
+            media_hash = hashlib.sha256(f"media-{i}".encode()).hexdigest()
+            case = Case(
+                id=f"CASE-{i:03d}",
+                media_type="image",
+                filename=f"{i}.jpg",
+                media_hash=media_hash,
+                detection_score=0.9,
+                is_ai_generated=True,
+                created_at=datetime.utcnow()
+            )
+            db.add(case)
+            db.flush()
+            enqueue_anchor(db, case.id, media_hash, media_hash)
+            record_case(db, case)
+            ids.append(case.id)
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+
+def _job(case_id: str) -> AnchorJob:
+    db = SessionLocal()
+    try:
+        return db.query(AnchorJob).filter(AnchorJob.case_id == case_id).one()
+    finally:
+        db.close()
+
+
+def _inclusion(case_id: str) -> dict:
+    db = SessionLocal()
+    try:
+        return verify_case_inclusion(db, db.get(Case, case_id), check_chain=False)
+    finally:
+        db.close()
+
+
+def test_claim_is_exclusive():
+    _cases(1)
+    now = datetime.utcnow()
+
+    db = SessionLocal()
+    try:
+        job_id = db.query(AnchorJob.id).scalar()
+        assert AnchorWorker(mode="single")._claim(db, AnchorJob, job_id, now)
+        assert not AnchorWorker(mode="single")._claim(db, AnchorJob, job_id, now)
+    finally:
+        db.close()
+
+
+def test_single_case_is_pending_until_its_receipt():
+    (case_id,) = _cases(1)
+    worker, chain = AnchorWorker(mode="single"), FakeChain()
+
+    inclusion = _inclusion(case_id)
+    assert inclusion["status"] == "pending" and inclusion["valid"] is None
+
+    worker._submit_pending(chain, AnchorJob)
+    job = _job(case_id)
+    assert job.status == "submitted" and job.tx_nonce == 7
+
+    inclusion = _inclusion(case_id)
+    assert inclusion["status"] == "pending" and inclusion["valid"] is None
+    assert inclusion["job_status"] == "submitted" and inclusion["mode"] == "single"
+
+    chain.mined[job.tx_hash] = 42
+    worker._confirm_submitted(chain, AnchorJob, worker._job_anchored)
+
+    inclusion = _inclusion(case_id)
+    assert inclusion["status"] == "anchored" and inclusion["valid"] is True
+
+    db = SessionLocal()
+    try:
+        assert db.get(Case, case_id).blockchain_tx == job.tx_hash
+    finally:
+        db.close()
+
+
+def test_unconfirmed_transaction_keeps_its_nonce(monkeypatch):
+    monkeypatch.setattr(anchoring, "TX_STUCK_SECONDS", 10_000)
+    monkeypatch.setattr(anchoring, "ANCHOR_CONFIRM_TIMEOUT_SECONDS", 0)
+    monkeypatch.setattr(anchoring, "ANCHOR_MAX_ATTEMPTS", 3)
+
+    (case_id,) = _cases(1)
+    worker, chain = AnchorWorker(mode="single"), FakeChain()
+    worker._submit_pending(chain, AnchorJob)
+
+    for _ in range(3):
+        worker._confirm_submitted(chain, AnchorJob, worker._job_anchored)
+
+    # Every re-send replaced the original at its nonce, never a fresh one
+    assert [s["nonce"] for s in chain.sent] == [7, 7, 7]
+
+    job = _job(case_id)
+    assert job.status == "failed" and job.attempts == 3
+    assert chain.tx_manager.resyncs == 1
+
+
+def test_earlier_transaction_mined_after_a_replacement(monkeypatch):
+    monkeypatch.setattr(anchoring, "TX_STUCK_SECONDS", 0)
+
+    (case_id,) = _cases(1)
+    worker, chain = AnchorWorker(mode="single"), FakeChain()
+    worker._submit_pending(chain, AnchorJob)
+    original = _job(case_id).tx_hash
+
+    worker._confirm_submitted(chain, AnchorJob, worker._job_anchored)
+    assert _job(case_id).tx_hash != original
+
+    chain.mined[original] = 9
+    worker._confirm_submitted(chain, AnchorJob, worker._job_anchored)
+
+    job = _job(case_id)
+    assert job.status == "anchored" and job.tx_hash == original
+
+
+def test_crash_before_broadcast_keeps_the_recorded_nonce(monkeypatch):
+    monkeypatch.setattr(anchoring, "TX_STUCK_SECONDS", 10_000)
+    _cases(2)
+
+    chain = FakeChain()
+
+    def killed(prepared):
+        raise SystemExit("worker killed mid-send")
+
+    chain.broadcast = killed
+    with pytest.raises(SystemExit):
+        AnchorWorker(mode="single")._submit_pending(chain, AnchorJob)
+
+    db = SessionLocal()
+    try:
+        crashed = db.query(AnchorJob).filter(AnchorJob.status == "submitted").one()
+        assert crashed.tx_nonce == 7 and crashed.tx_hash
+        crashed_case = crashed.case_id
+    finally:
+        db.close()
+
+    # After a restart the chain never saw nonce 7, but it is still spoken for
+    restarted = FakeChain(nonce=7)
+    monkeypatch.setattr(anchoring, "get_blockchain_service", lambda: restarted)
+    worker = AnchorWorker(mode="single")
+    worker.drain_once()
+    assert [s["nonce"] for s in restarted.sent] == [8]
+
+    # Once it counts as stuck it is re-sent at its own nonce
+    monkeypatch.setattr(anchoring, "TX_STUCK_SECONDS", 0)
+    worker.drain_once()
+    assert [s["nonce"] for s in restarted.sent if s["case_id"] == crashed_case] == [7]
+    assert _job(crashed_case).tx_nonce == 7
+
+
+def test_failed_send_backs_off():
+    (case_id,) = _cases(1)
+    worker = AnchorWorker(mode="single")
+
+    before = datetime.utcnow()
+    worker._submit_pending(FakeChain(fail=True), AnchorJob)
+
+    job = _job(case_id)
+    assert job.status == "pending" and job.attempts == 1
+    assert job.last_error == "insufficient funds"
+    assert job.next_attempt_at >= before + timedelta(seconds=anchoring.ANCHOR_BACKOFF_SECONDS) - timedelta(seconds=1)
+
+    # Not due again until the backoff has passed
+    worker._submit_pending(FakeChain(), AnchorJob)
+    assert _job(case_id).status == "pending"
+
+
+def test_merkle_batch_proves_every_case(monkeypatch):
+    monkeypatch.setattr(anchoring, "ANCHOR_BATCH_SIZE", 3)
+
+    case_ids = _cases(5)
+    worker, chain = AnchorWorker(mode="merkle"), FakeChain()
+
+    # One full batch; the two left over wait for the window to close
+    assert len(worker.form_batches()) == 1
+    assert worker.form_batches() == []
+
+    db = SessionLocal()
+    try:
+        db.query(AnchorJob).filter(AnchorJob.batch_id.is_(None)).update(
+            {AnchorJob.created_at: datetime.utcnow() - timedelta(seconds=anchoring.ANCHOR_BATCH_WINDOW_SECONDS + 1)},
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+    assert len(worker.form_batches()) == 1
+
+    worker._submit_pending(chain, AnchorBatch)
+    assert len(chain.sent) == 2
+    assert {_inclusion(c)["status"] for c in case_ids} == {"pending"}
+
+    for sent in chain.sent:
+        chain.mined[sent["tx_hash"]] = 100
+    worker._confirm_submitted(chain, AnchorBatch, worker._batch_anchored)
+
+    for case_id in case_ids:
+        inclusion = _inclusion(case_id)
+        assert inclusion["status"] == "anchored" and inclusion["mode"] == "merkle"
+        assert inclusion["valid"] is True
+        assert inclusion["computed_root"] == inclusion["merkle_root"]
+
+
+def test_batches_formed_before_a_switch_to_single_mode_are_still_sent(monkeypatch):
+    monkeypatch.setattr(anchoring, "ANCHOR_BATCH_SIZE", 2)
+    monkeypatch.setattr(anchoring, "get_blockchain_service", lambda: chain)
+
+    _cases(3)
+    chain = FakeChain()
+    assert len(AnchorWorker(mode="merkle").form_batches()) == 1
+
+    AnchorWorker(mode="single").drain_once()
+
+    # One root for the batch, one transaction for the unbatched case
+    sent = sorted(s["case_id"] for s in chain.sent)
+    assert len(sent) == 2
+    assert sent[0].startswith("BATCH-") and sent[1] == "CASE-002"
+
+
+def test_failed_batch_releases_its_jobs(monkeypatch):
+    monkeypatch.setattr(anchoring, "ANCHOR_BATCH_SIZE", 2)
+    monkeypatch.setattr(anchoring, "ANCHOR_MAX_ATTEMPTS", 1)
+
+    case_ids = _cases(2)
+    worker = AnchorWorker(mode="merkle")
+    (batch_id,) = worker.form_batches()
+
+    worker._submit_pending(FakeChain(fail=True), AnchorBatch)
+
+    db = SessionLocal()
+    try:
+        assert db.get(AnchorBatch, batch_id).status == "failed"
+    finally:
+        db.close()
+
+    for case_id in case_ids:
+        job = _job(case_id)
+        assert job.status == "pending" and job.batch_id is None
+        assert job.attempts == 0 and job.merkle_proof is None
+
+    # The released jobs go into a fresh batch
+    (rebatched,) = worker.form_batches()
+    assert rebatched != batch_id
+    assert {_job(c).batch_id for c in case_ids} == {rebatched}
@@ -0,0 +1,111 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+from fastapi import UploadFile
+
+from app.routes import detection
+
+
+class FakeAnalysis:
+    """Stands in for analyze_spooled; blocks while `hold` is set"""
+
+    def __init__(self):
+        self.hold = False
+        self.started = []
+        self.cancelled = []
+
+    async def __call__(self, upload, filename, media_type):
+        self.started.append(filename)
+        try:
+            while self.hold:
+                await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            self.cancelled.append(filename)
+            raise
+        return {
+            "duplicate": False,
+            "case_id": f"CASE-{upload.sha256[:8]}",
+            "detection": {"is_ai_generated": filename.startswith("fake")}
+        }
+
+
+@pytest.fixture
+def analysis(tmp_path, monkeypatch):
+    fake = FakeAnalysis()
+    monkeypatch.setattr(detection, "analyze_spooled", fake)
+    monkeypatch.setattr(detection, "UPLOAD_FOLDER", str(tmp_path))
+    return fake
+
+
+def _upload(filename: str, data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+
+def _zip(members: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _spooled(tmp_path) -> list:
+    return list(tmp_path.glob(".upload-*"))
+
+
+async def _collect(events) -> list:
+    return [event async for event in events]
+
+
+def test_batch_summary(analysis, tmp_path):
+    files = [
+        _upload("fake.jpg", b"one"),
+        _upload("copy.jpg", b"one"),
+        _upload("notes.txt", b"text"),
+        _upload("album.zip", _zip({"real.png": b"two", ".hidden.png": b"x", "clip.mp4": b"three"}))
+    ]
+
+    events = asyncio.run(_collect(detection._batch_events(files)))
+
+    kind, summary = events[-1]
+    assert kind == "summary" and all(kind == "item" for kind, _ in events[:-1])
+    assert [item["filename"] for item in summary["items"]] == [
+        "fake.jpg", "copy.jpg", "notes.txt", "real.png", "clip.mp4"
+    ]
+    assert (summary["analyzed"], summary["duplicates_in_batch"], summary["skipped"]) == (3, 1, 1)
+    assert summary["ai_generated"] == 1
+    assert summary["items"][1]["case_id"] == summary["items"][0]["case_id"]
+    assert _spooled(tmp_path) == []
+
+
+def test_sse_ends_with_the_summary(analysis):
+    files = [_upload("a.jpg", b"a"), _upload("b.jpg", b"b")]
+
+    chunks = asyncio.run(_collect(detection._sse(detection._batch_events(files))))
+
+    assert all(chunk.endswith("\n\n") for chunk in chunks)
+    assert chunks[-1].startswith("event: summary\n")
+    assert sum(chunk.startswith("event: item\n") for chunk in chunks) == 4
+
+
+def test_disconnect_stops_the_batch(analysis, tmp_path, monkeypatch):
+    monkeypatch.setattr(detection, "BATCH_CONCURRENCY", 2)
+    analysis.hold = True
+    files = [_upload(f"{i}.jpg", bytes([i])) for i in range(6)]
+
+    async def disconnect():
+        stream = detection._sse(detection._batch_events(files))
+        first = await stream.__anext__()
+        await asyncio.sleep(0.05)
+        await stream.aclose()
+        # Checked before asyncio.run cancels whatever is left over
+        return first, sorted(analysis.cancelled), _spooled(tmp_path)
+
+    first, cancelled, spooled = asyncio.run(disconnect())
+
+    assert first.startswith("event: item\n")
+    assert analysis.started == ["0.jpg", "1.jpg"]
+    assert cancelled == analysis.started
+    assert spooled == []
@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from app.services.batching import MicroBatcher
+
+
+@pytest.fixture
+def batcher_factory():
+    batchers = []
+
+    def make(batch_fn, **kwargs):
+        batcher = MicroBatcher(batch_fn, **kwargs)
+        batchers.append(batcher)
+        return batcher
+
+    yield make
+
+    for batcher in batchers:
+        batcher.close()
+
+
+def test_queued_inputs_share_full_batches(batcher_factory):
+    release = threading.Event()
+    sizes = []
+
+    def batch_fn(items):
+        release.wait(5)
+        sizes.append(len(items))
+        return [item * 10 for item in items]
+
+    batcher = batcher_factory(batch_fn, max_batch_size=4, max_wait_ms=1000)
+
+    # The first batch blocks until everything else is queued behind it
+    first = batcher.submit(0)
+    futures = [batcher.submit(i) for i in range(1, 9)]
+    release.set()
+
+    assert first.result(5) == 0
+    assert [f.result(5) for f in futures] == [i * 10 for i in range(1, 9)]
+    assert sum(sizes) == 9 and max(sizes) == 4
+
+    stats = batcher.stats()
+    assert stats["items"] == 9 and stats["batches"] == len(sizes)
+
+
+def test_lone_input_runs_after_max_wait(batcher_factory):
+    batcher = batcher_factory(lambda items: [len(items)] * len(items), max_batch_size=8, max_wait_ms=20)
+
+    assert batcher.run("only", timeout=5) == 1
+    assert batcher.stats()["batch_size_histogram"] == {1: 1}
+
+
+def test_batch_error_reaches_every_caller(batcher_factory):
+    def batch_fn(items):
+        raise RuntimeError("model crashed")
+
+    batcher = batcher_factory(batch_fn, max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(3)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model crashed"):
+            future.result(5)
+
+    assert batcher.stats()["failed_batches"] >= 1
+
+
+def test_result_count_mismatch_is_an_error(batcher_factory):
+    batcher = batcher_factory(lambda items: items[:-1], max_batch_size=2, max_wait_ms=50)
+
+    with pytest.raises(RuntimeError, match="returned"):
+        batcher.run_many([1, 2], timeout=5)
@@ -0,0 +1,94 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import SessionLocal, Case, AnchorJob
+from app.services.case_listing import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+    fetch_page,
+    iter_ndjson,
+)
+
+
+@pytest.fixture
+def cases():
+    # Groups of three share a timestamp, so pages often split a tie
+    base = datetime(2026, 1, 1, 12, 0, 0, 123456)
+    db = SessionLocal()
+    try:
+        for i in range(57):
+            db.add(Case(
+                id=f"CASE-{i:03d}",
+                media_type="video" if i % 4 == 0 else "image",
+                filename=f"{i}.bin",
+                media_hash=f"{i:064x}",
+                detection_score=i / 57,
+                is_ai_generated=i % 2 == 0,
+                blockchain_tx=f"0x{i:04x}" if i % 5 == 0 else None,
+                created_at=base + timedelta(seconds=i // 3)
+            ))
+            if i % 5 == 1:
+                db.add(AnchorJob(case_id=f"CASE-{i:03d}", media_hash=f"{i:064x}", report_hash="r", status="failed"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _walk(filters: dict, limit: int) -> list:
+    ids, cursor = [], None
+    db = SessionLocal()
+    try:
+        while True:
+            page = fetch_page(db, filters, cursor, limit)
+            assert len(page["cases"]) <= limit
+            ids += [c["case_id"] for c in page["cases"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return ids
+    finally:
+        db.close()
+
+
+def _expected(predicate=lambda case: True) -> list:
+    db = SessionLocal()
+    try:
+        rows = db.query(Case).order_by(Case.created_at.desc(), Case.id.desc()).all()
+        return [r.id for r in rows if predicate(r)]
+    finally:
+        db.close()
+
+
+def test_cursor_round_trips():
+    created_at = datetime(2026, 3, 4, 5, 6, 7, 890123)
+
+    assert decode_cursor(encode_cursor(created_at, "CASE-a|b")) == (created_at, "CASE-a|b")
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.parametrize("limit", [1, 7, 10, 57, 100])
+def test_pages_cover_every_case_once_in_order(cases, limit):
+    assert _walk({}, limit) == _expected()
+
+
+def test_filters_apply_across_pages(cases):
+    filters = {"media_type": "image", "is_ai_generated": True, "min_confidence": 0.2}
+
+    assert _walk(filters, 4) == _expected(
+        lambda c: c.media_type == "image" and c.is_ai_generated and c.detection_score >= 0.2
+    )
+
+
+def test_anchor_status_filter(cases):
+    assert _walk({"anchor_status": "anchored"}, 5) == _expected(lambda c: c.blockchain_tx is not None)
+    assert _walk({"anchor_status": "failed"}, 5) == _expected(lambda c: int(c.id[5:]) % 5 == 1)
+
+
+def test_export_streams_the_same_order(cases):
+    lines = "".join(iter_ndjson({}, chunk=8)).splitlines()
+
+    assert [json.loads(line)["case_id"] for line in lines] == _expected()
@@ -0,0 +1,124 @@
+import cv2
+import numpy as np
+import pytest
+
+from app.services import frame_sampler
+from app.services.frame_sampler import FrameSampler, coarse_to_fine, uniform_targets
+
+FRAMES = 1500
+FPS = 25
+
+_REAL_CAPTURE = cv2.VideoCapture
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("video") / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (32, 24))
+    for i in range(FRAMES):
+        writer.write(np.full((24, 32, 3), i % 256, np.uint8))
+    writer.release()
+    return path
+
+
+class _NoSeekCapture:
+    """A capture whose container refuses CAP_PROP_POS_FRAMES"""
+
+    def __init__(self, path):
+        self._cap = _REAL_CAPTURE(path)
+
+    def set(self, prop, value):
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._cap, name)
+
+
+class _StuckSeekCapture(_NoSeekCapture):
+    """Claims every seek succeeded without moving"""
+
+    def set(self, prop, value):
+        return True
+
+
+class _SnappingSeekCapture(_NoSeekCapture):
+    """Claims success but lands a few frames early, like a keyframe snap"""
+
+    def set(self, prop, value):
+        return self._cap.set(prop, max(0, value - 7))
+
+
+def _assert_frames_match_indices(frames):
+    # Every frame of the clip is filled with its own index (mod 256)
+    for index, _, frame in frames:
+        assert abs(int(frame.mean()) - index % 256) <= 2, index
+
+
+def test_coarse_to_fine_prefixes_span_the_clip():
+    order = coarse_to_fine(uniform_targets(FRAMES, 16))
+
+    assert sorted(order) == uniform_targets(FRAMES, 16)
+    assert max(order[:4]) - min(order[:4]) > FRAMES / 2
+
+
+def test_sparse_plan_seeks_dense_plan_steps(clip):
+    sparse = FrameSampler(clip, max_frames=5)
+    assert [i for i, _, _ in sparse.sample()] == sparse.plan(FRAMES)
+    assert sparse.stats()["seeks"] == 5
+
+    # Targets within a keyframe interval of each other are reached by grab()
+    dense = FrameSampler(clip, max_frames=60)
+    frames = list(dense.sample())
+    assert len(frames) == 60
+    assert dense.stats()["seeks"] == 0 and dense.stats()["opens"] == 1
+
+
+def test_rounds_share_one_capture_and_cover_the_plan(clip):
+    sampler = FrameSampler(clip, max_frames=40)
+    rounds = list(sampler.sample_coarse_to_fine(4, 8))
+    stats = sampler.stats()
+
+    assert sorted(i for i, _, _ in rounds) == sampler.plan(FRAMES)
+    assert stats["opens"] == 1 and stats["decoded"] == 40
+    # Each of the 5 rounds reads forward, so at most one seek per frame
+    assert stats["seeks"] <= 40
+
+
+def test_stopping_early_decodes_only_the_first_round(clip):
+    sampler = FrameSampler(clip, max_frames=40)
+    frames = sampler.sample_coarse_to_fine(4, 8)
+
+    first = [next(frames)[0] for _ in range(4)]
+    frames.close()
+
+    assert first == sorted(first)
+    assert sampler.stats()["decoded"] == 4
+    assert sampler._cap is None
+
+
+def test_unseekable_container_falls_back_to_grabbing(clip, monkeypatch):
+    monkeypatch.setattr(frame_sampler.cv2, "VideoCapture", _NoSeekCapture)
+
+    sampler = FrameSampler(clip, max_frames=40)
+    indices = [i for i, _, _ in sampler.sample_coarse_to_fine(4, 8)]
+
+    assert sorted(indices) == sampler.plan(FRAMES)
+    assert sampler.stats()["method"] == "sequential"
+    assert sampler.stats()["seeks"] == 0
+
+
+@pytest.mark.parametrize("capture", [_StuckSeekCapture, _SnappingSeekCapture])
+def test_seek_that_lands_elsewhere_falls_back_from_the_start(clip, monkeypatch, capture):
+    monkeypatch.setattr(frame_sampler.cv2, "VideoCapture", capture)
+
+    sampler = FrameSampler(clip, max_frames=40)
+    frames = list(sampler.sample_coarse_to_fine(4, 8))
+
+    assert sorted(i for i, _, _ in frames) == sampler.plan(FRAMES)
+    assert sampler.stats()["method"] == "sequential"
+    _assert_frames_match_indices(frames)
+
+
+def test_frames_carry_their_own_indices(clip):
+    sampler = FrameSampler(clip, max_frames=40)
+    _assert_frames_match_indices(sampler.sample_coarse_to_fine(4, 8))
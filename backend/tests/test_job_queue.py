@@ -0,0 +1,147 @@
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+from app.models import SessionLocal, AnalysisJob, StoredObject
+from app.services import job_queue
+from app.services.ingest import SpooledUpload
+from app.services.media_store import get_media_store
+
+
+def _enqueue(data: bytes, priority: int = 0) -> str:
+    store = get_media_store()
+    path = store.temp_path()
+    with open(path, "wb") as f:
+        f.write(data)
+
+    upload = SpooledUpload(path, hashlib.sha256(data).hexdigest(), len(data))
+    return job_queue.enqueue(upload, "clip.mp4", "video", priority)
+
+
+def _expire_lease(job_id: str):
+    db = SessionLocal()
+    try:
+        db.get(AnalysisJob, job_id).available_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _refcount(media_hash: str) -> int:
+    db = SessionLocal()
+    try:
+        return db.get(StoredObject, media_hash).refcount
+    finally:
+        db.close()
+
+
+def test_claims_highest_priority_then_oldest():
+    low = _enqueue(b"low")
+    high = _enqueue(b"high", priority=5)
+    later = _enqueue(b"later")
+
+    assert [job_queue.claim("w")["job_id"] for _ in range(3)] == [high, low, later]
+    assert job_queue.claim("w") is None
+
+
+def test_leased_job_is_not_claimed_twice():
+    job_id = _enqueue(b"one")
+
+    job = job_queue.claim("a")
+    assert job["job_id"] == job_id and job["attempts"] == 1
+    assert job_queue.claim("b") is None
+
+
+def test_concurrent_claims_never_share_a_job():
+    queued = {_enqueue(f"job-{i}".encode()) for i in range(6)}
+    start = threading.Barrier(6)
+    claimed = []
+
+    def worker(owner):
+        start.wait()
+        job = job_queue.claim(owner)
+        claimed.append(job and job["job_id"])
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(claimed) == sorted(queued)
+
+
+def test_expired_lease_moves_to_another_worker():
+    job_id = _enqueue(b"crashy")
+    media_hash = job_queue.claim("a")["media_hash"]
+    assert _refcount(media_hash) == 1
+
+    _expire_lease(job_id)
+    job = job_queue.claim("b")
+    assert job["job_id"] == job_id and job["attempts"] == 2
+
+    # The first worker comes back too late
+    assert not job_queue.heartbeat(job_id, "a")
+    assert not job_queue.complete(job_id, "a", {"case_id": "CASE-A"})
+
+    assert job_queue.heartbeat(job_id, "b")
+    assert job_queue.complete(job_id, "b", {"case_id": "CASE-B"})
+
+    done = job_queue.get_job(job_id)
+    assert done["status"] == "done" and done["case_id"] == "CASE-B"
+    assert _refcount(media_hash) == 0
+
+
+def test_failures_back_off_then_give_up(monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(job_queue, "JOB_BACKOFF_SECONDS", 60)
+
+    job_id = _enqueue(b"broken")
+    media_hash = job_queue.claim("w")["media_hash"]
+
+    before = datetime.utcnow()
+    assert job_queue.fail(job_id, "w", "decoder error")
+
+    db = SessionLocal()
+    try:
+        job = db.get(AnalysisJob, job_id)
+        assert job.status == "queued" and job.lease_owner is None
+        assert job.available_at >= before + timedelta(seconds=59)
+    finally:
+        db.close()
+
+    # Not due until the backoff has passed
+    assert job_queue.claim("w") is None
+
+    _expire_lease(job_id)
+    assert job_queue.claim("w")["attempts"] == 2
+    assert job_queue.fail(job_id, "w", "decoder error")
+
+    failed = job_queue.get_job(job_id)
+    assert failed["status"] == "failed" and failed["error"] == "decoder error"
+    assert _refcount(media_hash) == 0
+
+
+def test_job_lost_on_its_last_attempt_fails(monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_MAX_ATTEMPTS", 1)
+
+    job_id = _enqueue(b"abandoned")
+    media_hash = job_queue.claim("w")["media_hash"]
+
+    _expire_lease(job_id)
+    assert job_queue.claim("other") is None
+
+    job = job_queue.get_job(job_id)
+    assert job["status"] == "failed" and "lost" in job["error"]
+    assert _refcount(media_hash) == 0
+
+
+def test_stats_count_expired_leases():
+    job_id = _enqueue(b"stats")
+    _enqueue(b"waiting")
+    job_queue.claim("w")
+    _expire_lease(job_id)
+
+    stats = job_queue.job_queue_stats()
+    assert stats["queued"] == 1 and stats["running"] == 1
+    assert stats["expired_leases"] == 1
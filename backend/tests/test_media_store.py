@@ -0,0 +1,103 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import SessionLocal, StoredObject
+from app.services.media_store import MediaStore, MediaStoreError
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MediaStore(root=str(tmp_path / "store"))
+
+
+def _put(store: MediaStore, data: bytes) -> str:
+    path = store.temp_path()
+    with open(path, "wb") as f:
+        f.write(data)
+    return store.put_file(path)
+
+
+def _refs(store: MediaStore, sha256: str, delta: int):
+    db = SessionLocal()
+    try:
+        for _ in range(abs(delta)):
+            (store.acquire if delta > 0 else store.release)(db, sha256)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _age(sha256: str, seconds: float):
+    db = SessionLocal()
+    try:
+        db.get(StoredObject, sha256).touched_at = datetime.utcnow() - timedelta(seconds=seconds)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_identical_bytes_are_stored_once(store, tmp_path):
+    first = _put(store, b"same bytes")
+    second = _put(store, b"same bytes")
+
+    assert first == second == hashlib.sha256(b"same bytes").hexdigest()
+    assert store.stored == 1 and store.deduplicated == 1
+    assert store.path(first).startswith(str(tmp_path / "store" / first[:2] / first[2:4]))
+    assert list(store.tmp_dir.iterdir()) == []
+
+
+def test_referenced_and_recent_objects_survive_gc(store):
+    kept = _put(store, b"referenced")
+    recent = _put(store, b"recent")
+    _refs(store, kept, +1)
+    _age(kept, 7200)
+
+    assert store.gc(grace_seconds=3600) == {"removed": 0, "freed_bytes": 0}
+    assert store.exists(kept) and store.exists(recent)
+
+
+def test_released_object_is_collected_with_its_sidecars(store):
+    sha256 = _put(store, b"short lived")
+    _refs(store, sha256, +2)
+
+    sidecar = store.temp_path()
+    with open(sidecar, "wb") as f:
+        f.write(b"jpeg")
+    preview = store.put_sidecar(sidecar, sha256, "preview.jpg")
+
+    _refs(store, sha256, -1)
+    _age(sha256, 7200)
+    assert store.gc(grace_seconds=3600)["removed"] == 0
+
+    _refs(store, sha256, -1)
+    _age(sha256, 7200)
+    assert store.gc(grace_seconds=3600) == {"removed": 1, "freed_bytes": len(b"short lived") + len(b"jpeg")}
+    assert not store.exists(sha256)
+    assert not os.path.exists(preview)
+
+    db = SessionLocal()
+    try:
+        assert db.get(StoredObject, sha256) is None
+    finally:
+        db.close()
+
+
+def test_acquiring_a_missing_object_fails(store):
+    db = SessionLocal()
+    try:
+        with pytest.raises(MediaStoreError):
+            store.acquire(db, "0" * 64)
+    finally:
+        db.close()
+
+
+def test_put_after_collection_stores_the_file_again(store):
+    sha256 = _put(store, b"comes back")
+    _age(sha256, 7200)
+    assert store.gc(grace_seconds=3600)["removed"] == 1
+
+    assert _put(store, b"comes back") == sha256
+    assert store.exists(sha256)
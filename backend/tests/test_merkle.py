@@ -0,0 +1,46 @@
+import pytest
+
+from app.services.merkle import MerkleTree, evidence_leaf, compute_root, verify_proof
+
+
+def _leaves(count: int) -> list:
+    return [evidence_leaf(f"CASE-{i}", f"{i:064x}", f"{i:064x}") for i in range(count)]
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 8, 13])
+def test_every_leaf_proves_against_the_root(count):
+    leaves = _leaves(count)
+    tree = MerkleTree(leaves)
+
+    for index, leaf in enumerate(leaves):
+        assert verify_proof(leaf, tree.proof(index), tree.root)
+
+
+def test_odd_node_is_promoted_without_a_duplicate_sibling():
+    leaves = _leaves(3)
+    tree = MerkleTree(leaves)
+
+    # The third leaf has no partner on the first level
+    assert [step["hash"] for step in tree.proof(2)] == [tree.levels[1][0].hex()]
+    assert all(step["hash"] != leaves[2] for step in tree.proof(2))
+
+
+def test_tampered_leaf_or_proof_does_not_verify():
+    leaves = _leaves(6)
+    tree = MerkleTree(leaves)
+    proof = tree.proof(4)
+
+    other = evidence_leaf("CASE-4", "f" * 64, f"{4:064x}")
+    assert not verify_proof(other, proof, tree.root)
+
+    flipped = [dict(step) for step in proof]
+    flipped[0]["position"] = "left" if flipped[0]["position"] == "right" else "right"
+    assert compute_root(leaves[4], flipped) != tree.root
+
+
+def test_empty_tree_and_bad_index_are_rejected():
+    with pytest.raises(ValueError):
+        MerkleTree([])
+
+    with pytest.raises(IndexError):
+        MerkleTree(_leaves(2)).proof(2)
@@ -0,0 +1,68 @@
+import hashlib
+import os
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.models import Case, StoredObject
+from app.models.migrations import migrate, current_version, LATEST_VERSION, MIGRATIONS
+from app.services import media_store
+from app.services.media_store import MediaStore
+
+# The cases table as the app created it before migrations existed
+_LEGACY_CASES = """
+CREATE TABLE cases (
+    id VARCHAR PRIMARY KEY,
+    media_type VARCHAR,
+    filename VARCHAR,
+    media_hash VARCHAR UNIQUE,
+    detection_score FLOAT,
+    is_ai_generated BOOLEAN,
+    report_path VARCHAR,
+    blockchain_tx VARCHAR,
+    created_at DATETIME
+)
+"""
+
+
+def test_upgrades_a_pre_migration_database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(media_store, "_media_store", MediaStore(root=str(tmp_path / "store")))
+
+    data = b"legacy upload"
+    media_hash = hashlib.sha256(data).hexdigest()
+    os.makedirs("uploads")
+    with open("uploads/CASE-OLD_photo.jpg", "wb") as f:
+        f.write(data)
+
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with legacy.begin() as conn:
+        conn.execute(text(_LEGACY_CASES))
+        conn.execute(
+            text("INSERT INTO cases (id, media_type, filename, media_hash, detection_score, is_ai_generated, created_at) "
+                 "VALUES ('CASE-OLD', 'image', 'photo.jpg', :hash, 0.8, 1, '2025-01-01 10:00:00')"),
+            {"hash": media_hash}
+        )
+
+    assert migrate(bind=legacy) == [name for _, name, _ in MIGRATIONS]
+
+    with legacy.connect() as conn:
+        assert current_version(conn) == LATEST_VERSION
+
+        columns = {c["name"] for c in inspect(conn).get_columns(Case.__tablename__)}
+        assert {"report_sha256", "report_variant"} <= columns
+
+        refcount = conn.execute(
+            StoredObject.__table__.select()
+            .with_only_columns(StoredObject.refcount)
+            .where(StoredObject.sha256 == media_hash)
+        ).scalar()
+        assert refcount == 1
+
+        daily = conn.execute(text("SELECT SUM(total) FROM case_daily_rollup")).scalar()
+        assert daily == 1
+
+    # The legacy file is linked in, not moved
+    assert media_store.get_media_store().exists(media_hash)
+    assert os.path.exists("uploads/CASE-OLD_photo.jpg")
+
+    assert migrate(bind=legacy) == []
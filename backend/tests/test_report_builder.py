@@ -0,0 +1,118 @@
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+
+from app.models import SessionLocal, Case, StoredObject
+from app.services import report_builder
+from app.services.media_store import MediaStore
+from app.services.report_builder import ReportBuilder
+
+
+class FakePdfGenerator:
+    """Writes a tiny stand-in PDF; blocks until `release` is set"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+        self.calls = 0
+
+    def generate_report(self, case_data, media_path=None, output_path=None):
+        self.release.wait(5)
+        self.calls += 1
+        with open(output_path, "w") as f:
+            f.write(f"%PDF {case_data['case_id']} {case_data['blockchain_tx']}")
+        return output_path
+
+
+@pytest.fixture
+def pdf(tmp_path, monkeypatch):
+    generator = FakePdfGenerator()
+    store = MediaStore(root=str(tmp_path / "store"))
+    monkeypatch.setattr(report_builder, "get_pdf_generator", lambda: generator)
+    monkeypatch.setattr(report_builder, "get_media_store", lambda: store)
+    monkeypatch.setattr(report_builder, "ensure_preview", lambda media_hash, media_type: None)
+
+    db = SessionLocal()
+    try:
+        db.add(Case(
+            id="CASE-1",
+            media_type="image",
+            filename="a.jpg",
+            media_hash="ab" * 32,
+            detection_score=0.9,
+            is_ai_generated=True,
+            created_at=datetime.utcnow()
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+    return generator
+
+
+def _set_case(**values):
+    db = SessionLocal()
+    try:
+        db.query(Case).filter(Case.id == "CASE-1").update(values)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _refcount(sha256: str) -> int:
+    db = SessionLocal()
+    try:
+        return db.get(StoredObject, sha256).refcount
+    finally:
+        db.close()
+
+
+def test_concurrent_downloads_share_one_build(pdf):
+    builder = ReportBuilder()
+
+    async def downloads():
+        pdf.release.clear()
+        first = asyncio.ensure_future(builder.get("CASE-1"))
+        await asyncio.sleep(0.05)
+        others = [asyncio.ensure_future(builder.get("CASE-1")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        pdf.release.set()
+        return await asyncio.gather(first, *others)
+
+    paths = asyncio.run(downloads())
+
+    assert len(set(paths)) == 1
+    assert pdf.calls == 1
+    assert builder.stats()["builds"] == 1 and builder.stats()["shared_builds"] == 3
+    assert builder.stats()["building"] == 0
+
+
+def test_current_report_is_served_from_the_store(pdf):
+    builder = ReportBuilder()
+
+    first = asyncio.run(builder.get("CASE-1"))
+    again = asyncio.run(builder.get("CASE-1"))
+
+    assert first == again
+    assert pdf.calls == 1 and builder.disk_hits == 1
+
+
+def test_anchoring_renders_a_new_variant_and_releases_the_old_one(pdf):
+    builder = ReportBuilder()
+
+    asyncio.run(builder.get("CASE-1"))
+    pending = builder._snapshot("CASE-1")["report_sha256"]
+
+    _set_case(blockchain_tx="0x" + "cd" * 32)
+    asyncio.run(builder.get("CASE-1"))
+    anchored = builder._snapshot("CASE-1")["report_sha256"]
+
+    assert pdf.calls == 2 and anchored != pending
+    assert _refcount(anchored) == 1 and _refcount(pending) == 0
+
+
+def test_unknown_case_has_no_report(pdf):
+    assert asyncio.run(ReportBuilder().get("CASE-MISSING")) is None
+    assert pdf.calls == 0
@@ -0,0 +1,43 @@
+import numpy as np
+
+from app.services.scene_filter import SceneFilter
+
+
+def _shot(seed: int) -> np.ndarray:
+    """A 640x360 frame with its own coarse structure"""
+    blocks = np.random.default_rng(seed).integers(0, 256, (9, 16, 3), dtype=np.uint8)
+    return np.kron(blocks, np.ones((40, 40, 1), dtype=np.uint8))
+
+
+def _jitter(frame: np.ndarray, seed: int) -> np.ndarray:
+    """Sensor noise that leaves the shot unchanged"""
+    noise = np.random.default_rng(seed).integers(-3, 4, frame.shape)
+    return np.clip(frame.astype(int) + noise, 0, 255).astype(np.uint8)
+
+
+def test_static_shot_keeps_one_frame():
+    scene = SceneFilter()
+    shot = _shot(1)
+
+    kept = [scene.accept(_jitter(shot, i)) for i in range(20)]
+
+    assert kept[0] and not any(kept[1:])
+    stats = scene.stats()
+    assert (stats["candidates"], stats["kept"], stats["dropped_similar"]) == (20, 1, 19)
+
+
+def test_cut_is_kept_and_a_return_to_an_earlier_shot_is_not():
+    scene = SceneFilter()
+
+    assert scene.accept(_shot(1))
+    assert scene.accept(_shot(2))
+    assert not scene.accept(_jitter(_shot(1), 0))
+
+
+def test_lighting_change_is_kept():
+    scene = SceneFilter()
+    shot = _shot(1)
+    darker = (shot * 0.4).astype(np.uint8)
+
+    assert scene.accept(shot)
+    assert scene.accept(darker)
@@ -0,0 +1,64 @@
+import random
+import statistics
+
+import pytest
+
+from app.services.sequential import SequentialScorer
+
+
+def _run(scorer: SequentialScorer, scores) -> SequentialScorer:
+    for score in scores:
+        scorer.add(score)
+        if scorer.should_stop():
+            break
+    scorer.finish()
+    return scorer
+
+
+def test_running_statistics_match_a_batch_computation():
+    rng = random.Random(7)
+    scores = [rng.random() for _ in range(200)]
+
+    scorer = SequentialScorer(max_frames=1000)
+    for score in scores:
+        scorer.add(score)
+
+    assert scorer.mean == pytest.approx(statistics.mean(scores))
+    assert scorer.std == pytest.approx(statistics.stdev(scores))
+    assert scorer.max == max(scores)
+
+
+@pytest.mark.parametrize("score, reason", [(0.95, "settled_ai"), (0.05, "settled_real")])
+def test_clear_verdicts_stop_at_the_minimum(score, reason):
+    scorer = _run(SequentialScorer(min_frames=8, max_frames=40), [score] * 40)
+
+    assert scorer.n == 8
+    assert scorer.stop_reason == reason
+
+
+def test_never_stops_before_min_frames():
+    scorer = SequentialScorer(min_frames=8, max_frames=40)
+    for _ in range(7):
+        scorer.add(0.99)
+        assert not scorer.should_stop()
+
+
+def test_ambiguous_scores_run_to_the_cap():
+    rng = random.Random(3)
+    scores = [0.5 + rng.uniform(-0.3, 0.3) for _ in range(100)]
+
+    scorer = _run(SequentialScorer(min_frames=8, max_frames=40), scores)
+
+    assert scorer.n == 40
+    assert scorer.stop_reason == "max_frames"
+    low, high = scorer.interval()
+    assert low < 0.5 < high
+
+
+def test_short_clip_is_exhausted():
+    scorer = _run(SequentialScorer(min_frames=8, max_frames=40), [0.9, 0.1, 0.9])
+
+    assert scorer.stop_reason == "clip_exhausted"
+    summary = scorer.summary()
+    assert summary["frames_used"] == 3
+    assert 0.0 <= summary["ci_low"] <= summary["ci_high"] <= 1.0
@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from app.services.phash import hamming
+from app.services.similarity_index import MultiIndexHash
+
+
+def _near(rng: random.Random, value: int, flips: int) -> int:
+    for bit in rng.sample(range(64), flips):
+        value ^= 1 << bit
+    return value
+
+
+@pytest.fixture(scope="module")
+def population():
+    # Clusters of near-identical hashes, so small radii have neighbours to find
+    rng = random.Random(1234)
+    centres = [rng.getrandbits(64) for _ in range(150)]
+    hashes = [_near(rng, rng.choice(centres), rng.randint(0, 16)) for _ in range(3000)]
+    queries = [_near(rng, rng.choice(centres), rng.randint(0, 12)) for _ in range(40)]
+    queries += [rng.getrandbits(64) for _ in range(10)]
+    return hashes, queries
+
+
+@pytest.mark.parametrize("chunks", [4, 5])
+@pytest.mark.parametrize("radius", [0, 1, 3, 4, 8, 10, 12, 20, 63, 64, 70])
+def test_search_matches_a_linear_scan(population, chunks, radius):
+    hashes, queries = population
+
+    index = MultiIndexHash(chunks=chunks)
+    for i, value in enumerate(hashes):
+        index.add(value, i)
+
+    for query in queries:
+        expected = sorted(
+            (hamming(query, value), i) for i, value in enumerate(hashes)
+            if hamming(query, value) <= radius
+        )
+        assert sorted(index.search(query, radius)) == expected
+
+
+def test_duplicate_hashes_keep_every_payload():
+    index = MultiIndexHash()
+    index.add(0xFF, "first")
+    index.add(0xFF, "second")
+
+    assert index.size == 2 and index.nodes == 1
+    assert sorted(index.search(0xFE, 1)) == [(1, "first"), (1, "second")]
+    assert index.search(0xFE, -1) == []
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+from app.models import SessionLocal, Case, CachedVerdict
+from app.services.report_builder import ReportBuilder
+from app.services.verdict_cache import VerdictCache
+
+OLD = ("detector-a", "cfg-1")
+NEW = ("detector-b", "cfg-2")
+
+
+def _case(case_id: str, media_hash: str, key=(None, None)):
+    db = SessionLocal()
+    try:
+        db.add(Case(
+            id=case_id,
+            media_type="image",
+            filename=f"{case_id}.jpg",
+            media_hash=media_hash,
+            detection_score=0.9,
+            is_ai_generated=True,
+            created_at=datetime.utcnow(),
+            model_name=key[0],
+            config_hash=key[1]
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _stored_keys() -> set:
+    db = SessionLocal()
+    try:
+        return set(db.query(CachedVerdict.media_hash, CachedVerdict.model_name, CachedVerdict.config_hash).all())
+    finally:
+        db.close()
+
+
+def _verdict(model: str) -> dict:
+    return {"model_used": model, "confidence": 0.9, "is_ai_generated": True}
+
+
+def test_switching_keys_drops_rows_no_case_was_scored_under():
+    cache = VerdictCache()
+    cache.put("scored", *OLD, _verdict("detector-a"))
+    cache.put("unsaved", *OLD, _verdict("detector-a"))
+    cache.put("legacy", *OLD, _verdict("detector-a"))
+    _case("CASE-1", "scored", OLD)
+    _case("CASE-2", "legacy")
+
+    cache.activate(*NEW)
+
+    # Still backing CASE-1 and the pre-key CASE-2; nothing needs the other one
+    assert _stored_keys() == {("scored", *OLD), ("legacy", *OLD)}
+    assert cache.get_memory("scored", *OLD) is None
+    assert cache.get("unsaved", *OLD) is None
+    # Three in memory, one row on disk
+    assert cache.stats()["invalidated"] == 4
+
+
+def test_reports_read_the_cases_own_verdict():
+    cache = VerdictCache()
+    cache.put("media", *OLD, _verdict("detector-a"))
+    _case("CASE-1", "media", OLD)
+
+    # A later model re-scores the same media
+    cache.put("media", *NEW, _verdict("detector-b"))
+
+    assert cache.for_case("media", *OLD)["model_used"] == "detector-a"
+    assert cache.for_case("media", *NEW)["model_used"] == "detector-b"
+    assert cache.for_case("unknown", *OLD) is None
+
+
+def test_cases_without_a_key_get_the_newest_verdict():
+    cache = VerdictCache()
+    cache.put("media", *OLD, _verdict("detector-a"))
+    cache.put("media", *NEW, _verdict("detector-b"))
+
+    assert cache.for_case("media")["model_used"] == "detector-b"
+
+
+def test_snapshot_names_the_model_that_scored_the_case(monkeypatch):
+    cache = VerdictCache()
+    monkeypatch.setattr("app.services.report_builder.get_verdict_cache", lambda: cache)
+
+    cache.put("media", *OLD, _verdict("detector-a"))
+    _case("CASE-1", "media", OLD)
+    cache.put("media", *NEW, _verdict("detector-b"))
+
+    data = ReportBuilder()._snapshot("CASE-1")
+    assert data["model"] == "detector-a"
+    assert data["detection_details"]["model_used"] == "detector-a"